@@ -0,0 +1,235 @@
+import numpy as np
+import exceptions
+from solution import Basis, Solution
+from utils import zeros
+
+class BatchSimplex(object):
+    '''
+    Solves many linear programs of the same shape together with the maximum coefficient rule.
+
+    The tableaus are stacked into a 3-D array (problem, row, column) with the same layout as the dense tableau,
+    including a preallocated artificial column (used only by the problems which need phase 1).
+    Every iteration prices, runs the ratio test and pivots all the running problems at once,
+    problems which reached a final status are masked out.
+    '''
+
+    _INFEASIBILITY_TOLERANCE = 1e-9
+    _OPTIMALITY_TOLERANCE = 1e-9
+    _PIVOT_TOLERANCE = 1e-9
+    _DEGENERATE_STEP_TOLERANCE = 1e-9
+
+    _OBJECTIVE_ROW_INDEX = 0
+    _CONSTRAINT_ROW_START_INDEX = 1
+    _VARIABLES_FREE_VARIABLE_COL_INDEX = 0
+    _VARIABLES_COL_START_INDEX = 1
+
+    # problem phases
+    _PHASE1 = 1
+    _PHASE2 = 2
+    _DONE = 0
+
+    def __init__(self, pivot_strategy, max_iterations):
+        self._strategy = pivot_strategy
+        self._max_iterations = max_iterations
+
+    def _initialize(self, linear_programs):
+        first = linear_programs[0]
+        self._constraints_count = first.constraints_count
+        self._real_variables_count = first.variables_count
+        for linear_program in linear_programs:
+            assert (linear_program.constraints_count, linear_program.variables_count) == (self._constraints_count, self._real_variables_count), \
+                'all linear programs in a batch must have the same shape'
+            assert not linear_program.has_bounds, 'batched linear programs must not have bounds'
+
+        problems_count = len(linear_programs)
+        m, n = self._constraints_count, self._real_variables_count
+        self._artificial_index = n + m + 1
+        self._objective_functions = np.array([linear_program.objective_function for linear_program in linear_programs], dtype=np.float64)
+
+        # 1 col for free variable, 1 col for the artificial variable, 1 row for objective_function
+        self._tableaus = zeros((problems_count, m + 1, n + m + 2))
+        for index, linear_program in enumerate(linear_programs):
+            lefthand_side = linear_program.lefthand_side.toarray() if linear_program.is_sparse else linear_program.lefthand_side
+            self._tableaus[index, self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_COL_START_INDEX: n + 1] = lefthand_side
+            self._tableaus[index, self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] = linear_program.righthand_side * -1
+        self._tableaus[:, self._CONSTRAINT_ROW_START_INDEX:, n + 1: n + m + 1] = np.eye(m)
+
+        # initially all slack variables are basic
+        self._basic_vars = np.zeros((problems_count, n + m + 2), dtype='int')
+        self._basic_vars[:, n + 1: n + m + 1] = range(1, m + 1)
+        self._tight_vars = np.zeros((problems_count, m + 1), dtype='int')
+        self._tight_vars[:, 1:] = range(n + 1, n + m + 1)
+
+        self.pivots_count = np.zeros(problems_count, dtype='int')
+        self.degenerate_pivots_count = np.zeros(problems_count, dtype='int')
+        self._phases = np.full(problems_count, self._PHASE2)
+        self._results = [None] * problems_count
+
+        # problems with a negative righthand-side start with the artificial variable (minimize x_0)
+        should_initialize = (self._tableaus[:, self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] > 0).any(axis=1)
+        self._phases[should_initialize] = self._PHASE1
+        self._tableaus[should_initialize, :, self._artificial_index] = -1
+        self._start_phase2(np.flatnonzero(~should_initialize))
+
+    def _update_tableaus(self, problems, factors, pivot_rows):
+        '''
+        Subtracts the rank-1 updates (factors x pivot_rows) from the problems' tableaus in place,
+        a row at a time so the temporaries stay the size of the pivot rows
+        '''
+        # no problem in between is masked out (like before any problem finishes), so the rows are updated through views
+        contiguous = problems[-1] - problems[0] + 1 == len(problems)
+        for row in range(self._tableaus.shape[1]):
+            update = factors[:, row, np.newaxis] * pivot_rows
+            if contiguous:
+                rows = self._tableaus[problems[0]: problems[-1] + 1, row]
+                np.subtract(rows, update, out=rows)
+            else:
+                self._tableaus[problems, row] -= update
+
+    def _pivot(self, problems, pivot_rows, pivot_cols):
+        if len(problems) == 0:
+            return
+        batch_indices = np.arange(len(problems))
+        basic_values = self._tableaus[problems, self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX]
+        # relative to the biggest basic value when it's smaller than 1, like the dense tableau
+        scales = np.minimum(1, np.max(np.abs(basic_values), axis=1, initial=0))
+        degenerate = np.abs(basic_values[batch_indices, pivot_rows - self._CONSTRAINT_ROW_START_INDEX]) <= self._DEGENERATE_STEP_TOLERANCE * scales
+        self.degenerate_pivots_count[problems[degenerate]] += 1
+
+        # only the pivot rows and columns are gathered, the tableaus are updated in place
+        pivot_row = self._tableaus[problems, pivot_rows] / self._tableaus[problems, pivot_rows, pivot_cols][:, np.newaxis]
+        factors = self._tableaus[problems, :, pivot_cols]
+        factors[batch_indices, pivot_rows] = 0
+        self._update_tableaus(problems, factors, pivot_row)
+        self._tableaus[problems, pivot_rows] = pivot_row
+
+        leaving_vars = self._tight_vars[problems, pivot_rows]
+        self._basic_vars[problems, leaving_vars] = 0
+        self._basic_vars[problems, pivot_cols] = pivot_rows
+        self._tight_vars[problems, pivot_rows] = pivot_cols
+        self.pivots_count[problems] += 1
+
+    def _finish(self, problems, error_class):
+        for problem in problems:
+            self._results[problem] = error_class()
+        self._phases[problems] = self._DONE
+
+    def _limit_reached(self, problems):
+        reached = self.pivots_count[problems] >= self._max_iterations
+        self._finish(problems[reached], exceptions.SimplexIterationsLimitExceedError)
+        return problems[~reached]
+
+    def _start_phase1(self):
+        problems = self._limit_reached(np.flatnonzero(self._phases == self._PHASE1))
+        # perform first mandatory pivot on the most infeasible row
+        pivot_rows = np.argmax(self._tableaus[problems, self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX], axis=1) + 1
+        self._pivot(problems, pivot_rows, np.full(len(problems), self._artificial_index))
+        self._limit_reached(problems)
+
+    def _end_phase1(self, problems):
+        infeasible = self._tableaus[problems, self._OBJECTIVE_ROW_INDEX, self._VARIABLES_FREE_VARIABLE_COL_INDEX] < -self._INFEASIBILITY_TOLERANCE
+        self._finish(problems[infeasible], exceptions.SimplexProblemInfeasibleError)
+        problems = problems[~infeasible]
+
+        # the artificial variable may remain basic (at zero level), replace it by a degenerate pivot
+        artificial_rows = self._basic_vars[problems, self._artificial_index]
+        basic_artificial = artificial_rows != 0
+        if basic_artificial.any():
+            pivot_problems = problems[basic_artificial]
+            pivot_rows = artificial_rows[basic_artificial]
+            rows = np.abs(self._tableaus[pivot_problems, pivot_rows])
+            rows[:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] = rows[:, self._artificial_index] = 0
+            self._pivot(pivot_problems, pivot_rows, np.argmax(rows, axis=1))
+
+        self._tableaus[problems, :, self._artificial_index] = 0
+        self._start_phase2(problems)
+
+    def _start_phase2(self, problems):
+        objective_rows = zeros((len(problems), self._tableaus.shape[2]))
+        objective_rows[:, self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] = self._objective_functions[problems]
+
+        # basic columns are unit vectors, so all of them are eliminated at once (a row at a time, so the tableaus aren't copied)
+        basic_coefficients = np.take_along_axis(objective_rows, self._tight_vars[problems, self._CONSTRAINT_ROW_START_INDEX:], axis=1)
+        for row in range(self._CONSTRAINT_ROW_START_INDEX, self._tableaus.shape[1]):
+            objective_rows -= basic_coefficients[:, row - self._CONSTRAINT_ROW_START_INDEX, np.newaxis] * self._tableaus[problems, row]
+        self._tableaus[problems, self._OBJECTIVE_ROW_INDEX] = objective_rows
+        self._phases[problems] = self._PHASE2
+
+    def _iterate(self, problems):
+        '''
+        Performs a single pivot on all the given (running) problems
+        '''
+        objective_rows = self._tableaus[problems, self._OBJECTIVE_ROW_INDEX].copy()
+        objective_rows[:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] = 0
+        objective_rows[self._basic_vars[problems] != 0] = 0
+        # the artificial variable is entering candidate only in phase 1
+        objective_rows[self._phases[problems] == self._PHASE2, self._artificial_index] = 0
+
+        entering_vars = np.argmax(objective_rows, axis=1)
+        optimal = objective_rows[np.arange(len(problems)), entering_vars] <= self._OPTIMALITY_TOLERANCE
+        optimal_problems = problems[optimal]
+        optimal_phases = self._phases[optimal_problems]
+        self._phases[optimal_problems[optimal_phases == self._PHASE2]] = self._DONE
+        self._end_phase1(optimal_problems[optimal_phases == self._PHASE1])
+
+        problems = problems[~optimal]
+        entering_vars = entering_vars[~optimal]
+        problems_before_limit = self._limit_reached(problems)
+        entering_vars = entering_vars[np.isin(problems, problems_before_limit)]
+        problems = problems_before_limit
+
+        # ratio test, ties are broken by the first row like the ratio test strategy
+        entering_columns = self._tableaus[problems, self._CONSTRAINT_ROW_START_INDEX:, entering_vars]
+        basic_values = -self._tableaus[problems, self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratios = np.where(entering_columns > self._PIVOT_TOLERANCE, np.maximum(basic_values, 0) / entering_columns, np.inf)
+        pivot_rows = np.argmin(ratios, axis=1)
+        unbounded = np.isinf(ratios[np.arange(len(problems)), pivot_rows])
+        self._finish(problems[unbounded], exceptions.SimplexProblemUnboundedError)
+
+        self._pivot(problems[~unbounded], pivot_rows[~unbounded] + 1, entering_vars[~unbounded])
+
+    def solve(self, linear_programs):
+        '''
+        Returns a result per linear program: a Solution if optimal, otherwise the SimplexError describing its status
+        '''
+        if not linear_programs:
+            return []
+
+        self._initialize(linear_programs)
+        self._start_phase1()
+        while True:
+            running = np.flatnonzero(self._phases != self._DONE)
+            if len(running) == 0:
+                break
+            self._iterate(running)
+
+        return [result if result is not None else Solution(_BatchTableauView(self, index), self._strategy)
+                for index, result in enumerate(self._results)]
+
+
+class _BatchTableauView(object):
+    '''
+    The part of the tableau interface Solution needs, for a single problem of the batch
+    '''
+    def __init__(self, batch, index):
+        self._batch = batch
+        self._index = index
+        self.pivots_count = batch.pivots_count[index]
+        self.degenerate_pivots_count = batch.degenerate_pivots_count[index]
+        self.bound_flips_count = 0
+
+    def get_objective_value(self):
+        return self._batch._tableaus[self._index, 0, 0]
+
+    def get_basis(self):
+        return Basis(self._batch._tight_vars[self._index, 1:].copy(), self._batch._constraints_count, self._batch._real_variables_count)
+
+    def get_current_solution(self):
+        tableau = self._batch._tableaus[self._index]
+        real_variables_count = self._batch._real_variables_count
+        solution = zeros(real_variables_count)
+        pivots = self._batch._basic_vars[self._index, 1: real_variables_count + 1]
+        basic = np.flatnonzero(pivots)
+        solution[basic] = -tableau[pivots[basic], 0] / tableau[pivots[basic], basic + 1]
+        return solution
@@ -0,0 +1,187 @@
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import exceptions
+from linear_program import LinearProgramSolver
+from revised_tableau import RevisedTableau
+import run_benchmark
+import strategy
+import tableau
+
+
+# the sizes of every family per scale
+SCALES = {
+    'small': dict(klee_minty=6, dense=(50, 100), sparse=(200, 200), degenerate=(50, 50), cycling=2, transportation=(5, 10), assignment=8),
+    'medium': dict(klee_minty=8, dense=(100, 300), sparse=(500, 500), degenerate=(100, 100), cycling=8, transportation=(10, 30), assignment=15),
+    'large': dict(klee_minty=10, dense=(200, 1000), sparse=(1000, 1000), degenerate=(200, 200), cycling=32, transportation=(20, 60), assignment=30),
+}
+ENGINES = {'tableau': tableau.tableau, 'revised': RevisedTableau}
+STRATEGIES = {'max-coefficient': strategy.MaxCoefficientStrategy, 'devex': strategy.DevexStrategy, 'steepest-edge': strategy.SteepestEdgeStrategy}
+MAX_ITERATIONS = 100000
+# slowdowns smaller than this are timer noise, not regressions
+MIN_SLOWDOWN_SECONDS = 0.01
+
+
+def suite_programs(scale):
+    '''
+    Returns the suite's (name, linear program, solve options) of the given scale
+    '''
+    sizes = SCALES[scale]
+    return [
+        (f'klee-minty {sizes["klee_minty"]}', run_benchmark.klee_minty(sizes['klee_minty']), {}),
+        ('dense {} x {}'.format(*sizes['dense']), run_benchmark.random_dense(*sizes['dense']), {}),
+        ('sparse {} x {}'.format(*sizes['sparse']), run_benchmark.random_sparse(*sizes['sparse']), {}),
+        ('degenerate {} x {}'.format(*sizes['degenerate']), run_benchmark.random_degenerate(*sizes['degenerate']), {}),
+        # presolve would remove the cycling rows
+        (f'cycling {sizes["cycling"]}', run_benchmark.cycling(sizes['cycling']), dict(presolve=False, max_iterations=1000)),
+        ('transportation {} x {}'.format(*sizes['transportation']), run_benchmark.transportation(*sizes['transportation']), {}),
+        (f'assignment {sizes["assignment"]}', run_benchmark.assignment(sizes['assignment']), {}),
+    ]
+
+
+def run_one(linear_program, engine, pivot_strategy_class, options, repeats):
+    '''
+    Solves repeats times, and once more while tracing the memory (which slows the solve, so it's not timed).
+    Returns the result record: status, objective value, pivots, the best wall time, pivots per second and the peak memory.
+    '''
+    options = dict(dict(max_iterations=MAX_ITERATIONS), **options)
+
+    def solve():
+        return LinearProgramSolver.solve_simplex(linear_program, pivot_strategy=pivot_strategy_class(), engine=engine, **options)
+
+    best_seconds = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        try:
+            solution = solve()
+            status, objective_value, pivots = solution.status, float(solution.objective_value), int(solution.iterations_count)
+        except exceptions.SimplexError as error:
+            status, objective_value, pivots = error.status, None, None
+        best_seconds = min(best_seconds, time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        solve()
+    except exceptions.SimplexError:
+        pass
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'status': status,
+        'objective_value': objective_value,
+        'pivots': pivots,
+        'seconds': best_seconds,
+        'pivots_per_second': pivots / best_seconds if pivots and best_seconds > 0 else None,
+        'peak_memory': peak_memory,
+    }
+
+
+def run_suite(scale='small', engines=None, strategies=None, repeats=3, log=sys.stdout):
+    '''
+    Runs every linear program of the suite with every engine and strategy, returns the results document (JSON serializable)
+    '''
+    engines = list(ENGINES) if engines is None else engines
+    strategies = list(STRATEGIES) if strategies is None else strategies
+    results = []
+    for name, linear_program, options in suite_programs(scale):
+        for engine_name in engines:
+            if linear_program.is_sparse and engine_name == 'tableau':
+                # the dense tableau densifies the sparse linear program
+                continue
+            for strategy_name in strategies:
+                result = dict(problem=name, constraints_count=linear_program.constraints_count, variables_count=linear_program.variables_count,
+                              engine=engine_name, strategy=strategy_name)
+                result.update(run_one(linear_program, ENGINES[engine_name], STRATEGIES[strategy_name], options, repeats))
+                results.append(result)
+                if log is not None:
+                    print(format_result(result), file=log)
+
+    return {
+        'meta': {
+            'scale': scale,
+            'repeats': repeats,
+            'time': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+
+
+def format_result(result):
+    pivots = '' if result['pivots'] is None else result['pivots']
+    pivots_per_second = '' if result['pivots_per_second'] is None else f'{result["pivots_per_second"]:.0f}'
+    objective = result['status'] if result['objective_value'] is None else f'{result["objective_value"]:.6g}'
+    return (f'{result["problem"]:>24} | {result["engine"]:>8} | {result["strategy"]:>15} | {pivots:>6} | {result["seconds"]:>8.4f} | '
+            f'{pivots_per_second:>9} | {result["peak_memory"] / 2 ** 20:>8.2f} | {objective:>14}')
+
+
+def _key(result):
+    return result['problem'], result['engine'], result['strategy']
+
+
+def compare(document, baseline, tolerance=0.1):
+    '''
+    Compares the results to a baseline results document (of the same scale), matched by problem, engine and strategy.
+    Returns the regressions: a changed status or objective value, more pivots, or more than (1 + tolerance) times the baseline seconds
+    (and at least MIN_SLOWDOWN_SECONDS more).
+    '''
+    baseline_results = {_key(result): result for result in baseline['results']}
+    regressions = []
+    for result in document['results']:
+        base = baseline_results.get(_key(result))
+        if base is None:
+            continue
+
+        reasons = []
+        if result['status'] != base['status']:
+            reasons.append(f'status {base["status"]} -> {result["status"]}')
+        elif result['objective_value'] is not None and not np.isclose(result['objective_value'], base['objective_value'], rtol=1e-6, atol=1e-9):
+            reasons.append(f'objective value {base["objective_value"]:.6g} -> {result["objective_value"]:.6g}')
+        if result['pivots'] is not None and base['pivots'] is not None and result['pivots'] > base['pivots']:
+            reasons.append(f'pivots {base["pivots"]} -> {result["pivots"]}')
+        if result['seconds'] > (1 + tolerance) * base['seconds'] and result['seconds'] - base['seconds'] >= MIN_SLOWDOWN_SECONDS:
+            reasons.append(f'seconds {base["seconds"]:.4f} -> {result["seconds"]:.4f} (x{result["seconds"] / base["seconds"]:.2f})')
+        if reasons:
+            regressions.append((_key(result), reasons))
+    return regressions
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Runs the benchmark suite, optionally comparing it to a saved baseline')
+    parser.add_argument('--scale', choices=list(SCALES), default='small')
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES))
+    parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES))
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output', help='saves the results as JSON (can be used as a baseline)')
+    parser.add_argument('--baseline', help='a saved results JSON to compare to')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='the allowed relative slowdown')
+    arguments = parser.parse_args(arguments)
+
+    print(f'{"problem":>24} | {"engine":>8} | {"strategy":>15} | {"pivots":>6} | {"seconds":>8} | {"pivots/s":>9} | {"peak MB":>8} | {"objective":>14}')
+    document = run_suite(arguments.scale, arguments.engines, arguments.strategies, arguments.repeats)
+    if arguments.output:
+        with open(arguments.output, 'w') as output:
+            json.dump(document, output, indent=2)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        assert baseline['meta']['scale'] == arguments.scale, 'the baseline must be of the same scale'
+        regressions = compare(document, baseline, arguments.tolerance)
+        for key, reasons in regressions:
+            print(f'REGRESSION {" / ".join(key)}: {", ".join(reasons)}')
+        print(f'{len(regressions)} regressions compared to {arguments.baseline}')
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,418 @@
+from contextlib import contextmanager
+from fractions import Fraction
+import math
+import numpy as np
+from solution import Basis
+
+
+def _dyadic(values):
+    '''
+    Splits the floats into integer mantissas and exponents (value = mantissa * 2^exponent) with the trailing zero bits removed,
+    zero is (0, 0)
+    '''
+    mantissas, exponents = np.frexp(values)
+    mantissas = (mantissas * 2.0 ** 53).astype(np.int64)
+    exponents = exponents.astype(np.int64) - 53
+    # the lowest set bit of every mantissa
+    lowest_bits = np.where(mantissas != 0, mantissas & -mantissas, 1)
+    trailing_zeros = np.frexp(lowest_bits.astype(np.float64))[1].astype(np.int64) - 1
+    mantissas >>= trailing_zeros
+    exponents = np.where(mantissas != 0, exponents + trailing_zeros, 0)
+    return mantissas, exponents
+
+
+def _integer_rows(values):
+    '''
+    Scales every row of the (float) matrix by the smallest power of two which makes it integer.
+    Returns the integer matrix (int64 when every value fits, python integers otherwise) and the row scales (python integers).
+    '''
+    assert np.all(np.isfinite(values)), 'exact solving requires finite coefficients'
+    mantissas, exponents = _dyadic(values)
+    row_exponents = np.maximum(np.max(-exponents, axis=1, initial=0), 0)
+    shifts = np.where(mantissas != 0, exponents + row_exponents[:, np.newaxis], 0)
+    bit_lengths = np.frexp(np.abs(mantissas).astype(np.float64))[1] + shifts
+    if np.max(bit_lengths, initial=0) < 62:
+        integers = mantissas << shifts
+    else:
+        integers = mantissas.astype(object) << shifts.astype(object)
+    return integers, np.array([1 << int(exponent) for exponent in row_exponents], dtype=object)
+
+
+def _fractions(numerators, denominators):
+    '''
+    The exact values numerators / denominators, python integers where the division is exact (most entries, zeros included)
+    and Fractions otherwise, which are much slower to create and compare
+    '''
+    numerators, denominators = np.broadcast_arrays(np.asarray(numerators).astype(object), np.asarray(denominators, dtype=object))
+    shape = numerators.shape
+    numerators, denominators = numerators.reshape(-1), denominators.reshape(-1)
+    quotients = numerators // denominators
+    inexact = np.flatnonzero(numerators - quotients * denominators)
+    quotients[inexact] = [Fraction(int(numerator), int(denominator))
+                          for numerator, denominator in zip(numerators[inexact], denominators[inexact])]
+    return quotients.reshape(shape)
+
+
+class ExactTableau(object):
+    '''
+    Exact rational engine exposing the same interface as the dense tableau (and the same layout and variables indices).
+
+    The tableau is kept as integers M with a common denominator D (the basis determinant), tableau = M / D,
+    and is pivoted fraction-free (Bareiss): for every row i but the pivot row r, M_i = (p * M_i - M_ik * M_r) / D and then D = p,
+    where p = M_rk is the pivot element, the division is always exact.
+    The integers are int64 while every intermediate value fits, and python integers after a pivot which may overflow.
+
+    To make the coefficients integer (floats are exact binary fractions) every constraint is scaled by a power of two s_i
+    and its slack variable is replaced by s_i times it, so slack columns remain unit columns.
+    The objective row and the righthand-side column have their own integer scales.
+    The values returned (columns, rows, basic values, objective function coefficients, the solution...) are exact Fractions
+    of the original linear program, so the strategies decide exactly when their tolerances are zero (see EXACT_TOLERANCES).
+    Only get_rows_combination (used by steepest edge weights) is computed in floating point.
+    '''
+
+    _OBJECTIVE_ROW_INDEX = 0
+    _CONSTRAINT_ROW_START_INDEX = 1
+    _VARIABLES_FREE_VARIABLE_COL_INDEX = 0
+    _VARIABLES_COL_START_INDEX = 1
+    # int64 arithmetic is used while every intermediate value is below this magnitude
+    _INT64_BOUND = 2 ** 63
+    # the strategies tolerances which make the ratio tests and the optimality test exact
+    EXACT_TOLERANCES = dict(optimality_tolerance=0, feasibility_tolerance=0, pivot_tolerance=0)
+    is_exact = True
+
+    def __init__(self, linear_program):
+        self._constraints_count = linear_program.constraints_count
+        self._real_variables_count = linear_program.variables_count
+        self._variables_count = self._constraints_count + self._real_variables_count
+        self._using_artificial_variable = False
+        self.pivots_count = 0
+        # pivots which didn't change the basic values (zero step)
+        self.degenerate_pivots_count = 0
+        # non-basic variables moved between their bounds (see flip_bound)
+        self.bound_flips_count = 0
+
+        lower_bounds = np.asarray(linear_program.get_lower_bounds(), dtype=np.float64)
+        upper_bounds = np.asarray(linear_program.get_upper_bounds(), dtype=np.float64)
+        self._lower_bounds = np.array([Fraction(bound) for bound in lower_bounds], dtype=object)
+        self._objective_function = np.array([Fraction(coefficient) for coefficient in np.asarray(linear_program.objective_function, dtype=np.float64)],
+                                            dtype=object)
+        # the upper bounds (of x - l) of all variables including the free variable (and the artificial variable), and which variables are complemented
+        self._upper_bounds_storage = np.full(self._variables_count + 2, np.inf, dtype=object)
+        self._upper_bounds_storage[self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] = [
+            Fraction(upper) - lower if np.isfinite(upper) else np.inf for upper, lower in zip(upper_bounds, self._lower_bounds)]
+        self._complemented_storage = np.zeros(self._variables_count + 2, dtype=bool)
+        self.has_upper_bounds = linear_program.upper_bounds is not None
+
+        lefthand_side = linear_program.lefthand_side
+        if linear_program.is_sparse:
+            lefthand_side = lefthand_side.toarray()
+        # the constraints are scaled by their lefthand-side only, the righthand-side column has its own scale (shared with the bounds),
+        # so a righthand-side with many significant bits doesn't blow up the lefthand-side integers
+        lefthand_side, row_scales = _integer_rows(np.asarray(lefthand_side, dtype=np.float64).reshape(self._constraints_count, -1))
+        scaled_righthand_side = np.asarray(linear_program.righthand_side, dtype=np.float64) * row_scales.astype(np.float64)
+        (righthand_side_values,), (self._righthand_side_scale,) = _integer_rows(np.concatenate((scaled_righthand_side, lower_bounds))[np.newaxis])
+        righthand_side, lower_bounds = righthand_side_values[:self._constraints_count], righthand_side_values[self._constraints_count:]
+        # the righthand-side column is shifted by the lower bounds, which are integer at the same scale
+        righthand_side = righthand_side.astype(object) - lefthand_side.astype(object) @ lower_bounds.astype(object)
+        self.should_initialize = bool(np.any(righthand_side < 0))
+
+        # the denominator of the whole tableau and the (extra) scale of the objective row
+        self._denominator = 1
+        self._objective_scale = 1
+
+        # 1 col for free variable, 1 col for the artificial variable, 1 row for objective_function
+        fits = lefthand_side.dtype != object and max(np.max(np.abs(righthand_side), initial=0), np.max(row_scales, initial=1)) < self._INT64_BOUND
+        self._storage = np.zeros((self._constraints_count + 1, self._variables_count + 2), dtype=np.int64 if fits else object)
+        self._basic_vars_storage = np.zeros((self._variables_count + 2,), dtype='int')
+        # the slack variables are scaled by their constraints scales, the other variables aren't
+        self._column_scales_storage = np.ones(self._variables_count + 2, dtype=object)
+        slack_start_index = self._VARIABLES_COL_START_INDEX + self._real_variables_count
+        self._column_scales_storage[slack_start_index: slack_start_index + self._constraints_count] = row_scales
+        self._use_columns(self._variables_count + 1)
+
+        self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] = lefthand_side
+        slack_rows = np.arange(self._CONSTRAINT_ROW_START_INDEX, self._constraints_count + 1)
+        self._tableau[slack_rows, slack_rows - self._CONSTRAINT_ROW_START_INDEX + slack_start_index] = 1
+        self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] = -righthand_side
+        self._magnitude = self._max_magnitude()
+
+        # initially all slack variables are basic
+        self._basic_vars[slack_start_index: slack_start_index + self._constraints_count] = range(1, self._constraints_count + 1)
+        self._tight_vars = np.array(range(self._real_variables_count, self._variables_count + 1), dtype='int')
+        self._tight_vars[0] = 0
+
+    def _use_columns(self, columns_count):
+        '''
+        Sets the tableau and the per-variable arrays to views of the first columns_count columns of their storage
+        '''
+        self._tableau = self._storage[:, :columns_count]
+        self._basic_vars = self._basic_vars_storage[:columns_count]
+        self._upper_bounds = self._upper_bounds_storage[:columns_count]
+        self._complemented = self._complemented_storage[:columns_count]
+        self._column_scales = self._column_scales_storage[:columns_count]
+
+    def _max_magnitude(self):
+        return int(np.max(np.abs(self._tableau), initial=0))
+
+    def _ensure_capacity(self, magnitude):
+        '''
+        Switches the storage to python integers when it's int64 and magnitude doesn't fit
+        '''
+        if self._storage.dtype != object and magnitude >= self._INT64_BOUND:
+            self._storage = self._storage.astype(object)
+            self._use_columns(self._variables_count + 1)
+
+    def _set_column(self, variable, values):
+        self._ensure_capacity(int(np.max(np.abs(values), initial=0)))
+        self._tableau[:, variable] = values
+        if self._storage.dtype != object:
+            self._magnitude = max(self._magnitude, int(np.max(np.abs(values), initial=0)))
+
+    @property
+    def constraints_count(self):
+        return self._constraints_count
+
+    @property
+    def variables_count(self):
+        '''
+        Count of the variables including the slack variables (and the artificial variable while it's used)
+        '''
+        return self._variables_count
+
+    def _row_denominators(self):
+        # the denominator of every constraint row: the tableau denominator times the basic variable scale
+        return self._column_scales[self._tight_vars[self._CONSTRAINT_ROW_START_INDEX:]] * self._denominator
+
+    def _perform_pivot(self, pivot_row_index, pivot_col_index):
+        pivot_element = int(self._tableau[pivot_row_index, pivot_col_index])
+        pivot_row = self._tableau[pivot_row_index].copy()
+        pivot_col = self._tableau[:, pivot_col_index].copy()
+        if self._storage.dtype != object:
+            # the biggest intermediate value of the update
+            self._ensure_capacity(abs(pivot_element) * self._magnitude + int(np.max(np.abs(pivot_col))) * int(np.max(np.abs(pivot_row))))
+            if self._storage.dtype == object:
+                pivot_row, pivot_col = pivot_row.astype(object), pivot_col.astype(object)
+
+        # Bareiss update, the division by the previous pivot element is exact.
+        # only the rows with a non-zero entry in the pivot column are combined with the pivot row, the others are just rescaled
+        tableau = self._tableau
+        pivot_col[pivot_row_index] = 0
+        rows = np.flatnonzero(pivot_col)
+        combined_rows = tableau[rows] * pivot_element - np.multiply.outer(pivot_col[rows], pivot_row)
+        combined_rows //= self._denominator
+        if pivot_element != self._denominator:
+            tableau *= pivot_element
+            tableau //= self._denominator
+        tableau[rows] = combined_rows
+        tableau[pivot_row_index] = pivot_row
+        if pivot_element < 0:
+            # the denominator is kept positive
+            np.negative(tableau, out=tableau)
+        self._denominator = abs(pivot_element)
+        if self._storage.dtype != object:
+            self._magnitude = self._max_magnitude()
+
+        self.pivots_count += 1
+
+    def change_base(self, entering_var, leaving_var):
+        assert self._basic_vars[entering_var] == 0, 'entering variable must be non-basic'
+        assert self._basic_vars[leaving_var] != 0, 'leaving variable must be basic'
+
+        if self._tableau[self._basic_vars[leaving_var], self._VARIABLES_FREE_VARIABLE_COL_INDEX] == 0:
+            self.degenerate_pivots_count += 1
+        self._perform_pivot(self._basic_vars[leaving_var], entering_var)
+
+        self._basic_vars[entering_var] = self._basic_vars[leaving_var]
+        self._tight_vars[self._basic_vars[leaving_var]] = entering_var
+        self._basic_vars[leaving_var] = 0
+
+    def flip_bound(self, variable):
+        '''
+        Complements the variable (x is replaced by u - x): a non-basic variable moves to its other bound,
+        a basic variable keeps its value and is represented by its distance from the upper bound
+        '''
+        upper_bound = self._upper_bounds[variable]
+        assert upper_bound < np.inf, 'only variables with a finite upper bound can be complemented'
+
+        # the righthand-side column is shifted by u times the (unscaled) column, its scale must make u integer too.
+        # it is never reduced by a common divisor of the column, the exact division of the pivots relies on its original values being integer
+        righthand_side_scale = math.lcm(self._righthand_side_scale, upper_bound.denominator)
+        free_column = (self._tableau[:, self._VARIABLES_FREE_VARIABLE_COL_INDEX].astype(object) * (righthand_side_scale // self._righthand_side_scale) +
+                       self._tableau[:, variable].astype(object) * int(upper_bound * righthand_side_scale))
+        self._righthand_side_scale = righthand_side_scale
+        self._set_column(self._VARIABLES_FREE_VARIABLE_COL_INDEX, free_column)
+
+        self._tableau[:, variable] *= -1
+        if self._basic_vars[variable] != 0:
+            self._tableau[self._basic_vars[variable]] *= -1
+        else:
+            self.bound_flips_count += 1
+        self._complemented[variable] = not self._complemented[variable]
+
+    def get_upper_bounds(self):
+        '''
+        Returns the upper bounds of all the variables (index 0 is the free variable), infinite for the unbounded ones
+        '''
+        return self._upper_bounds
+
+    def get_basic_upper_bounds(self):
+        '''
+        Returns the upper bounds of the basic variables by their constraints (the first item relates to constraint 1)
+        '''
+        return self._upper_bounds[self._tight_vars[self._CONSTRAINT_ROW_START_INDEX:]]
+
+    def get_current_solution(self):
+        solution = np.array([Fraction(0)] * self._real_variables_count, dtype=object)
+        # solution variable indices start from 0
+        pivots = self._basic_vars[self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1]
+        basic = np.flatnonzero(pivots)
+        # the real variables aren't scaled
+        solution[basic] = _fractions(-self._tableau[pivots[basic], self._VARIABLES_FREE_VARIABLE_COL_INDEX],
+                                     self._denominator * self._righthand_side_scale)
+
+        real_variables = slice(self._VARIABLES_COL_START_INDEX, self._real_variables_count + 1)
+        complemented = self._complemented[real_variables]
+        solution[complemented] = self._upper_bounds[real_variables][complemented] - solution[complemented]
+        return solution + self._lower_bounds
+
+    def get_objective_function_coefficients(self):
+        '''
+        Returns the objective function coefficients including the free variable
+        '''
+        denominators = np.full(len(self._column_scales), self._denominator * self._objective_scale, dtype=object)
+        denominators[self._VARIABLES_FREE_VARIABLE_COL_INDEX] *= self._righthand_side_scale
+        return _fractions(self._tableau[self._OBJECTIVE_ROW_INDEX].astype(object) * self._column_scales, denominators)
+
+    def get_objective_value(self):
+        return Fraction(int(self._tableau[self._OBJECTIVE_ROW_INDEX, self._VARIABLES_FREE_VARIABLE_COL_INDEX]),
+                        self._denominator * self._objective_scale * self._righthand_side_scale)
+
+    def get_column(self, variable):
+        '''
+        Returns the constraints coefficients of the variable (the first item relates to constraint 1)
+        '''
+        return _fractions(self._tableau[self._CONSTRAINT_ROW_START_INDEX:, variable].astype(object) * self._column_scales[variable],
+                          self._row_denominators())
+
+    def get_basic_values(self):
+        '''
+        Returns the values of the basic variables by their constraints (the first item relates to constraint 1)
+        '''
+        return _fractions(-self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX],
+                          self._row_denominators() * self._righthand_side_scale)
+
+    def get_row(self, constraint_index):
+        '''
+        Returns the constraint row including the free variable (the items are indexed by the variables)
+        '''
+        row_denominator = self._column_scales[self._tight_vars[constraint_index]] * self._denominator
+        denominators = np.full(len(self._column_scales), row_denominator, dtype=object)
+        denominators[self._VARIABLES_FREE_VARIABLE_COL_INDEX] *= self._righthand_side_scale
+        return _fractions(self._tableau[constraint_index].astype(object) * self._column_scales, denominators)
+
+    def get_reduced_costs(self, variables):
+        '''
+        Returns the objective function coefficients of the given variables only (zero for the basic variables)
+        '''
+        variables = np.asarray(variables, dtype='int')
+        costs = _fractions(self._tableau[self._OBJECTIVE_ROW_INDEX, variables].astype(object) * self._column_scales[variables],
+                           self._denominator * self._objective_scale)
+        return np.where(self._basic_vars[variables] == 0, costs, Fraction(0))
+
+    def get_rows_combination(self, coefficients):
+        '''
+        Returns the combination of the constraint rows with the given coefficients (the first item relates to constraint 1),
+        in floating point since it only serves the pricing weights
+        '''
+        rows = self._tableau[self._CONSTRAINT_ROW_START_INDEX:].astype(np.float64) * self._column_scales.astype(np.float64)
+        rows[:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] /= self._righthand_side_scale
+        return (np.asarray(coefficients, dtype=np.float64) / self._row_denominators().astype(np.float64)) @ rows
+
+    def get_entering_candidates(self, tolerance=0):
+        '''
+        The entering candidtes are the variables' indices with coefficients bigger than tolerance (positive) in the objective function
+        Note: the values are 1-based
+        '''
+        non_basic = self._basic_vars[self._VARIABLES_COL_START_INDEX:] == 0
+        # the scales are positive, so the signs are exact without dividing
+        positive = self._tableau[self._OBJECTIVE_ROW_INDEX, self._VARIABLES_COL_START_INDEX:] > 0
+        candidates = np.flatnonzero(non_basic & positive) + self._VARIABLES_COL_START_INDEX
+        if tolerance > 0:
+            candidates = candidates[self.get_reduced_costs(candidates) > tolerance]
+        return candidates
+
+    def get_variable_representing_constraint(self, constraint_index):
+        if constraint_index is None:
+            return None
+        return self._tight_vars[constraint_index]
+
+    def get_complemented(self):
+        '''
+        Returns which variables are complemented (index 0 is the free variable), basic ones included
+        '''
+        return self._complemented
+
+    def get_basis(self):
+        upper_bounded = np.flatnonzero(self._complemented & (self._basic_vars == 0))
+        return Basis(self._tight_vars[1:].copy(), self._constraints_count, self._real_variables_count, upper_bounded)
+
+    def get_constraint_representing_variable(self, variable):
+        constraint_index = self._basic_vars[variable]
+        return None if constraint_index == 0 else constraint_index
+
+    @contextmanager
+    def use_artificial_argument(self):
+        # the artificial column is the spare column in the end of the storage, as in the dense tableau it's set for the slack basis:
+        # -1 in the original constraints, which is minus the constraint scale in the scaled ones
+        artificial_column = self._variables_count + 1
+        row_scales = self._column_scales_storage[self._real_variables_count + 1: self._variables_count + 1]
+        artificial_values = np.concatenate(([self._objective_scale], row_scales)) * -self._denominator
+        self._ensure_capacity(int(np.max(np.abs(artificial_values))))
+        self._storage[:, artificial_column] = artificial_values
+        self._basic_vars_storage[artificial_column] = 0
+        self._complemented_storage[artificial_column] = False
+        self._variables_count += 1
+        self._use_columns(self._variables_count + 1)
+        self._using_artificial_variable = True
+        if self._storage.dtype != object:
+            self._magnitude = max(self._magnitude, int(np.max(np.abs(artificial_values))))
+
+        yield
+
+        # the artificial column is left out of the views, its storage is reset when used again
+        self._variables_count -= 1
+        self._use_columns(self._variables_count + 1)
+        self._using_artificial_variable = False
+
+    def use_objective_function(self):
+        real_variables = slice(self._VARIABLES_COL_START_INDEX, self._real_variables_count + 1)
+        complemented = self._complemented[real_variables]
+        upper_bounds = self._upper_bounds[real_variables]
+        # the objective function of the complemented variables is negated, and its value is shifted by the bounds
+        costs = np.where(complemented, -self._objective_function, self._objective_function)
+        constant = sum(self._objective_function * self._lower_bounds, Fraction(0)) + \
+            sum(self._objective_function[complemented] * upper_bounds[complemented], Fraction(0))
+        constant *= self._righthand_side_scale
+        # the objective row scale makes the costs and the (scaled) constant integer
+        self._objective_scale = math.lcm(constant.denominator, *(cost.denominator for cost in costs))
+
+        integer_costs = np.zeros(len(self._column_scales), dtype=object)
+        integer_costs[real_variables] = [int(cost * self._objective_scale) for cost in costs]
+        integer_costs[self._VARIABLES_FREE_VARIABLE_COL_INDEX] = int(constant * self._objective_scale)
+        # the costs of the basic variables times their rows are subtracted, so the basic variables' coefficients are zero
+        basic_costs = integer_costs[self._tight_vars[self._CONSTRAINT_ROW_START_INDEX:]]
+        objective_row = integer_costs * self._denominator - basic_costs @ self._tableau[self._CONSTRAINT_ROW_START_INDEX:].astype(object)
+        self._ensure_capacity(int(np.max(np.abs(objective_row), initial=0)))
+        self._tableau[self._OBJECTIVE_ROW_INDEX] = objective_row
+        if self._storage.dtype != object:
+            self._magnitude = self._max_magnitude()
+
+    def get_most_infeasible_basic_variable_info(self):
+        free_column = -self.get_basic_values()
+        # argmax returns the first maximal row, same as the dense tableau
+        constraint_index = int(np.argmax(free_column)) + self._CONSTRAINT_ROW_START_INDEX
+        free_var_value = free_column[constraint_index - self._CONSTRAINT_ROW_START_INDEX]
+
+        basic_var_index = self.get_variable_representing_constraint(constraint_index)
+
+        return basic_var_index, free_var_value
@@ -1,18 +1,37 @@
 class SimplexError(Exception):
+    # the solve status this error stands for, see Solution.status
+    status = None
+
     def __init__(self, message):
         super().__init__(message)
 
+    def __reduce__(self):
+        # subclasses build their own message, so they can't be re-created from args when unpickled
+        return _rebuild_error, (self.__class__, self.args)
+
+
+def _rebuild_error(error_class, args):
+    error = error_class.__new__(error_class)
+    error.args = args
+    return error
+
 
 class SimplexIterationsLimitExceedError(SimplexError):
+    status = 'iterations-limit'
+
     def __init__(self):
         super().__init__('Simplex max iterations limit reached!')
 
 
 class SimplexProblemInfeasibleError(SimplexError):
+    status = 'infeasible'
+
     def __init__(self):
         super().__init__('The linear program is INFEASIBLE')
 
 
 class SimplexProblemUnboundedError(SimplexError):
+    status = 'unbounded'
+
     def __init__(self):
         super().__init__('The linear program is UNBOUNDED')
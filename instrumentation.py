@@ -0,0 +1,161 @@
+import time
+import numpy as np
+
+
+class Instrumentation(object):
+    '''
+    The hooks a solve calls (see Simplex), all of them do nothing by default.
+    on_pivot is called after every simplex iteration's change of base (not the warm start basis installation),
+    and after every bound flip (then the leaving variable is the entering variable).
+    on_phase_change is called when a phase starts: phase1, phase2, dual or warm_start.
+    on_solve_end is called when the solve ends, also when it raises, with the last tableau (None if the solve raised before its first step).
+    add_time is called with the seconds spent in every solve stage (the stages don't overlap): pricing, ratio_test, weights_update
+    (the strategy's on_change_base), pivot, bound_flip, phase1_setup, objective_setup, basis_install (choosing the warm start basis pivots,
+    which are timed as pivots), and presolve, scaling when solve_simplex applies them, and interior_point when the interior point method starts the solve.
+    '''
+    def on_solve_start(self, linear_program):
+        pass
+
+    def on_phase_change(self, tableau, phase):
+        pass
+
+    def on_pivot(self, tableau, entering_variable, leaving_variable):
+        pass
+
+    def on_solve_end(self, tableau):
+        pass
+
+    def add_time(self, stage, seconds):
+        pass
+
+    def report(self):
+        # the report attached to the Solution (see Solution.profile)
+        return None
+
+
+def residual(linear_program, solution):
+    '''
+    The biggest violation of the constraints and the bounds by the solution, zero when it's feasible
+    '''
+    violations = [np.max(linear_program.lefthand_side @ solution - linear_program.righthand_side, initial=0),
+                  np.max(linear_program.get_lower_bounds() - solution, initial=0),
+                  np.max(solution - linear_program.get_upper_bounds(), initial=0)]
+    return float(max(violations))
+
+
+class ProfileReport(object):
+    '''
+    The seconds and calls per solve stage, a summary per phase and (optionally) a record per pivot.
+    to_dict exports it as plain python types (JSON serializable).
+    '''
+    def __init__(self, stages, phases, pivots):
+        self.stages = stages
+        self.phases = phases
+        self.pivots = pivots
+
+    @property
+    def total_seconds(self):
+        return sum(stage['seconds'] for stage in self.stages.values())
+
+    def to_dict(self):
+        return {'total_seconds': self.total_seconds, 'stages': self.stages, 'phases': self.phases, 'pivots': self.pivots}
+
+    def __str__(self):
+        total_seconds = self.total_seconds
+        lines = [f'Profile: {total_seconds:.6f}s in the solve stages']
+        for stage, times in sorted(self.stages.items(), key=lambda item: -item[1]['seconds']):
+            share = times['seconds'] / total_seconds if total_seconds > 0 else 0.0
+            lines.append(f'  {stage:<16} {times["seconds"]:>10.6f}s {share:>7.1%} ({times["calls"]} calls)')
+        several_solves = len({phase['solve'] for phase in self.phases}) > 1
+        for phase in self.phases:
+            name = f'{phase["phase"]} ({phase["solve"]})' if several_solves else phase['phase']
+            lines.append(f'  {name:<16} {phase["pivots"]} pivots ({phase["degenerate_pivots"]} degenerate, {phase["bound_flips"]} bound flips), '
+                         f'objective value {phase["objective_value"]:.6g}, residual {phase["residual"]:.3g}')
+        return '\n'.join(lines) + '\n'
+
+
+class Profiler(Instrumentation):
+    '''
+    Collects the solve stages timings, a summary per phase (pivots, degenerate pivots, bound flips,
+    the objective value and the residual of the solution at its end), and if record_pivots a record per pivot
+    (phase, entering and leaving variables, objective value and whether it was degenerate).
+    The phases and pivots are numbered by their solve (from 1): a solve_simplex with perturbation is two solves,
+    the perturbed linear program and then the cleanup, and the stage timings are of both.
+    The objective values and residuals are of the linear program the simplex solves, which is presolved and scaled when solve_simplex applies them.
+    The report is kept by the profiler, so it's available even when the solve raises.
+    '''
+    def __init__(self, record_pivots=True):
+        self._record_pivots = record_pivots
+        self._linear_program = None
+        self._stages = {}
+        self._phases = []
+        self._pivots = []
+        self._phase = None
+        self._tableau = None
+        self._phase_start = None
+        self._solves_count = 0
+        self._degenerate_pivots_count = 0
+
+    def on_solve_start(self, linear_program):
+        self._linear_program = linear_program
+        self._solves_count += 1
+
+    def _end_phase(self, tableau):
+        if self._phase is None:
+            return
+        pivots_count, degenerate_pivots_count, bound_flips_count = self._phase_start
+        self._phases.append({
+            'phase': self._phase,
+            'solve': self._solves_count,
+            'pivots': int(tableau.pivots_count - pivots_count),
+            'degenerate_pivots': int(tableau.degenerate_pivots_count - degenerate_pivots_count),
+            'bound_flips': int(tableau.bound_flips_count - bound_flips_count),
+            'objective_value': float(tableau.get_objective_value()),
+            'residual': residual(self._linear_program, tableau.get_current_solution()) if self._linear_program is not None else float('nan'),
+        })
+        self._phase = None
+
+    def on_phase_change(self, tableau, phase):
+        self._end_phase(tableau)
+        self._tableau = tableau
+        self._phase = phase
+        self._phase_start = (tableau.pivots_count, tableau.degenerate_pivots_count, tableau.bound_flips_count)
+        self._degenerate_pivots_count = tableau.degenerate_pivots_count
+
+    def on_pivot(self, tableau, entering_variable, leaving_variable):
+        degenerate = tableau.degenerate_pivots_count > self._degenerate_pivots_count
+        self._degenerate_pivots_count = tableau.degenerate_pivots_count
+        if self._record_pivots:
+            self._pivots.append({
+                'phase': self._phase,
+                'solve': self._solves_count,
+                'entering': int(entering_variable),
+                'leaving': int(leaving_variable),
+                'objective_value': float(tableau.get_objective_value()),
+                'degenerate': degenerate,
+            })
+
+    def on_solve_end(self, tableau):
+        # the solve may raise before its first step, then the phase's tableau is summarized
+        self._end_phase(tableau if tableau is not None else self._tableau)
+
+    def add_time(self, stage, seconds):
+        times = self._stages.setdefault(stage, {'seconds': 0.0, 'calls': 0})
+        times['seconds'] += seconds
+        times['calls'] += 1
+
+    def report(self):
+        return ProfileReport({stage: dict(times) for stage, times in self._stages.items()}, list(self._phases), list(self._pivots))
+
+
+def timed(instrumentation, stage, function, *args):
+    '''
+    Calls the function, and reports its seconds as the stage when there is an instrumentation
+    '''
+    if instrumentation is None:
+        return function(*args)
+    start = time.perf_counter()
+    try:
+        return function(*args)
+    finally:
+        instrumentation.add_time(stage, time.perf_counter() - start)
@@ -0,0 +1,338 @@
+import numpy as np
+import scipy.linalg
+import scipy.sparse
+import exceptions
+from instrumentation import timed
+from simplex import DualSimplex, Simplex
+from solution import Basis, Solution
+
+
+class InteriorPointResult(object):
+    '''
+    The summary of an interior point solve (see Solution.interior_point): its iterations, whether it converged (when it didn't nothing else is known),
+    the primal and dual objective values (of the minimized -c^T x) and the relative gap and infeasibilities at its last iterate
+    '''
+    def __init__(self, iterations_count, converged, primal_objective, dual_objective, primal_infeasibility, dual_infeasibility):
+        self.iterations_count = iterations_count
+        self.converged = converged
+        self.primal_objective = primal_objective
+        self.dual_objective = dual_objective
+        self.primal_infeasibility = primal_infeasibility
+        self.dual_infeasibility = dual_infeasibility
+
+    @property
+    def relative_gap(self):
+        return abs(self.primal_objective - self.dual_objective) / (1 + abs(self.primal_objective))
+
+    def __str__(self):
+        if not self.converged:
+            return 'Interior point did not converge, solved by the simplex'
+        return (f'Interior point converged in {self.iterations_count} iterations: relative gap {self.relative_gap:.3g}, '
+                f'primal infeasibility {self.primal_infeasibility:.3g}, dual infeasibility {self.dual_infeasibility:.3g}')
+
+
+class InteriorPointSolution(Solution):
+    '''
+    The solution of an interior point solve without crossover: the (approximately optimal) last iterate, which has no basis
+    '''
+    def __init__(self, solution, objective_value, pivot_strategy, interior_point):
+        self.solution = solution
+        self.objective_value = objective_value
+        self.pivot_strategy = pivot_strategy
+        self.iterations_count = 0
+        self.degenerate_iterations_count = 0
+        self.bound_flips_count = 0
+        self.basis = None
+        self.presolve = None
+        self.scaling = None
+        self.profile = None
+        self.interior_point = interior_point
+        self.perturbation = None
+        self.sensitivity = None
+
+
+class InteriorPoint(object):
+    '''
+    Primal-dual interior point method (Mehrotra's predictor-corrector) for max c^T x s.t. A x <= b, l <= x <= u.
+    The lower bounds are shifted to zero and slack variables are added, so it solves min g^T z s.t. [A I] z = b', 0 <= z <= u'
+    (the slack variables have no upper bound). Every iteration factorizes the normal equations matrix A Theta A^T + Theta_slack
+    with a dense Cholesky (regularized when it isn't positive definite) and uses it for both the predictor and the corrector directions.
+
+    With crossover (default) an optimal basis is identified from the last iterate: the variables are ordered by how far they are
+    from their bounds relative to their dual slacks, and the simplex is warm started with them (see Simplex._install_basis),
+    so the result is a standard Solution with a basis, and the simplex pivots only to clean up. If the interior point doesn't converge
+    (the linear program is infeasible or unbounded, or the iterations run out) the simplex solves it from the start and decides its status.
+    Without crossover the last iterate is returned as an InteriorPointSolution (with no basis), and failures raise the SimplexError
+    the iterates suggest: diverging primal iterates which improve the objective are a ray (unbounded), and diverging dual iterates
+    which improve the dual objective are a Farkas certificate (infeasible).
+
+    The constructor takes the same arguments as Simplex, the strategy, max_iterations and engine are the crossover simplex's.
+    '''
+    MAX_ITERATIONS = 100
+    # the relative gap, primal and dual infeasibilities of an optimal iterate
+    TOLERANCE = 1e-8
+    # the fraction of the step to the boundary which is taken
+    STEP_FACTOR = 0.995
+    # iterates bigger than this (relative to the linear program's coefficients) may be diverging
+    DIVERGENCE = 1e6
+    # the smallest regularization of the normal equations matrix (relative to its diagonal) tried when it isn't positive definite
+    REGULARIZATION = 1e-14
+
+    def __init__(self, strategy, max_iterations, engine=None, instrumentation=None, crossover=True):
+        self._strategy = strategy
+        self._max_iterations = max_iterations
+        self._engine = engine
+        self._instrumentation = instrumentation
+        self._crossover = crossover
+
+    def _simplex(self, linear_program, warm_start=None, sensitivity=False):
+        algorithm = DualSimplex if DualSimplex.is_preferred(linear_program) and warm_start is None else Simplex
+        return algorithm(self._strategy, self._max_iterations, self._engine, self._instrumentation).solve(linear_program, warm_start, sensitivity)
+
+    def solve(self, linear_program, warm_start=None, sensitivity=False):
+        '''
+        A warm start basis skips the interior point, the simplex starts from it.
+        The sensitivity analysis (see Simplex.solve) is of the crossover's basis, so there is none without crossover.
+        '''
+        if warm_start is not None or linear_program.constraints_count == 0:
+            return self._simplex(linear_program, warm_start, sensitivity)
+
+        problem = _InteriorPointProblem(linear_program)
+        try:
+            point, previous_point, result = timed(self._instrumentation, 'interior_point', self._solve_interior_point, problem)
+        except exceptions.SimplexError:
+            if not self._crossover:
+                raise
+            solution = self._simplex(linear_program, sensitivity=sensitivity)
+            solution.interior_point = InteriorPointResult(None, False, np.nan, np.nan, np.nan, np.nan)
+            return solution
+
+        if not self._crossover:
+            values = problem.variable_values(point.z)
+            solution = InteriorPointSolution(values, float(np.dot(linear_program.objective_function, values)), self._strategy, result)
+            if self._instrumentation is not None:
+                solution.profile = self._instrumentation.report()
+            return solution
+
+        solution = self._simplex(linear_program, problem.crossover_basis(point, previous_point), sensitivity)
+        solution.interior_point = result
+        return solution
+
+    def _solve_interior_point(self, problem):
+        '''
+        Returns the last two iterates and the InteriorPointResult, raises a SimplexError when the iterates diverge or the iterations run out
+        '''
+        point = problem.starting_point(self.REGULARIZATION)
+        for iteration in range(1, self.MAX_ITERATIONS + 1):
+            residuals = problem.residuals(point)
+            diverging = problem.divergence(point, self.DIVERGENCE, self.TOLERANCE)
+            if diverging is not None:
+                raise diverging()
+
+            normal_equations = problem.factorize(point, self.REGULARIZATION)
+            # predictor: the affine scaling direction
+            affine = problem.direction(point, residuals, normal_equations, -point.z * point.s, -point.w * point.v)
+            primal_step, dual_step = problem.step_lengths(point, affine, 1)
+            affine_gap = problem.complementarity(point.moved(affine, primal_step, dual_step))
+            gap = problem.complementarity(point)
+            centering = (affine_gap / gap) ** 3 if gap > 0 else 0
+            # corrector: centered, and compensating the second order term of the affine direction
+            target = centering * gap / problem.complementarity_count
+            direction = problem.direction(point, residuals, normal_equations, target - point.z * point.s - affine.z * affine.s,
+                                          target - point.w * point.v - affine.w * affine.v)
+            primal_step, dual_step = problem.step_lengths(point, direction, self.STEP_FACTOR)
+            previous_point, point = point, point.moved(direction, primal_step, dual_step)
+
+            result = problem.result(point, iteration)
+            if max(result.relative_gap, result.primal_infeasibility, result.dual_infeasibility) <= self.TOLERANCE:
+                return point, previous_point, result
+        raise exceptions.SimplexIterationsLimitExceedError()
+
+
+class _Point(object):
+    '''
+    An iterate: the primal variables z (and w = u' - z of the upper bounded ones), the duals y and the dual slacks s (and v of the upper bounds).
+    w and v are zero for variables without an upper bound.
+    '''
+    def __init__(self, z, w, y, s, v):
+        self.z = z
+        self.w = w
+        self.y = y
+        self.s = s
+        self.v = v
+
+    def moved(self, direction, primal_step, dual_step):
+        return _Point(self.z + primal_step * direction.z, self.w + primal_step * direction.w, self.y + dual_step * direction.y,
+                      self.s + dual_step * direction.s, self.v + dual_step * direction.v)
+
+
+class _Residuals(object):
+    def __init__(self, primal, upper, dual):
+        self.primal = primal
+        self.upper = upper
+        self.dual = dual
+
+
+class _InteriorPointProblem(object):
+    '''
+    min g^T z s.t. [A I] z = b', 0 <= z <= u' of the linear program max c^T x s.t. A x <= b, l <= x <= u, where x = l + z[:n]
+    '''
+    def __init__(self, linear_program):
+        self._linear_program = linear_program
+        self._constraints_count = linear_program.constraints_count
+        self._variables_count = linear_program.variables_count
+        lefthand_side = linear_program.lefthand_side
+        self._lefthand_side = lefthand_side if linear_program.is_sparse else np.asarray(lefthand_side, dtype=np.float64)
+        self._lower_bounds = linear_program.get_lower_bounds()
+
+        self._righthand_side = np.asarray(linear_program.righthand_side, dtype=np.float64) - self._lefthand_side @ self._lower_bounds
+        self._costs = np.concatenate((-np.asarray(linear_program.objective_function, dtype=np.float64), np.zeros(self._constraints_count)))
+        self._upper_bounds = np.concatenate((linear_program.get_upper_bounds() - self._lower_bounds, np.full(self._constraints_count, np.inf)))
+        self._is_upper_bounded = np.isfinite(self._upper_bounds)
+        self._finite_upper_bounds = np.where(self._is_upper_bounded, self._upper_bounds, 0)
+        self.complementarity_count = len(self._costs) + np.count_nonzero(self._is_upper_bounded)
+
+    def _product(self, z):
+        # [A I] z
+        return self._lefthand_side @ z[:self._variables_count] + z[self._variables_count:]
+
+    def _transposed_product(self, y):
+        # [A I]^T y
+        return np.concatenate((self._lefthand_side.T @ y, y))
+
+    def _normal_matrix(self, theta):
+        # [A I] diag(theta) [A I]^T
+        variables_theta = theta[:self._variables_count]
+        if scipy.sparse.issparse(self._lefthand_side):
+            matrix = (self._lefthand_side @ scipy.sparse.diags(variables_theta) @ self._lefthand_side.T).toarray()
+        else:
+            matrix = (self._lefthand_side * variables_theta) @ self._lefthand_side.T
+        matrix[np.diag_indices_from(matrix)] += theta[self._variables_count:]
+        return matrix
+
+    @staticmethod
+    def _cholesky(matrix, regularization):
+        '''
+        Factorizes the symmetric matrix, adding a growing multiple of its diagonal's maximum while it isn't positive definite
+        '''
+        scale = max(np.max(np.diag(matrix), initial=0), 1)
+        while True:
+            try:
+                return scipy.linalg.cho_factor(matrix, lower=True, check_finite=False)
+            except (np.linalg.LinAlgError, ValueError):
+                matrix = matrix.copy()
+                matrix[np.diag_indices_from(matrix)] += regularization * scale
+                regularization *= 100
+                if regularization > 1:
+                    # not even the regularized matrix is, the iterates are no longer finite
+                    raise exceptions.SimplexProblemInfeasibleError()
+
+    def starting_point(self, regularization):
+        '''
+        Mehrotra's starting point: the least squares solutions of [A I] z = b' and [A I]^T y + s = g, shifted to be positive and centered
+        '''
+        normal_equations = self._cholesky(self._normal_matrix(np.ones(len(self._costs))), regularization)
+        z = self._transposed_product(scipy.linalg.cho_solve(normal_equations, self._righthand_side, check_finite=False))
+        y = scipy.linalg.cho_solve(normal_equations, self._product(self._costs), check_finite=False)
+        s = self._costs - self._transposed_product(y)
+        z += max(-1.5 * np.min(z), 0)
+        s += max(-1.5 * np.min(s), 0)
+        product = np.dot(z, s)
+        z += 0.5 * product / max(np.sum(s), 1e-12) + (product == 0)
+        s += 0.5 * product / max(np.sum(z), 1e-12) + (product == 0)
+
+        # variables with an upper bound start strictly inside it, the upper bound residual is driven to zero by the iterations
+        z = np.where(self._is_upper_bounded, np.minimum(z, np.maximum(self._finite_upper_bounds / 2, 1e-2)), z)
+        w = np.where(self._is_upper_bounded, np.maximum(self._finite_upper_bounds - z, 1e-2), 0)
+        v = np.where(self._is_upper_bounded, s, 0)
+        return _Point(z, w, y, s, v)
+
+    def residuals(self, point):
+        return _Residuals(self._righthand_side - self._product(point.z),
+                          np.where(self._is_upper_bounded, self._finite_upper_bounds - point.z - point.w, 0),
+                          self._costs - self._transposed_product(point.y) - point.s + point.v)
+
+    def _inverse_theta(self, point):
+        # S Z^-1 + V W^-1
+        return point.s / point.z + np.divide(point.v, point.w, out=np.zeros_like(point.v), where=self._is_upper_bounded)
+
+    def factorize(self, point, regularization):
+        return self._cholesky(self._normal_matrix(1 / self._inverse_theta(point)), regularization)
+
+    def direction(self, point, residuals, normal_equations, complementarity, upper_complementarity):
+        '''
+        The Newton direction for the residuals and the complementarity right hand sides (S dz + Z ds = complementarity,
+        V dw + W dv = upper_complementarity), eliminated down to the normal equations [A I] Theta [A I]^T dy = r_b + [A I] Theta r
+        '''
+        theta = 1 / self._inverse_theta(point)
+        upper_terms = np.divide(upper_complementarity - point.v * residuals.upper, point.w, out=np.zeros_like(point.w),
+                                where=self._is_upper_bounded)
+        reduced = residuals.dual - complementarity / point.z + upper_terms
+        dy = scipy.linalg.cho_solve(normal_equations, residuals.primal + self._product(theta * reduced), check_finite=False)
+        dz = theta * (self._transposed_product(dy) - reduced)
+        ds = (complementarity - point.s * dz) / point.z
+        dw = np.where(self._is_upper_bounded, residuals.upper - dz, 0)
+        dv = np.divide(upper_complementarity - point.v * dw, point.w, out=np.zeros_like(point.w), where=self._is_upper_bounded)
+        return _Point(dz, dw, dy, ds, dv)
+
+    def step_lengths(self, point, direction, factor):
+        '''
+        The primal and dual step lengths (at most 1) which keep the iterate positive, times factor
+        '''
+        def max_step(values, steps, mask=True):
+            decreasing = (steps < 0) & mask
+            return min(1, factor * np.min(-values[decreasing] / steps[decreasing], initial=np.inf))
+
+        primal_step = min(max_step(point.z, direction.z), max_step(point.w, direction.w, self._is_upper_bounded))
+        dual_step = min(max_step(point.s, direction.s), max_step(point.v, direction.v, self._is_upper_bounded))
+        return primal_step, dual_step
+
+    def divergence(self, point, divergence, tolerance):
+        '''
+        Returns the SimplexError class when the iterate is huge and (normalized) a ray: of the primal, which decreases g^T z
+        (the linear program is unbounded), or of the dual, which increases b'^T y - u'^T v (the linear program is infeasible)
+        '''
+        primal_size = max(np.max(point.z), np.max(point.w, initial=0))
+        if primal_size > divergence * (1 + np.max(np.abs(self._righthand_side), initial=0) + np.max(self._finite_upper_bounds, initial=0)) and \
+                -np.dot(self._costs, point.z) / primal_size > tolerance:
+            return exceptions.SimplexProblemUnboundedError
+        dual_size = max(np.max(np.abs(point.y), initial=0), np.max(point.s), np.max(point.v, initial=0))
+        if dual_size > divergence * (1 + np.max(np.abs(self._costs), initial=0)) and \
+                (np.dot(self._righthand_side, point.y) - np.dot(self._finite_upper_bounds, point.v)) / dual_size > tolerance:
+            return exceptions.SimplexProblemInfeasibleError
+        return None
+
+    def complementarity(self, point):
+        return np.dot(point.z, point.s) + np.dot(point.w, point.v)
+
+    def result(self, point, iterations_count):
+        residuals = self.residuals(point)
+        primal_objective = float(np.dot(self._costs, point.z))
+        dual_objective = float(np.dot(self._righthand_side, point.y) - np.dot(self._finite_upper_bounds, point.v))
+        primal_infeasibility = max(np.linalg.norm(residuals.primal) / (1 + np.linalg.norm(self._righthand_side)),
+                                   np.linalg.norm(residuals.upper) / (1 + np.linalg.norm(self._finite_upper_bounds)))
+        dual_infeasibility = np.linalg.norm(residuals.dual) / (1 + np.linalg.norm(self._costs))
+        return InteriorPointResult(iterations_count, True, primal_objective, dual_objective, float(primal_infeasibility), float(dual_infeasibility))
+
+    def variable_values(self, z):
+        return self._lower_bounds + np.clip(z[:self._variables_count], 0, self._upper_bounds[:self._variables_count])
+
+    def crossover_basis(self, point, previous_point):
+        '''
+        The basis guess of the last iterate, by the Tapia indicators (the ratio of every variable to its previous iterate, which is scale invariant):
+        converging to 1 for the variables of the optimal face and to 0 for those converging to a bound, and the other way around for their dual slacks.
+        The variables are ordered by their indicators (the optimal face comes first), only those which look more basic than non-basic are listed,
+        Simplex._install_basis skips the dependent ones and keeps slack variables for the rows left.
+        The non-basic variables converging faster to their upper bound than to their lower bound are at their upper bound.
+        '''
+        lower_ratios = point.z / previous_point.z
+        upper_ratios = np.divide(point.w, previous_point.w, out=np.full_like(point.w, np.inf), where=self._is_upper_bounded)
+        at_upper = upper_ratios < lower_ratios
+        primal_ratios = np.where(at_upper, upper_ratios, lower_ratios)
+        dual_ratios = np.where(at_upper, np.divide(point.v, previous_point.v, out=np.ones_like(point.v), where=self._is_upper_bounded),
+                               point.s / previous_point.s)
+        scores = primal_ratios / (primal_ratios + dual_ratios)
+        order = np.argsort(-scores, kind='stable')
+        basic = order[scores[order] > 0.5]
+        upper_bounded = np.flatnonzero(at_upper[:self._variables_count])
+        return Basis(basic + 1, self._constraints_count, self._variables_count, upper_bounded + 1)
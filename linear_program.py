@@ -1,35 +1,221 @@
+import functools
+import numpy as np
+import scipy.sparse
+import exceptions
+from batch import BatchSimplex
+from exact_tableau import ExactTableau
+from instrumentation import timed
+from interior_point import InteriorPoint
+from perturbation import perturbation as perturbation_program
+from presolve import presolve as presolve_program
+from revised_tableau import RevisedTableau
+from scaling import scale as scale_program
 import strategy
-from simplex import Simplex
+import tableau
+from simplex import DualSimplex, Simplex
 
 
 class StandardLinearProgram(object):
-    def __init__(self, objective_function, lefthand_side, righthand_side):
+    '''
+    max c^T x  s.t.  A x <= b, l <= x <= u
+    The lefthand-side (A) is either a dense numpy array or a scipy.sparse matrix (kept in CSC form)
+    The lower bounds (l) are finite and default to zero, the upper bounds (u) may be infinite and default to infinity.
+    Bounds are handled by the engines implicitly, without adding rows to the tableau.
+    '''
+    def __init__(self, objective_function, lefthand_side, righthand_side, lower_bounds=None, upper_bounds=None):
+        self.is_sparse = scipy.sparse.issparse(lefthand_side)
+        if self.is_sparse:
+            lefthand_side = scipy.sparse.csc_matrix(lefthand_side, dtype='float64')
+
         self.objective_function = objective_function
         self.lefthand_side = lefthand_side
         self.righthand_side = righthand_side
         self.constraints_count = len(righthand_side)
         self.variables_count = lefthand_side.shape[1]
 
+        if lower_bounds is not None:
+            lower_bounds = np.asarray(lower_bounds, dtype=np.float64)
+            assert lower_bounds.shape == (self.variables_count,) and np.all(np.isfinite(lower_bounds)), 'lower bounds must be finite, one per variable'
+        if upper_bounds is not None:
+            upper_bounds = np.asarray(upper_bounds, dtype=np.float64)
+            assert upper_bounds.shape == (self.variables_count,), 'upper bounds must be one per variable'
+            assert np.all(upper_bounds >= (0 if lower_bounds is None else lower_bounds)), 'upper bounds must not be smaller than the lower bounds'
+        # None stands for the default bounds (x >= 0)
+        self.lower_bounds = lower_bounds
+        self.upper_bounds = upper_bounds
+
+    @property
+    def has_bounds(self):
+        return self.lower_bounds is not None or self.upper_bounds is not None
+
+    def get_lower_bounds(self):
+        return np.zeros(self.variables_count) if self.lower_bounds is None else self.lower_bounds
+
+    def get_upper_bounds(self):
+        return np.full(self.variables_count, np.inf) if self.upper_bounds is None else self.upper_bounds
+
 
 class LinearProgramSolver(object):
     DEFAULT_MAX_ITERATIONS_COUNT = 1000
 
     @staticmethod
-    def solve_simplex(linear_program, pivot_strategy=None, max_iterations=None):
+    def _default_engine(linear_program):
+        # densifying a sparse lefthand-side may not even fit in memory
+        return RevisedTableau if linear_program.is_sparse else None
+
+    @staticmethod
+    def _default_algorithm(linear_program):
+        return DualSimplex if DualSimplex.is_preferred(linear_program) else Simplex
+
+    @staticmethod
+    def solve_simplex(linear_program, pivot_strategy=None, max_iterations=None, engine=None, warm_start=None, algorithm=None, presolve=True, scaling=None,
+                      instrumentation=None, perturbation=None, sensitivity=False):
+        '''
+        presolve reduces the linear program before it is solved (see presolve.py), the solution is mapped back to the original variables.
+        A warm start basis is of the original linear program, so it is never presolved.
+        scaling is the method used to scale the (presolved) linear program (see scaling.Scaler.METHODS), the solution is unscaled automatically.
+        instrumentation receives the solve hooks and stage timings, like instrumentation.Profiler whose report is attached as Solution.profile.
+        The hooks see the presolved and scaled linear program, so the profile's objective values and residuals are of it (not of the original one),
+        and with perturbation they see two solves (the perturbed one and the cleanup, see instrumentation.Profiler).
+        perturbation is the relative size of the righthand side perturbation against degeneracy (see perturbation.py, True for the default size),
+        the perturbed linear program is solved first and its basis warm starts the (presolved and scaled) linear program, unless warm started already.
+        sensitivity attaches the sensitivity analysis of the optimal basis as solution.sensitivity (see sensitivity.py),
+        it's of the linear program's rows and columns so it's never presolved.
+        '''
+        postsolve = None
+        if presolve and warm_start is None and not sensitivity:
+            linear_program, postsolve = timed(instrumentation, 'presolve', presolve_program, linear_program)
+            if linear_program.constraints_count == 0:
+                # everything was reduced, the dense tableau of the empty linear program has the solution
+                engine = tableau.tableau
+
+        scaling_obj = None
+        if scaling is not None:
+            linear_program, scaling_obj = timed(instrumentation, 'scaling', scale_program, linear_program, scaling)
+
         if max_iterations is None:
             max_iterations = LinearProgramSolver.DEFAULT_MAX_ITERATIONS_COUNT
         if pivot_strategy is None:
             pivot_strategy = strategy.MaxCoefficientStrategy()
+        if engine is None:
+            engine = LinearProgramSolver._default_engine(linear_program)
+        if algorithm is None:
+            algorithm = LinearProgramSolver._default_algorithm(linear_program)
+
+        solver = algorithm(pivot_strategy, max_iterations, engine, instrumentation)
+        if perturbation and warm_start is None:
+            perturbation_obj = perturbation_program(linear_program, None if perturbation is True else perturbation)
+            solution = perturbation_obj.solve(solver, linear_program, sensitivity)
+        else:
+            solution = solver.solve(linear_program, warm_start, sensitivity)
+        if instrumentation is not None:
+            # the presolve and scaling times are reported too
+            solution.profile = instrumentation.report()
+        if scaling_obj is not None:
+            solution = scaling_obj.unscale(solution)
+        if postsolve is not None:
+            solution = postsolve.postsolve(solution)
+        return solution
 
-        solver = Simplex(pivot_strategy, max_iterations)
-        return solver.solve(linear_program)
+    @staticmethod
+    def solve_interior_point(linear_program, crossover=True, pivot_strategy=None, max_iterations=None, engine=None, presolve=True, scaling='equilibration',
+                             instrumentation=None, sensitivity=False):
+        '''
+        Solves with the primal-dual interior point method (see interior_point.InteriorPoint), presolved and scaled like solve_simplex.
+        The interior point's tolerances are relative to the whole linear program, so it's scaled by default (see scaling.py).
+        With crossover the simplex is warm started from the basis identified at the interior point (the pivot_strategy, max_iterations
+        and engine are the simplex's), without it the result is the interior point itself (an InteriorPointSolution, with no basis).
+        '''
+        return LinearProgramSolver.solve_simplex(linear_program, pivot_strategy, max_iterations, engine, algorithm=functools.partial(InteriorPoint, crossover=crossover),
+                                                 presolve=presolve, scaling=scaling, instrumentation=instrumentation, sensitivity=sensitivity)
+
+    @staticmethod
+    def solve_exact(linear_program, pivot_strategy=None, max_iterations=None, warm_start=None, algorithm=None, instrumentation=None, sensitivity=False,
+                    float_start=True):
+        '''
+        Solves in exact rational arithmetic with the exact_tableau.ExactTableau engine, the solution values and objective value are exact (python integers and Fractions).
+        The floats of the linear program are taken as the exact binary fractions they are.
+        Presolve and scaling use floating point tolerances, so they are skipped.
+        The strategy should compare with zero tolerances, like the default MaxCoefficientStrategy(**ExactTableau.EXACT_TOLERANCES).
+        float_start solves in floating point first and warm starts from its optimal basis (unless warm started already),
+        which the exact solve installs and then verifies, repairing it with exact pivots if it isn't optimal. The solution counts only the exact pivots.
+        Every exact pivot combines big integers, so even a few of them take seconds on linear programs with hundreds of rows and arbitrary float coefficients,
+        and thousands of rows are impractical (small integer coefficients stay much faster).
+        '''
+        if pivot_strategy is None:
+            pivot_strategy = strategy.MaxCoefficientStrategy(**ExactTableau.EXACT_TOLERANCES)
+        if float_start and warm_start is None:
+            try:
+                warm_start = LinearProgramSolver.solve_simplex(linear_program, max_iterations=max_iterations).basis
+            except exceptions.SimplexError:
+                # the exact solve decides the status from the slack basis
+                pass
+        return LinearProgramSolver.solve_simplex(linear_program, pivot_strategy, max_iterations, ExactTableau, warm_start, algorithm, presolve=False,
+                                                 instrumentation=instrumentation, sensitivity=sensitivity)
 
     @staticmethod
-    def solve_simplex_steps(linear_program, pivot_strategy=None, max_iterations=None):
+    def parametric_righthand_side(linear_program, direction, max_parameter=np.inf, pivot_strategy=None, max_iterations=None, engine=None, warm_start=None,
+                                  scaling=None, instrumentation=None):
+        '''
+        Sweeps the righthand-side b + t * direction for t from 0 to max_parameter from the optimal basis at t = 0 by dual simplex pivots
+        at the breakpoints (see Simplex.parametric_righthand_side), returns a sensitivity.ParametricSweep.
+        The rows are kept, so it's never presolved. The solutions and slopes of a scaled linear program are unscaled like solve_simplex's.
+        '''
+        direction = np.asarray(direction, dtype=np.float64)
+        scaling_obj = None
+        if scaling is not None:
+            linear_program, scaling_obj = timed(instrumentation, 'scaling', scale_program, linear_program, scaling)
+            direction = direction * scaling_obj.row_factors
+
+        if max_iterations is None:
+            max_iterations = LinearProgramSolver.DEFAULT_MAX_ITERATIONS_COUNT
+        if pivot_strategy is None:
+            pivot_strategy = strategy.MaxCoefficientStrategy()
+        if engine is None:
+            engine = LinearProgramSolver._default_engine(linear_program)
+
+        algorithm = LinearProgramSolver._default_algorithm(linear_program)
+        sweep = algorithm(pivot_strategy, max_iterations, engine, instrumentation).parametric_righthand_side(linear_program, direction, max_parameter, warm_start)
+        if scaling_obj is not None:
+            sweep.solutions = [scaling_obj.unscale(solution) for solution in sweep.solutions]
+            sweep.objective_slopes = sweep.objective_slopes / scaling_obj.objective_factor
+        return sweep
+
+    @staticmethod
+    def solve_simplex_steps(linear_program, pivot_strategy=None, max_iterations=None, engine=None, warm_start=None, algorithm=None, every=1,
+                            instrumentation=None):
+        '''
+        Yields a SolutionStep after every simplex step (or only every k-th step), see Simplex.solution_steps
+        '''
         if max_iterations is None:
             max_iterations = LinearProgramSolver.DEFAULT_MAX_ITERATIONS_COUNT
         if pivot_strategy is None:
             pivot_strategy = strategy.MaxCoefficientStrategy()
+        if engine is None:
+            engine = LinearProgramSolver._default_engine(linear_program)
+        if algorithm is None:
+            algorithm = LinearProgramSolver._default_algorithm(linear_program)
 
-        solver = Simplex(pivot_strategy, max_iterations)
-        return solver.solution_steps(linear_program)
+        solver = algorithm(pivot_strategy, max_iterations, engine, instrumentation)
+        return solver.solution_steps(linear_program, warm_start, every)
+
+    @staticmethod
+    def solve_batch(linear_programs, max_iterations=None):
+        '''
+        Solves linear programs of the same shape together (with the maximum coefficient rule).
+        Returns a result per linear program: a Solution if optimal, otherwise the SimplexError describing its status (see status attribute)
+        '''
+        if max_iterations is None:
+            max_iterations = LinearProgramSolver.DEFAULT_MAX_ITERATIONS_COUNT
+
+        solver = BatchSimplex(strategy.MaxCoefficientStrategy(), max_iterations)
+        return solver.solve(linear_programs)
+
+    @staticmethod
+    def solve_many(linear_programs, workers=None, pivot_strategy=None, max_iterations=None, engine=None):
+        '''
+        Solves the linear programs on a pool of worker processes, see parallel.ParallelSolver
+        '''
+        # parallel workers solve with this class, so it is imported here to avoid a circular import
+        import parallel
+        return parallel.solve_many(linear_programs, workers, pivot_strategy, max_iterations, engine)
@@ -0,0 +1,712 @@
+import array
+import gzip
+import json
+import os
+import re
+import numpy as np
+import scipy.sparse
+from linear_program import StandardLinearProgram
+
+
+# values of at least this magnitude stand for infinity (the MPS and LP convention)
+INFINITY = 1e30
+CACHE_VERSION = 1
+
+
+class ModelFileError(ValueError):
+    def __init__(self, path, line_number, message):
+        super().__init__(f'{path}:{line_number}: {message}' if line_number is not None else f'{path}: {message}')
+
+
+def _open(path, mode='rt'):
+    return gzip.open(path, mode) if str(path).endswith('.gz') else open(path, mode)
+
+
+def _number(text, path, line_number):
+    try:
+        value = float(text)
+    except ValueError:
+        raise ModelFileError(path, line_number, f'expected a number, got {text!r}') from None
+    if abs(value) >= INFINITY:
+        return np.copysign(np.inf, value)
+    return value
+
+
+class Model(object):
+    '''
+    A linear program read from a file, with what's needed to map its solution back to the file's variables and objective:
+    the file's min / max objective is maximized, rows become <= rows (a >= row is negated and a ranged or equality row is split into two),
+    a variable without a lower bound is complemented (x = u - x') when it has an upper bound and otherwise split into two (x = x' - x'').
+    '''
+    def __init__(self, name, linear_program, sense, objective_constant, variable_names, constraint_names, column_signs, column_shifts, free_columns):
+        self.name = name
+        self.linear_program = linear_program
+        self.sense = sense
+        # added to the linear program's objective value (before applying the sense)
+        self.objective_constant = objective_constant
+        self.variable_names = variable_names
+        # the file's row name of every row of the linear program
+        self.constraint_names = constraint_names
+        self._column_signs = column_signs
+        self._column_shifts = column_shifts
+        self._free_columns = free_columns
+
+    def variable_values(self, solution):
+        '''
+        The values of the file's variables from a solution of the linear program (or its solution vector)
+        '''
+        values = np.asarray(getattr(solution, 'solution', solution), dtype=np.float64)
+        variables_count = len(self.variable_names)
+        result = self._column_signs * values[:variables_count] + self._column_shifts
+        result[self._free_columns] -= values[variables_count:]
+        return result
+
+    def objective_value(self, solution):
+        '''
+        The file's objective value from a solution of the linear program
+        '''
+        value = solution.objective_value + self.objective_constant
+        return value if self.sense == 'max' else -value
+
+    def __str__(self):
+        linear_program = self.linear_program
+        return (f'{self.name or "model"}: {self.sense}imize over {len(self.variable_names)} variables '
+                f'({linear_program.constraints_count} x {linear_program.variables_count} linear program)')
+
+
+class _ModelBuilder(object):
+    '''
+    Accumulates the rows, columns and coefficients while a file is read.
+    The coefficients are kept in compact typed arrays (not python lists of floats), so the file's text is never held in memory.
+    '''
+    def __init__(self):
+        self.name = None
+        self.sense = 'min'
+        self.objective_constant = 0.0
+        self.row_indices = {}
+        self.row_names = []
+        self.row_senses = []
+        self.righthand_side = array.array('d')
+        self.ranges = {}
+        self.column_indices = {}
+        self.column_names = []
+        self.objective = array.array('d')
+        self.lower_bounds = array.array('d')
+        self.upper_bounds = array.array('d')
+        self._entry_rows = array.array('i')
+        self._entry_columns = array.array('i')
+        self._entry_values = array.array('d')
+
+    def add_row(self, name, sense):
+        index = len(self.row_names)
+        self.row_indices[name] = index
+        self.row_names.append(name)
+        self.row_senses.append(sense)
+        self.righthand_side.append(0.0)
+        return index
+
+    def column(self, name):
+        index = self.column_indices.get(name)
+        if index is None:
+            index = len(self.column_names)
+            self.column_indices[name] = index
+            self.column_names.append(name)
+            self.objective.append(0.0)
+            self.lower_bounds.append(0.0)
+            self.upper_bounds.append(np.inf)
+        return index
+
+    def add_entry(self, row, column, value):
+        self._entry_rows.append(row)
+        self._entry_columns.append(column)
+        self._entry_values.append(value)
+
+    def _row_bounds(self):
+        '''
+        The lower and upper limits of every row's activity (MPS ranges semantics)
+        '''
+        senses = np.array(self.row_senses, dtype='<U1') if self.row_senses else np.zeros(0, dtype='<U1')
+        righthand_side = np.frombuffer(self.righthand_side, dtype=np.float64) if self.row_names else np.zeros(0)
+        lower = np.where(senses == 'L', -np.inf, righthand_side)
+        upper = np.where(senses == 'G', np.inf, righthand_side)
+        for row, value in self.ranges.items():
+            if senses[row] == 'L':
+                lower[row] = righthand_side[row] - abs(value)
+            elif senses[row] == 'G':
+                upper[row] = righthand_side[row] + abs(value)
+            elif value > 0:
+                upper[row] = righthand_side[row] + value
+            else:
+                lower[row] = righthand_side[row] + value
+        return lower, upper
+
+    def build(self, path):
+        rows_count, columns_count = len(self.row_names), len(self.column_names)
+        # coinciding entries are summed
+        lefthand_side = scipy.sparse.coo_matrix(
+            (np.frombuffer(self._entry_values, dtype=np.float64) if self._entry_values else np.zeros(0),
+             (np.frombuffer(self._entry_rows, dtype=np.int32) if self._entry_rows else np.zeros(0, dtype=np.int32),
+              np.frombuffer(self._entry_columns, dtype=np.int32) if self._entry_columns else np.zeros(0, dtype=np.int32))),
+            shape=(rows_count, columns_count)).tocsc()
+        self._entry_rows = self._entry_columns = self._entry_values = None
+
+        objective = np.array(self.objective, dtype=np.float64)
+        lower_bounds = np.array(self.lower_bounds, dtype=np.float64)
+        upper_bounds = np.array(self.upper_bounds, dtype=np.float64)
+        inconsistent = np.flatnonzero(lower_bounds > upper_bounds)
+        if len(inconsistent):
+            raise ModelFileError(path, None, f'the bounds of {self.column_names[inconsistent[0]]} are inconsistent')
+        if self.sense == 'min':
+            objective = -objective
+        objective_constant = self.objective_constant if self.sense == 'max' else -self.objective_constant
+
+        # the variables without a lower bound are complemented (x = u - x') or split (x = x' - x'')
+        column_signs = np.ones(columns_count)
+        column_shifts = np.zeros(columns_count)
+        complemented = np.isneginf(lower_bounds) & np.isfinite(upper_bounds)
+        free_columns = np.flatnonzero(np.isneginf(lower_bounds) & np.isposinf(upper_bounds))
+        column_signs[complemented] = -1
+        column_shifts[complemented] = upper_bounds[complemented]
+        objective_constant += float(objective @ column_shifts)
+        row_shifts = lefthand_side @ column_shifts
+        lefthand_side = lefthand_side @ scipy.sparse.diags(column_signs)
+        objective *= column_signs
+        lower_bounds[np.isneginf(lower_bounds)] = 0
+        upper_bounds[complemented] = np.inf
+        if len(free_columns):
+            lefthand_side = scipy.sparse.hstack([lefthand_side, -lefthand_side[:, free_columns]])
+            objective = np.concatenate([objective, -objective[free_columns]])
+            lower_bounds = np.concatenate([lower_bounds, np.zeros(len(free_columns))])
+            upper_bounds = np.concatenate([upper_bounds, np.full(len(free_columns), np.inf)])
+
+        row_lower, row_upper = self._row_bounds()
+        row_lower, row_upper = row_lower - row_shifts, row_upper - row_shifts
+        upper_rows, lower_rows = np.flatnonzero(np.isfinite(row_upper)), np.flatnonzero(np.isfinite(row_lower))
+        lefthand_side = scipy.sparse.csr_matrix(lefthand_side)
+        lefthand_side = scipy.sparse.vstack([lefthand_side[upper_rows], -lefthand_side[lower_rows]], format='csc')
+        righthand_side = np.concatenate([row_upper[upper_rows], -row_lower[lower_rows]])
+        constraint_names = [self.row_names[row] for row in np.concatenate([upper_rows, lower_rows])]
+
+        linear_program = StandardLinearProgram(
+            objective, lefthand_side, righthand_side,
+            None if not np.any(lower_bounds) else lower_bounds, None if np.all(np.isposinf(upper_bounds)) else upper_bounds)
+        return Model(self.name, linear_program, self.sense, objective_constant, list(self.column_names), constraint_names,
+                     column_signs, column_shifts, free_columns)
+
+
+class _MpsReader(object):
+    '''
+    Reads free (whitespace separated) MPS, which also reads fixed MPS files whose names have no spaces.
+    Sections: NAME, OBJSENSE, ROWS, COLUMNS (integer markers are skipped, integrality is relaxed), RHS, RANGES, BOUNDS and ENDATA.
+    The first N row is the objective, other N rows are dropped.
+    '''
+    SECTIONS = ('NAME', 'OBJSENSE', 'OBJSENS', 'ROWS', 'COLUMNS', 'RHS', 'RANGES', 'BOUNDS', 'ENDATA')
+    SENSES = {'MAX': 'max', 'MAXIMIZE': 'max', 'MIN': 'min', 'MINIMIZE': 'min'}
+
+    def __init__(self, path):
+        self._path = path
+        self._builder = _ModelBuilder()
+        self._objective_row = None
+        self._dropped_rows = set()
+        self._line_number = 0
+
+    def _error(self, message):
+        return ModelFileError(self._path, self._line_number, message)
+
+    def _row(self, name):
+        row = self._builder.row_indices.get(name)
+        if row is None and name != self._objective_row and name not in self._dropped_rows:
+            raise self._error(f'unknown row {name}')
+        return row
+
+    def _rows_section(self, fields):
+        if len(fields) != 2:
+            raise self._error('a row is a type and a name')
+        sense, name = fields[0].upper(), fields[1]
+        if sense == 'N':
+            if self._objective_row is None:
+                self._objective_row = name
+            else:
+                self._dropped_rows.add(name)
+        elif sense in ('L', 'G', 'E'):
+            self._builder.add_row(name, sense)
+        else:
+            raise self._error(f'unknown row type {fields[0]}')
+
+    def _columns_section(self, fields):
+        if len(fields) > 2 and fields[1] == "'MARKER'":
+            return
+        if len(fields) not in (3, 5):
+            raise self._error('a column line is a column name and one or two row and value pairs')
+        builder = self._builder
+        column = builder.column(fields[0])
+        for name, value in zip(fields[1::2], fields[2::2]):
+            value = _number(value, self._path, self._line_number)
+            row = self._row(name)
+            if row is not None:
+                builder.add_entry(row, column, value)
+            elif name == self._objective_row:
+                builder.objective[column] += value
+
+    def _values_section(self, fields, section):
+        # the RHS / RANGES vector name is optional
+        if len(fields) in (3, 5):
+            fields = fields[1:]
+        if len(fields) not in (2, 4):
+            raise self._error(f'a {section} line is an optional name and one or two row and value pairs')
+        builder = self._builder
+        for name, value in zip(fields[0::2], fields[1::2]):
+            value = _number(value, self._path, self._line_number)
+            row = self._row(name)
+            if section == 'RHS':
+                if row is not None:
+                    builder.righthand_side[row] = value
+                elif name == self._objective_row:
+                    # the objective's righthand-side is minus its constant
+                    builder.objective_constant = -value
+            elif row is not None:
+                builder.ranges[row] = value
+
+    def _bounds_section(self, fields):
+        bound_type = fields[0].upper()
+        has_value = bound_type in ('UP', 'LO', 'FX', 'LI', 'UI') or (bound_type == 'BV' and len(fields) == 4)
+        # the bound vector name is optional
+        expected_count = 3 if has_value else 2
+        if len(fields) == expected_count + 1:
+            fields = fields[1:]
+        if len(fields) != expected_count:
+            raise self._error('a bound line is a type, an optional name, a column and a value')
+        builder = self._builder
+        column = builder.column_indices.get(fields[1])
+        if column is None:
+            raise self._error(f'unknown column {fields[1]}')
+        value = _number(fields[2], self._path, self._line_number) if has_value else None
+        if bound_type in ('UP', 'UI'):
+            # by convention a negative upper bound of a variable with the default lower bound drops the lower bound
+            if value < 0 and builder.lower_bounds[column] == 0:
+                builder.lower_bounds[column] = -np.inf
+            builder.upper_bounds[column] = value
+        elif bound_type in ('LO', 'LI'):
+            builder.lower_bounds[column] = value
+        elif bound_type == 'FX':
+            builder.lower_bounds[column] = builder.upper_bounds[column] = value
+        elif bound_type == 'FR':
+            builder.lower_bounds[column], builder.upper_bounds[column] = -np.inf, np.inf
+        elif bound_type == 'MI':
+            builder.lower_bounds[column] = -np.inf
+        elif bound_type == 'PL':
+            builder.upper_bounds[column] = np.inf
+        elif bound_type == 'BV':
+            builder.lower_bounds[column], builder.upper_bounds[column] = 0.0, 1.0
+        else:
+            raise self._error(f'unknown bound type {fields[0]}')
+
+    def read(self, lines):
+        section = None
+        for self._line_number, line in enumerate(lines, 1):
+            if not line.strip() or line.startswith('*'):
+                continue
+            fields = line.split()
+            if not line[0].isspace():
+                # a section header
+                section = fields[0].upper()
+                if section not in self.SECTIONS:
+                    raise self._error(f'unsupported section {fields[0]}')
+                if section == 'NAME':
+                    self._builder.name = fields[1] if len(fields) > 1 else None
+                elif section in ('OBJSENSE', 'OBJSENS') and len(fields) > 1:
+                    self._objective_sense(fields[1])
+                elif section == 'ENDATA':
+                    break
+                continue
+
+            if section in ('OBJSENSE', 'OBJSENS'):
+                self._objective_sense(fields[0])
+            elif section == 'ROWS':
+                self._rows_section(fields)
+            elif section == 'COLUMNS':
+                self._columns_section(fields)
+            elif section in ('RHS', 'RANGES'):
+                self._values_section(fields, section)
+            elif section == 'BOUNDS':
+                self._bounds_section(fields)
+            else:
+                raise self._error(f'unexpected line in section {section}')
+        return self._builder.build(self._path)
+
+    def _objective_sense(self, sense):
+        if sense.upper() not in self.SENSES:
+            raise self._error(f'unknown objective sense {sense}')
+        self._builder.sense = self.SENSES[sense.upper()]
+
+
+_LP_TOKEN = re.compile(r'''\s*(?:
+    (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+    |(?P<relation><=|=<|>=|=>|<|>|=)
+    |(?P<sign>[+-])
+    |(?P<colon>:)
+    |(?P<name>[A-Za-z_!"#$%&()/,.;?@'`{}|~\[\]][^\s:+\-<>=*^]*)
+    |(?P<other>\S))''', re.VERBOSE)
+
+
+class _LpReader(object):
+    '''
+    Reads the CPLEX LP format: an objective (Maximize / Minimize), Subject To (constraints, which may span lines, and `lower <= expression <= upper` ranges),
+    Bounds (one per line), General / Binary (integrality is relaxed, binaries are bounded by [0, 1]) and End.
+    '''
+    SECTIONS = {
+        'maximize': 'max', 'maximum': 'max', 'max': 'max', 'minimize': 'min', 'minimum': 'min', 'min': 'min',
+        'subject to': 'constraints', 'such that': 'constraints', 'st': 'constraints', 's.t.': 'constraints', 'st.': 'constraints',
+        'bounds': 'bounds', 'bound': 'bounds',
+        'general': 'general', 'generals': 'general', 'gen': 'general', 'integer': 'general', 'integers': 'general',
+        'binary': 'binary', 'binaries': 'binary', 'bin': 'binary',
+        'end': 'end',
+    }
+    RELATIONS = {'<=': 'L', '=<': 'L', '<': 'L', '>=': 'G', '=>': 'G', '>': 'G', '=': 'E'}
+
+    def __init__(self, path):
+        self._path = path
+        self._builder = _ModelBuilder()
+        self._line_number = 0
+        self._statement = []
+
+    def _error(self, message):
+        return ModelFileError(self._path, self._line_number, message)
+
+    def _tokens(self, line):
+        for match in _LP_TOKEN.finditer(line):
+            kind = match.lastgroup
+            if kind == 'other':
+                raise self._error(f'unsupported token {match.group(kind)!r} (quadratic terms and operators are not supported)')
+            yield kind, match.group(kind)
+
+    @staticmethod
+    def _is_infinity(text):
+        return text.lower() in ('inf', 'infinity')
+
+    def _signed_number(self, tokens, position):
+        '''
+        Reads [sign] number (or infinity) at position, returns the value and the next position, or None when there is none
+        '''
+        sign = 1.0
+        while position < len(tokens) and tokens[position][0] == 'sign':
+            sign = -sign if tokens[position][1] == '-' else sign
+            position += 1
+        if position < len(tokens):
+            kind, text = tokens[position]
+            if kind == 'number':
+                return sign * _number(text, self._path, self._line_number), position + 1
+            if kind == 'name' and self._is_infinity(text):
+                return sign * np.inf, position + 1
+        return None, position
+
+    def _terms(self, tokens):
+        '''
+        Parses a linear expression into (column name, coefficient) terms and a constant
+        '''
+        terms, constant = [], 0.0
+        position = 0
+        while position < len(tokens):
+            sign = 1.0
+            while position < len(tokens) and tokens[position][0] == 'sign':
+                sign = -sign if tokens[position][1] == '-' else sign
+                position += 1
+            coefficient = 1.0
+            if position < len(tokens) and tokens[position][0] == 'number':
+                coefficient = _number(tokens[position][1], self._path, self._line_number)
+                position += 1
+            if position < len(tokens) and tokens[position][0] == 'name':
+                terms.append((tokens[position][1], sign * coefficient))
+                position += 1
+            elif position == len(tokens) or tokens[position][0] == 'sign':
+                constant += sign * coefficient
+            else:
+                raise self._error(f'unexpected {tokens[position][1]!r} in an expression')
+        return terms, constant
+
+    @staticmethod
+    def _label(tokens):
+        if len(tokens) > 1 and tokens[0][0] == 'name' and tokens[1][0] == 'colon':
+            return tokens[0][1], tokens[2:]
+        return None, tokens
+
+    def _objective(self, tokens):
+        _, tokens = self._label(tokens)
+        terms, constant = self._terms(tokens)
+        builder = self._builder
+        for name, coefficient in terms:
+            builder.objective[builder.column(name)] += coefficient
+        builder.objective_constant += constant
+
+    def _is_complete(self, tokens):
+        '''
+        A constraint ends with the number after its (last) relation: `expression relation number` or `number relation expression relation number`
+        '''
+        _, tokens = self._label(tokens)
+        relations = [position for position, (kind, _) in enumerate(tokens) if kind == 'relation']
+        value, position = self._signed_number(tokens, 0)
+        is_range = value is not None and position < len(tokens) and tokens[position][0] == 'relation'
+        if len(relations) < (2 if is_range else 1):
+            return False
+        value, position = self._signed_number(tokens, relations[-1] + 1)
+        return value is not None and position == len(tokens)
+
+    def _constraint(self, tokens):
+        label, tokens = self._label(tokens)
+        builder = self._builder
+        name = label if label is not None else f'R{len(builder.row_names) + 1}'
+        if name in builder.row_indices:
+            raise self._error(f'duplicate row {name}')
+        relations = [position for position, (kind, _) in enumerate(tokens) if kind == 'relation']
+        value, _ = self._signed_number(tokens, relations[-1] + 1)
+        lower = None
+        if len(relations) == 2:
+            # lower <= expression <= upper
+            lower, _ = self._signed_number(tokens, 0)
+            if tokens[relations[0]][1] not in ('<=', '=<', '<') or tokens[relations[1]][1] not in ('<=', '=<', '<'):
+                raise self._error('a ranged constraint must be of the form lower <= expression <= upper')
+            expression = tokens[relations[0] + 1:relations[1]]
+        else:
+            expression = tokens[:relations[0]]
+        terms, constant = self._terms(expression)
+        sense = 'L' if lower is not None else self.RELATIONS[tokens[relations[0]][1]]
+        row = builder.add_row(name, sense)
+        builder.righthand_side[row] = value - constant
+        if lower is not None:
+            builder.ranges[row] = value - lower
+        for column_name, coefficient in terms:
+            builder.add_entry(row, builder.column(column_name), coefficient)
+
+    def _bound(self, tokens):
+        builder = self._builder
+        if len(tokens) == 2 and tokens[0][0] == 'name' and tokens[1][0] == 'name' and tokens[1][1].lower() == 'free':
+            column = builder.column(tokens[0][1])
+            builder.lower_bounds[column], builder.upper_bounds[column] = -np.inf, np.inf
+            return
+
+        lower, position = self._signed_number(tokens, 0)
+        if lower is not None:
+            # lower <= x [<= upper]
+            if position >= len(tokens) - 1 or tokens[position][0] != 'relation':
+                raise self._error('a bound is `x relation value`, `value relation x`, `lower <= x <= upper` or `x free`')
+            relation = tokens[position][1]
+            column_name = tokens[position + 1][1]
+            column = builder.column(column_name)
+            self._set_bound(column, {'L': 'G', 'G': 'L', 'E': 'E'}[self.RELATIONS[relation]], lower)
+            position += 2
+            if position == len(tokens):
+                return
+        else:
+            if tokens[0][0] != 'name':
+                raise self._error('a bound is `x relation value`, `value relation x`, `lower <= x <= upper` or `x free`')
+            column = builder.column(tokens[0][1])
+            position = 1
+
+        if position >= len(tokens) or tokens[position][0] != 'relation':
+            raise self._error('a bound is `x relation value`, `value relation x`, `lower <= x <= upper` or `x free`')
+        relation = self.RELATIONS[tokens[position][1]]
+        value, end = self._signed_number(tokens, position + 1)
+        if value is None or end != len(tokens):
+            raise self._error('a bound is `x relation value`, `value relation x`, `lower <= x <= upper` or `x free`')
+        self._set_bound(column, relation, value)
+
+    def _set_bound(self, column, relation, value):
+        builder = self._builder
+        if relation in ('G', 'E'):
+            builder.lower_bounds[column] = value
+        if relation in ('L', 'E'):
+            builder.upper_bounds[column] = value
+
+    def _section(self, line):
+        key = ' '.join(line.split()).lower()
+        return self.SECTIONS.get(key)
+
+    def read(self, lines):
+        section = None
+        objective = []
+        for self._line_number, line in enumerate(lines, 1):
+            line = line.split('\\', 1)[0]
+            if not line.strip():
+                continue
+            new_section = self._section(line)
+            if new_section is not None:
+                if self._statement:
+                    raise self._error('the previous constraint is incomplete')
+                if section in ('max', 'min'):
+                    self._objective(objective)
+                if new_section in ('max', 'min'):
+                    self._builder.sense = new_section
+                section = new_section
+                if section == 'end':
+                    break
+                continue
+
+            tokens = list(self._tokens(line))
+            if section in ('max', 'min'):
+                objective.extend(tokens)
+            elif section == 'constraints':
+                self._statement.extend(tokens)
+                if self._is_complete(self._statement):
+                    self._constraint(self._statement)
+                    self._statement = []
+            elif section == 'bounds':
+                self._bound(tokens)
+            elif section in ('general', 'binary'):
+                for kind, name in tokens:
+                    if kind != 'name':
+                        raise self._error(f'expected a variable name, got {name!r}')
+                    column = self._builder.column(name)
+                    if section == 'binary':
+                        self._builder.lower_bounds[column], self._builder.upper_bounds[column] = 0.0, 1.0
+            else:
+                raise self._error('expected a section (Maximize / Minimize, Subject To, Bounds, General, Binary or End)')
+
+        if self._statement:
+            raise self._error('the last constraint is incomplete')
+        if section in ('max', 'min'):
+            self._objective(objective)
+        return self._builder.build(self._path)
+
+
+def read_mps(path):
+    '''
+    Reads a (free or fixed) MPS file line by line (.gz files are decompressed on the fly), see _MpsReader
+    '''
+    with _open(path) as lines:
+        return _MpsReader(path).read(lines)
+
+
+def read_lp(path):
+    '''
+    Reads a CPLEX LP file line by line (.gz files are decompressed on the fly), see _LpReader
+    '''
+    with _open(path) as lines:
+        return _LpReader(path).read(lines)
+
+
+def _source_signature(path):
+    status = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': status.st_size, 'mtime_ns': status.st_mtime_ns}
+
+
+def save_cache(model, path, source=None):
+    '''
+    Saves the model as a directory of .npy arrays (the lefthand-side in CSC form) and a meta.json,
+    so load_cache can memory-map it instead of parsing the file again.
+    source is the model's file, whose size and modification time are recorded to tell if the cache is stale.
+    '''
+    linear_program = model.linear_program
+    lefthand_side = scipy.sparse.csc_matrix(linear_program.lefthand_side)
+    os.makedirs(path, exist_ok=True)
+    arrays = {
+        'data': lefthand_side.data, 'indices': lefthand_side.indices, 'indptr': lefthand_side.indptr,
+        'objective_function': linear_program.objective_function, 'righthand_side': linear_program.righthand_side,
+        'column_signs': model._column_signs, 'column_shifts': model._column_shifts, 'free_columns': model._free_columns,
+    }
+    if linear_program.lower_bounds is not None:
+        arrays['lower_bounds'] = linear_program.lower_bounds
+    if linear_program.upper_bounds is not None:
+        arrays['upper_bounds'] = linear_program.upper_bounds
+    for name, values in arrays.items():
+        np.save(os.path.join(path, f'{name}.npy'), np.asarray(values))
+
+    meta = {
+        'version': CACHE_VERSION,
+        'name': model.name,
+        'shape': list(lefthand_side.shape),
+        'sense': model.sense,
+        'objective_constant': model.objective_constant,
+        'variable_names': model.variable_names,
+        'constraint_names': model.constraint_names,
+        'arrays': sorted(arrays),
+        'source': _source_signature(source) if source is not None else None,
+    }
+    # written last, so an interrupted save leaves no valid cache
+    with open(os.path.join(path, 'meta.json'), 'w') as meta_file:
+        json.dump(meta, meta_file)
+
+
+def _load_meta(path):
+    try:
+        with open(os.path.join(path, 'meta.json')) as meta_file:
+            meta = json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == CACHE_VERSION else None
+
+
+def load_cache(path, mmap=True):
+    '''
+    Loads a model saved by save_cache, the arrays are memory-mapped (read only) unless mmap is False
+    '''
+    meta = _load_meta(path)
+    if meta is None:
+        raise ModelFileError(path, None, f'not a model cache (of version {CACHE_VERSION})')
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None) for name in meta['arrays']}
+    lefthand_side = scipy.sparse.csc_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=tuple(meta['shape']), copy=False)
+    linear_program = StandardLinearProgram(arrays['objective_function'], lefthand_side, arrays['righthand_side'],
+                                           arrays.get('lower_bounds'), arrays.get('upper_bounds'))
+    return Model(meta['name'], linear_program, meta['sense'], meta['objective_constant'], meta['variable_names'], meta['constraint_names'],
+                 arrays['column_signs'], arrays['column_shifts'], arrays['free_columns'])
+
+
+def is_cache_fresh(cache_path, source):
+    meta = _load_meta(cache_path)
+    return meta is not None and meta['source'] == _source_signature(source)
+
+
+def read_model(path, cache_path=None, mmap=True):
+    '''
+    Reads an MPS or LP file (by its extension: .mps, .lp, optionally followed by .gz).
+    With a cache_path the model is loaded from the cache when it was saved from the same (unmodified) file, otherwise the file is read and cached.
+    '''
+    if cache_path is not None and is_cache_fresh(cache_path, path):
+        return load_cache(cache_path, mmap)
+
+    extension = str(path)[:-len('.gz')] if str(path).endswith('.gz') else str(path)
+    extension = os.path.splitext(extension)[1].lower()
+    if extension not in ('.mps', '.lp'):
+        raise ModelFileError(path, None, 'model files must be .mps or .lp (optionally .gz)')
+    model = read_mps(path) if extension == '.mps' else read_lp(path)
+    if cache_path is not None:
+        save_cache(model, cache_path, source=path)
+        if mmap:
+            return load_cache(cache_path, mmap)
+    return model
+
+
+def write_mps(linear_program, path, name=None):
+    '''
+    Writes the linear program (max c^T x s.t. A x <= b, l <= x <= u) as a free MPS file, line by line
+    '''
+    lefthand_side = scipy.sparse.csc_matrix(linear_program.lefthand_side)
+    objective_function = np.asarray(linear_program.objective_function, dtype=np.float64)
+    with _open(path, 'wt') as output:
+        output.write(f'NAME {name or "model"}\nOBJSENSE\n    MAX\nROWS\n N obj\n')
+        for row in range(linear_program.constraints_count):
+            output.write(f' L R{row}\n')
+        output.write('COLUMNS\n')
+        for column in range(linear_program.variables_count):
+            start, end = lefthand_side.indptr[column], lefthand_side.indptr[column + 1]
+            if objective_function[column] != 0:
+                output.write(f' X{column} obj {float(objective_function[column])!r}\n')
+            for row, value in zip(lefthand_side.indices[start:end], lefthand_side.data[start:end]):
+                output.write(f' X{column} R{row} {float(value)!r}\n')
+            if start == end and objective_function[column] == 0:
+                # keeps the column declared
+                output.write(f' X{column} obj 0\n')
+        output.write('RHS\n')
+        for row, value in enumerate(np.asarray(linear_program.righthand_side, dtype=np.float64)):
+            if value != 0:
+                output.write(f' RHS R{row} {float(value)!r}\n')
+        output.write('BOUNDS\n')
+        lower_bounds, upper_bounds = linear_program.get_lower_bounds(), linear_program.get_upper_bounds()
+        for column in range(linear_program.variables_count):
+            if lower_bounds[column] == upper_bounds[column]:
+                output.write(f' FX BND X{column} {float(lower_bounds[column])!r}\n')
+                continue
+            if lower_bounds[column] != 0:
+                output.write(f' LO BND X{column} {float(lower_bounds[column])!r}\n')
+            if np.isfinite(upper_bounds[column]):
+                output.write(f' UP BND X{column} {float(upper_bounds[column])!r}\n')
+        output.write('ENDATA\n')
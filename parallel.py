@@ -0,0 +1,192 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+import os
+import time
+import numpy as np
+import scipy.sparse
+import exceptions
+from linear_program import LinearProgramSolver, StandardLinearProgram
+
+_ALIGNMENT = 8
+
+
+class ParallelResult(object):
+    def __init__(self, index, result, solve_time, latency):
+        # index of the linear program in the solved sequence
+        self.index = index
+        # Solution if optimal, otherwise the SimplexError describing its status
+        self.result = result
+        # seconds spent solving in the worker
+        self.solve_time = solve_time
+        # seconds since the batch was submitted until the result was received
+        self.latency = latency
+
+
+class ParallelProfile(object):
+    def __init__(self, results, wall_time, workers):
+        solve_times = np.array([result.solve_time for result in results])
+        latencies = np.array([result.latency for result in results])
+        self.problems_count = len(results)
+        self.workers = workers
+        self.wall_time = wall_time
+        self.throughput = self.problems_count / wall_time if wall_time > 0 else 0.0
+        self.mean_solve_time = solve_times.mean() if len(results) else 0.0
+        self.latency_percentiles = dict(zip((50, 95, 99, 100), np.percentile(latencies, (50, 95, 99, 100)) if len(results) else (0.0,) * 4))
+
+    def __str__(self):
+        percentiles = ', '.join(f'p{percentile} = {latency * 1000:.2f}ms' for percentile, latency in self.latency_percentiles.items())
+        return f'''Solved {self.problems_count} problems with {self.workers} workers in {self.wall_time:.3f}s
+Throughput: {self.throughput:.1f} problems/s
+Mean solve time: {self.mean_solve_time * 1000:.2f}ms
+Latency: {percentiles}
+'''
+
+
+def _aligned(size):
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _program_arrays(linear_program):
+    arrays = {
+        'objective_function': np.asarray(linear_program.objective_function, dtype=np.float64),
+        'righthand_side': np.asarray(linear_program.righthand_side, dtype=np.float64),
+    }
+    if linear_program.is_sparse:
+        lefthand_side = linear_program.lefthand_side
+        arrays.update(data=lefthand_side.data, indices=lefthand_side.indices, indptr=lefthand_side.indptr)
+    else:
+        arrays['lefthand_side'] = np.asarray(linear_program.lefthand_side, dtype=np.float64)
+    if linear_program.lower_bounds is not None:
+        arrays['lower_bounds'] = linear_program.lower_bounds
+    if linear_program.upper_bounds is not None:
+        arrays['upper_bounds'] = linear_program.upper_bounds
+    return arrays
+
+
+def _share_programs(linear_programs):
+    '''
+    Copies the linear programs arrays into a single shared memory block.
+    Returns the shared memory and a layout per program: (index, shape, {name: (offset, shape, dtype)})
+    '''
+    programs_arrays = [_program_arrays(linear_program) for linear_program in linear_programs]
+    total_size = sum(_aligned(array.nbytes) for arrays in programs_arrays for array in arrays.values())
+    shared_memory = SharedMemory(create=True, size=max(total_size, 1))
+
+    layouts = []
+    offset = 0
+    for index, (linear_program, arrays) in enumerate(zip(linear_programs, programs_arrays)):
+        array_layouts = {}
+        for name, array in arrays.items():
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shared_memory.buf, offset=offset)[...] = array
+            array_layouts[name] = (offset, array.shape, array.dtype.str)
+            offset += _aligned(array.nbytes)
+        layouts.append((index, linear_program.lefthand_side.shape, array_layouts))
+
+    return shared_memory, layouts
+
+
+def _attach_program(buffer, shape, array_layouts):
+    arrays = {name: np.ndarray(array_shape, dtype=dtype, buffer=buffer, offset=offset)
+              for name, (offset, array_shape, dtype) in array_layouts.items()}
+    if 'lefthand_side' in arrays:
+        lefthand_side = arrays['lefthand_side']
+    else:
+        lefthand_side = scipy.sparse.csc_matrix((arrays['data'], arrays['indices'], arrays['indptr']), shape=shape, copy=False)
+    return StandardLinearProgram(arrays['objective_function'], lefthand_side, arrays['righthand_side'],
+                                 arrays.get('lower_bounds'), arrays.get('upper_bounds'))
+
+
+def _solve_shared(buffer, layout, pivot_strategy, max_iterations, engine):
+    index, shape, array_layouts = layout
+    start = time.perf_counter()
+    try:
+        result = LinearProgramSolver.solve_simplex(
+            _attach_program(buffer, shape, array_layouts), pivot_strategy=pivot_strategy, max_iterations=max_iterations, engine=engine)
+    except exceptions.SimplexError as error:
+        # the traceback frames reference the shared arrays, which must be released before detaching
+        result = error.with_traceback(None)
+    return index, result, time.perf_counter() - start
+
+
+def _solve_chunk(shared_memory_name, layouts, pivot_strategy, max_iterations, engine):
+    shared_memory = SharedMemory(name=shared_memory_name)
+    try:
+        return [_solve_shared(shared_memory.buf, layout, pivot_strategy, max_iterations, engine) for layout in layouts]
+    finally:
+        shared_memory.close()
+
+
+class ParallelSolver(object):
+    '''
+    Solves many linear programs on a pool of worker processes.
+
+    The linear programs arrays are placed in shared memory, so workers read them without pickling copies,
+    and the pool is kept warm between solve_many calls until the solver is closed.
+    A linear program which raises SimplexError comes back as its result (see ParallelResult) instead of failing the run.
+    '''
+    DEFAULT_CHUNKS_PER_WORKER = 4
+
+    def __init__(self, workers=None, pivot_strategy=None, max_iterations=None, engine=None, chunk_size=None):
+        if workers is None:
+            workers = os.cpu_count()
+
+        self._workers = workers
+        self._pivot_strategy = pivot_strategy
+        self._max_iterations = max_iterations
+        self._engine = engine
+        self._chunk_size = chunk_size
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        # profile of the last solve_many run
+        self.profile = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown()
+
+    def _get_chunk_size(self, problems_count):
+        if self._chunk_size is not None:
+            return self._chunk_size
+        return max(1, problems_count // (self._workers * self.DEFAULT_CHUNKS_PER_WORKER))
+
+    def solve_many(self, linear_programs):
+        '''
+        Yields a ParallelResult per linear program, in completion order
+        '''
+        linear_programs = list(linear_programs)
+        start = time.perf_counter()
+        shared_memory, layouts = _share_programs(linear_programs)
+        results = []
+        futures = []
+        try:
+            chunk_size = self._get_chunk_size(len(layouts))
+            futures = [
+                self._executor.submit(_solve_chunk, shared_memory.name, layouts[i: i + chunk_size], self._pivot_strategy, self._max_iterations, self._engine)
+                for i in range(0, len(layouts), chunk_size)]
+            for future in as_completed(futures):
+                latency = time.perf_counter() - start
+                for index, result, solve_time in future.result():
+                    parallel_result = ParallelResult(index, result, solve_time, latency)
+                    results.append(parallel_result)
+                    yield parallel_result
+        finally:
+            # when the caller stops early there is no point solving the rest
+            for future in futures:
+                future.cancel()
+            shared_memory.close()
+            shared_memory.unlink()
+
+        self.profile = ParallelProfile(results, time.perf_counter() - start, self._workers)
+
+
+def solve_many(linear_programs, workers=None, pivot_strategy=None, max_iterations=None, engine=None):
+    '''
+    Yields a ParallelResult per linear program, in completion order, using a pool for this call only.
+    Keep a ParallelSolver to reuse the warm pool between calls and to read the run profile.
+    '''
+    with ParallelSolver(workers, pivot_strategy, max_iterations, engine) as solver:
+        yield from solver.solve_many(linear_programs)
@@ -0,0 +1,63 @@
+import numpy as np
+import exceptions
+
+
+class Perturbation(object):
+    '''
+    Relaxes every constraint by a small random amount, so the vertices of a degenerate linear program are no longer degenerate:
+    b'_i = b_i + size * (1 + |b_i|) * r_i where r_i is uniform in [1, 2], so every shift is bounded relative to its righthand side.
+    The perturbed linear program is solved first and its optimal basis warm starts the original linear program (the cleanup).
+    The basic values move back by at most the shifts, so the basis stays primal feasible or needs a few dual simplex pivots,
+    the objective function is the same so it stays dual feasible.
+    '''
+    DEFAULT_SIZE = 1e-6
+    # the shifts are random but reproducible
+    SEED = 0
+
+    def __init__(self, size, shifts):
+        self.size = size
+        self.shifts = shifts
+        # the pivots of the perturbed solve and of the cleanup (set by solve)
+        self.pivots_count = None
+        self.cleanup_pivots_count = None
+
+    def perturb(self, linear_program):
+        '''
+        Returns a copy of the linear program whose righthand side is shifted (the lefthand side and bounds are shared)
+        '''
+        return type(linear_program)(linear_program.objective_function, linear_program.lefthand_side, linear_program.righthand_side + self.shifts,
+                                    linear_program.lower_bounds, linear_program.upper_bounds)
+
+    def solve(self, solver, linear_program, sensitivity=False):
+        '''
+        Solves the perturbed linear program and cleans up with the original one, the pivots count is of both solves.
+        A perturbed linear program is a relaxation, so when it's unbounded the original one may be infeasible, which is found by solving it from scratch.
+        The sensitivity analysis (see Simplex.solve) is of the original linear program.
+        '''
+        try:
+            perturbed_solution = solver.solve(self.perturb(linear_program))
+        except exceptions.SimplexProblemUnboundedError:
+            return solver.solve(linear_program, sensitivity=sensitivity)
+
+        solution = solver.solve(linear_program, perturbed_solution.basis, sensitivity)
+        self.pivots_count = perturbed_solution.iterations_count
+        self.cleanup_pivots_count = solution.iterations_count
+        solution.iterations_count += perturbed_solution.iterations_count
+        solution.degenerate_iterations_count += perturbed_solution.degenerate_iterations_count
+        solution.bound_flips_count += perturbed_solution.bound_flips_count
+        solution.perturbation = self
+        return solution
+
+    def __str__(self):
+        return (f'The righthand side was perturbed by up to {np.max(self.shifts, initial=0):.3g}, '
+                f'{self.pivots_count} pivots were perturbed and {self.cleanup_pivots_count} cleaned up')
+
+
+def perturbation(linear_program, size=None):
+    if size is None:
+        size = Perturbation.DEFAULT_SIZE
+    assert size > 0, 'perturbation size must be positive'
+
+    rng = np.random.default_rng(Perturbation.SEED)
+    righthand_side = np.asarray(linear_program.righthand_side, dtype=np.float64)
+    return Perturbation(size, size * (1 + np.abs(righthand_side)) * rng.uniform(1, 2, len(righthand_side)))
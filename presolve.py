@@ -0,0 +1,364 @@
+import numpy as np
+import scipy.sparse
+import exceptions
+from solution import Basis
+from utils import array
+
+
+def _flat(values):
+    if scipy.sparse.issparse(values):
+        values = values.toarray()
+    return np.asarray(values).ravel()
+
+
+def _extremes(lefthand_side, axis):
+    '''
+    Returns the minimum and maximum of the lefthand-side along axis (including its zeros)
+    '''
+    if lefthand_side.shape[axis] == 0:
+        return np.zeros(lefthand_side.shape[1 - axis]), np.zeros(lefthand_side.shape[1 - axis])
+    return _flat(lefthand_side.min(axis=axis)), _flat(lefthand_side.max(axis=axis))
+
+
+class _RemovedRowsAndColumns(object):
+    '''
+    Rows removed from the linear program, and columns removed with their variables fixed at zero
+    '''
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+
+
+class _ShiftedColumns(object):
+    '''
+    Singleton rows a_ij x_j <= b_i with a_ij < 0 removed (or the lower bounds, with no rows),
+    their columns substituted by x_j = values + x'_j (x'_j >= 0)
+    '''
+    def __init__(self, rows, columns, values):
+        self.rows = rows
+        self.columns = columns
+        self.values = values
+
+
+class _UpperBoundRows(object):
+    '''
+    Singleton rows a_ij x_j <= b_i with a_ij > 0 removed, which tightened the upper bounds of their columns to b_i / a_ij
+    '''
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+
+
+class _FixedColumns(object):
+    '''
+    Columns removed with their variables fixed at their (finite) upper bounds
+    '''
+    def __init__(self, columns, values):
+        self.rows = []
+        self.columns = columns
+        self.values = values
+
+
+class Postsolve(object):
+    '''
+    The stack of the reductions applied by presolve (rows and columns are original 0-based indices).
+    Maps a solution of the reduced linear program back to the original linear program.
+    '''
+    def __init__(self, constraints_count, variables_count):
+        self.constraints_count = constraints_count
+        self.variables_count = variables_count
+        # the original indices of the rows and columns which are left in the reduced linear program
+        self.rows = np.arange(constraints_count)
+        self.columns = np.arange(variables_count)
+        # the objective value of the original linear program at the origin of the reduced one
+        self.objective_constant = 0.0
+        self._reductions = []
+
+    @property
+    def removed_rows_count(self):
+        return self.constraints_count - len(self.rows)
+
+    @property
+    def removed_columns_count(self):
+        return self.variables_count - len(self.columns)
+
+    def push(self, reduction):
+        self._reductions.append(reduction)
+        removed_rows = np.isin(self.rows, reduction.rows)
+        self.rows = self.rows[~removed_rows]
+        if isinstance(reduction, (_RemovedRowsAndColumns, _FixedColumns)):
+            self.columns = self.columns[~np.isin(self.columns, reduction.columns)]
+
+    def _postsolve_basis(self, basis):
+        '''
+        The removed rows' slack variables are basic, except for the shifted columns' rows and the upper bound rows,
+        whose columns are basic (if not already basic) when the rows are tight, that is x_j is non-basic at the row's bound
+        '''
+        variables_count = self.variables_count
+        basic_variables = np.arange(variables_count + 1, variables_count + self.constraints_count + 1)
+        reduced_variables_count = len(self.columns)
+        reduced = basis.basic_variables
+        real = reduced <= reduced_variables_count
+        basic_variables[self.rows[real]] = self.columns[reduced[real] - 1] + 1
+        basic_variables[self.rows[~real]] = variables_count + self.rows[reduced[~real] - reduced_variables_count - 1] + 1
+
+        is_basic = np.zeros(variables_count + self.constraints_count + 1, dtype=bool)
+        is_basic[basic_variables] = True
+        is_upper_bounded = np.zeros(variables_count + 1, dtype=bool)
+        is_upper_bounded[self.columns[basis.upper_bounded_variables - 1] + 1] = True
+        for reduction in reversed(self._reductions):
+            if isinstance(reduction, _FixedColumns):
+                is_upper_bounded[reduction.columns + 1] = True
+            if not isinstance(reduction, (_ShiftedColumns, _UpperBoundRows)):
+                continue
+            # a shifted column's row is tight at the lower bound, an upper bound row at the upper bound
+            at_bound = isinstance(reduction, _UpperBoundRows)
+            for row, column in zip(reduction.rows, reduction.columns):
+                if not is_basic[column + 1] and is_upper_bounded[column + 1] == at_bound:
+                    is_basic[basic_variables[row]] = False
+                    basic_variables[row] = column + 1
+                    is_basic[column + 1] = True
+                    is_upper_bounded[column + 1] = False
+
+        return Basis(basic_variables, self.constraints_count, variables_count, np.flatnonzero(is_upper_bounded))
+
+    def postsolve(self, solution):
+        '''
+        Maps the solution of the reduced linear program (in place) to the original linear program
+        '''
+        values = np.zeros(self.variables_count)
+        values[self.columns] = solution.solution
+        for reduction in reversed(self._reductions):
+            # removed columns are fixed at zero, there is nothing to add
+            if isinstance(reduction, (_ShiftedColumns, _FixedColumns)):
+                values[reduction.columns] += reduction.values
+
+        solution.solution = values
+        solution.objective_value += self.objective_constant
+        if solution.basis is not None:
+            solution.basis = self._postsolve_basis(solution.basis)
+        solution.presolve = self
+        return solution
+
+    def __str__(self):
+        return f'Presolve removed {self.removed_rows_count} rows and {self.removed_columns_count} columns'
+
+
+class Presolver(object):
+    '''
+    Reduces max c^T x s.t. A x <= b, l <= x <= u (recording the reductions in a Postsolve stack) until no reduction applies.
+    The lower bounds are shifted to zero first, then:
+    - rows whose coefficients are all non-negative: infeasible if b_i < 0, forcing if b_i = 0 (the row's variables are fixed at zero)
+    - rows whose coefficients are all non-positive and b_i >= 0 are redundant (including the empty rows)
+    - singleton rows a_ij x_j <= b_i with a_ij, b_i < 0 are lower bounds, x_j is shifted by b_i / a_ij
+    - singleton rows a_ij x_j <= b_i with a_ij, b_i > 0 are upper bounds, u_j is tightened to b_i / a_ij
+    - columns whose coefficients are all non-negative with c_j <= 0 are dominated, x_j is fixed at zero (including the empty columns)
+    - columns whose coefficients are all non-positive with c_j > 0 are fixed at u_j, or unbounded when u_j is infinite and the origin is feasible
+    - duplicate rows (positive multiples of each other), only the tightest of them is kept
+    '''
+    _TOLERANCE = 1e-9
+    # normalized rows are compared after rounding to this many decimals
+    _DUPLICATE_DECIMALS = 12
+
+    def __init__(self, linear_program):
+        self._postsolve = Postsolve(linear_program.constraints_count, linear_program.variables_count)
+        self._objective_function = np.asarray(linear_program.objective_function, dtype=np.float64)
+        self._lefthand_side = linear_program.lefthand_side
+        if linear_program.is_sparse:
+            # explicit zeros would count as coefficients
+            self._lefthand_side = self._lefthand_side.copy()
+            self._lefthand_side.eliminate_zeros()
+        self._righthand_side = array(linear_program.righthand_side)
+        self._is_sparse = linear_program.is_sparse
+        self._upper_bounds = linear_program.get_upper_bounds().copy()
+        if linear_program.lower_bounds is not None:
+            # copied since the Postsolve stack outlives the linear program (which may be in shared memory, see parallel.py)
+            self._shift_columns([], np.arange(linear_program.variables_count), linear_program.lower_bounds.copy())
+
+    def _shift_columns(self, rows, columns, values):
+        '''
+        Substitutes x_j = values + x'_j and removes the rows (indices of the current reduced linear program)
+        '''
+        postsolve = self._postsolve
+        self._righthand_side -= _flat(self._lefthand_side[:, columns] @ values)
+        self._upper_bounds[columns] -= values
+        if np.any(self._upper_bounds[columns] < -self._TOLERANCE):
+            raise exceptions.SimplexProblemInfeasibleError()
+        np.maximum(self._upper_bounds, 0, out=self._upper_bounds)
+        postsolve.objective_constant += self._objective_function[columns] @ values
+        postsolve.push(_ShiftedColumns(postsolve.rows[rows], postsolve.columns[columns], values))
+        self._remove_rows(rows)
+
+    def _remove_rows(self, rows):
+        kept_rows = np.ones(self._lefthand_side.shape[0], dtype=bool)
+        kept_rows[rows] = False
+        self._lefthand_side = self._lefthand_side[kept_rows]
+        self._righthand_side = self._righthand_side[kept_rows]
+
+    def _remove(self, rows, columns):
+        '''
+        rows and columns are indices of the current reduced linear program
+        '''
+        postsolve = self._postsolve
+        postsolve.push(_RemovedRowsAndColumns(postsolve.rows[rows], postsolve.columns[columns]))
+        kept_rows = np.ones(self._lefthand_side.shape[0], dtype=bool)
+        kept_rows[rows] = False
+        kept_columns = np.ones(self._lefthand_side.shape[1], dtype=bool)
+        kept_columns[columns] = False
+        self._lefthand_side = self._lefthand_side[kept_rows][:, kept_columns]
+        self._righthand_side = self._righthand_side[kept_rows]
+        self._objective_function = self._objective_function[kept_columns]
+        self._upper_bounds = self._upper_bounds[kept_columns]
+
+    def _reduce_rows(self):
+        row_min, row_max = _extremes(self._lefthand_side, 1)
+        non_negative = row_min >= 0
+        if np.any(non_negative & (self._righthand_side < -self._TOLERANCE)):
+            raise exceptions.SimplexProblemInfeasibleError()
+
+        # a positive b_i leaves room however small it is (tiny-scale linear programs), only b_i within the tolerance below zero is forcing
+        forcing = non_negative & (self._righthand_side <= 0)
+        redundant = ~forcing & (row_max <= 0) & (self._righthand_side >= 0)
+        rows = np.flatnonzero(forcing | redundant)
+        if len(rows) == 0:
+            return False
+
+        forced_columns = []
+        if forcing.any() and self._lefthand_side.shape[1] > 0:
+            forced_columns = np.flatnonzero(_flat(abs(self._lefthand_side[np.flatnonzero(forcing)]).max(axis=0)))
+        self._remove(rows, forced_columns)
+        return True
+
+    def _singleton_rows(self, rows_filter):
+        '''
+        Returns the singleton rows among the filtered rows, with their columns and coefficients
+        '''
+        if self._lefthand_side.shape[1] == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int), np.zeros(0)
+        if self._is_sparse:
+            nonzeros = self._lefthand_side.getnnz(axis=1)
+        else:
+            nonzeros = np.count_nonzero(self._lefthand_side, axis=1)
+        rows = np.flatnonzero((nonzeros == 1) & rows_filter)
+        columns = _flat(abs(self._lefthand_side[rows]).argmax(axis=1)).astype(int)
+        return rows, columns, _flat(self._lefthand_side[rows, columns])
+
+    def _shift_singleton_rows(self):
+        rows, columns, coefficients = self._singleton_rows(self._righthand_side < 0)
+        lower_bounds = rows[coefficients < 0]
+        if len(lower_bounds) == 0:
+            return False
+
+        columns, values = columns[coefficients < 0], self._righthand_side[lower_bounds] / coefficients[coefficients < 0]
+        # a column is shifted once per pass by its tightest lower bound, the others become redundant
+        order = np.argsort(-values, kind='stable')
+        _, first = np.unique(columns[order], return_index=True)
+        chosen = order[first]
+        self._shift_columns(lower_bounds[chosen], columns[chosen], values[chosen])
+        return True
+
+    def _bound_singleton_rows(self):
+        rows, columns, coefficients = self._singleton_rows(self._righthand_side > 0)
+        upper_bounds = rows[coefficients > 0]
+        if len(upper_bounds) == 0:
+            return False
+
+        columns, values = columns[coefficients > 0], self._righthand_side[upper_bounds] / coefficients[coefficients > 0]
+        # the tightest row of every column sets its upper bound, unless the column's bound is already tighter
+        order = np.argsort(values, kind='stable')
+        _, first = np.unique(columns[order], return_index=True)
+        chosen = order[first]
+        tightening = values[chosen] < self._upper_bounds[columns[chosen]]
+        rows, columns = upper_bounds[chosen[tightening]], columns[chosen[tightening]]
+        self._upper_bounds[columns] = values[chosen[tightening]]
+
+        postsolve = self._postsolve
+        # the other rows are redundant
+        redundant = np.ones(len(values), dtype=bool)
+        redundant[chosen[tightening]] = False
+        redundant_rows = postsolve.rows[upper_bounds[redundant]]
+        postsolve.push(_UpperBoundRows(postsolve.rows[rows], postsolve.columns[columns]))
+        postsolve.push(_RemovedRowsAndColumns(redundant_rows, []))
+        self._remove_rows(upper_bounds)
+        return True
+
+    def _reduce_columns(self):
+        column_min, column_max = _extremes(self._lefthand_side, 0)
+        improving = (column_max <= 0) & (self._objective_function > self._TOLERANCE)
+        bounded = np.isfinite(self._upper_bounds)
+        if np.any(improving & ~bounded) and np.all(self._righthand_side >= -self._TOLERANCE):
+            # the origin is feasible and x_j can grow without violating any constraint
+            raise exceptions.SimplexProblemUnboundedError()
+
+        columns = np.flatnonzero(improving & bounded)
+        if len(columns) > 0:
+            # growing x_j only loosens the constraints and improves the objective function, up to its upper bound
+            postsolve = self._postsolve
+            values = self._upper_bounds[columns]
+            self._righthand_side -= _flat(self._lefthand_side[:, columns] @ values)
+            postsolve.objective_constant += self._objective_function[columns] @ values
+            postsolve.push(_FixedColumns(postsolve.columns[columns], values))
+            kept_columns = np.ones(self._lefthand_side.shape[1], dtype=bool)
+            kept_columns[columns] = False
+            self._lefthand_side = self._lefthand_side[:, kept_columns]
+            self._objective_function = self._objective_function[kept_columns]
+            self._upper_bounds = self._upper_bounds[kept_columns]
+            return True
+
+        columns = np.flatnonzero((column_min >= 0) & (self._objective_function <= 0))
+        if len(columns) == 0:
+            return False
+
+        self._remove([], columns)
+        return True
+
+    def _remove_duplicate_rows(self):
+        if self._lefthand_side.shape[0] < 2 or self._lefthand_side.shape[1] == 0:
+            return False
+        if self._is_sparse:
+            norms = np.sqrt(_flat(self._lefthand_side.multiply(self._lefthand_side).sum(axis=1)))
+        else:
+            norms = np.linalg.norm(self._lefthand_side, axis=1)
+        if np.any(norms == 0):
+            # removing columns left empty rows, which are reduced on the next pass
+            return False
+
+        if self._is_sparse:
+            rows = scipy.sparse.csr_matrix(scipy.sparse.diags(1 / norms) @ self._lefthand_side)
+            rows.sort_indices()
+            group_ids = {}
+            groups = np.array([
+                group_ids.setdefault((rows.indices[start: end].tobytes(), np.round(rows.data[start: end], self._DUPLICATE_DECIMALS).tobytes()), len(group_ids))
+                for start, end in zip(rows.indptr[:-1], rows.indptr[1:])])
+        else:
+            _, groups = np.unique(np.round(self._lefthand_side / norms[:, np.newaxis], self._DUPLICATE_DECIMALS), axis=0, return_inverse=True)
+        groups = groups.ravel()
+        if len(np.unique(groups)) == len(groups):
+            return False
+
+        # keep the row with the tightest normalized righthand-side of every group
+        order = np.lexsort((self._righthand_side / norms, groups))
+        _, first = np.unique(groups[order], return_index=True)
+        duplicates = np.ones(len(groups), dtype=bool)
+        duplicates[order[first]] = False
+        self._remove(np.flatnonzero(duplicates), [])
+        return True
+
+    def presolve(self):
+        '''
+        Returns the reduced linear program and the Postsolve stack which maps its solution back.
+        Raises SimplexProblemInfeasibleError / SimplexProblemUnboundedError when detected.
+        '''
+        reductions = (self._reduce_rows, self._shift_singleton_rows, self._bound_singleton_rows, self._reduce_columns, self._remove_duplicate_rows)
+        while any([reduction() for reduction in reductions]):
+            pass
+
+        # imported here since linear_program solves with the presolver
+        from linear_program import StandardLinearProgram
+        upper_bounds = self._upper_bounds if np.any(np.isfinite(self._upper_bounds)) else None
+        reduced_program = StandardLinearProgram(self._objective_function, self._lefthand_side, self._righthand_side, upper_bounds=upper_bounds)
+        return reduced_program, self._postsolve
+
+
+def presolve(linear_program):
+    return Presolver(linear_program).presolve()
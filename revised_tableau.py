@@ -0,0 +1,462 @@
+from contextlib import contextmanager
+import numpy as np
+import scipy.linalg
+import scipy.sparse
+import scipy.sparse.linalg
+from solution import Basis
+from utils import zeros, ones
+
+class BasisFactorization(object):
+    '''
+    Keeps B^-1 of the basis matrix as an LU factorization of the last refactorized basis (B_0) followed by an eta file:
+        B = B_0 * E_1 * ... * E_k
+    Each E_i is the identity matrix with a single column replaced by the entering column (B_(i-1)^-1 * a_q) at the leaving position.
+    '''
+
+    DEFAULT_REFACTORIZATION_INTERVAL = 50
+
+    def __init__(self, basis_matrix, refactorization_interval=None):
+        if refactorization_interval is None:
+            refactorization_interval = self.DEFAULT_REFACTORIZATION_INTERVAL
+
+        self._refactorization_interval = refactorization_interval
+        self.refactorize(basis_matrix)
+
+    @property
+    def should_refactorize(self):
+        return len(self._etas) >= self._refactorization_interval
+
+    def refactorize(self, basis_matrix):
+        '''
+        A sparse basis matrix is factorized with SuperLU, otherwise with a dense LU
+        '''
+        if scipy.sparse.issparse(basis_matrix):
+            self._sparse_lu = scipy.sparse.linalg.splu(scipy.sparse.csc_matrix(basis_matrix))
+            self._dense_lu = None
+        else:
+            self._sparse_lu = None
+            self._dense_lu = scipy.linalg.lu_factor(basis_matrix, check_finite=False)
+        self._etas = []
+
+    def _solve(self, vector, transposed):
+        '''
+        Solves B_0 * x = vector (or B_0^T * x = vector)
+        '''
+        if self._sparse_lu is not None:
+            return self._sparse_lu.solve(vector, trans='T' if transposed else 'N')
+        return scipy.linalg.lu_solve(self._dense_lu, vector, trans=1 if transposed else 0, check_finite=False)
+
+    def update(self, position, entering_column):
+        '''
+        Replaces the basis column at position (0-based) by the column whose transformed column (B^-1 * a_q) is entering_column
+        '''
+        self._etas.append((position, entering_column.copy()))
+
+    def ftran(self, vector):
+        '''
+        Returns B^-1 * vector
+        '''
+        result = self._solve(np.asarray(vector, dtype=np.float64), False)
+        for position, eta_column in self._etas:
+            pivot_value = result[position] / eta_column[position]
+            result -= pivot_value * eta_column
+            result[position] = pivot_value
+
+        return result
+
+    def btran(self, vector):
+        '''
+        Returns (B^-1)^T * vector
+        '''
+        result = np.array(vector, dtype=np.float64)
+        for position, eta_column in reversed(self._etas):
+            pivot_value = result[position]
+            result[position] = 0
+            result[position] = (pivot_value - eta_column @ result) / eta_column[position]
+
+        return self._solve(result, True)
+
+
+class RevisedTableau(object):
+    '''
+    Revised simplex engine exposing the same interface as the dense tableau.
+
+    Instead of the whole tableau only the constraints matrix, the basis factorization and the basic variables values are kept.
+    Rows and columns of the tableau are computed on demand:
+        - objective function coefficients (reduced costs): c_j - (c_B * B^-1) * a_j
+        - column j: B^-1 * a_j
+        - basic values: B^-1 * b
+
+    The variables indices (1-based) and the basic/tight variables lists are the same as in the dense tableau:
+    real variables, then slack variables and the artificial variable while it is used.
+
+    A sparse (scipy.sparse) lefthand-side is kept sparse: the slack and artificial columns are never materialized,
+    pricing is a sparse matrix-vector product and the basis is factorized with a sparse LU.
+
+    Bounds are handled like in the dense tableau: the righthand-side is shifted by the lower bounds, and a complemented variable
+    (replaced by u - x, see flip_bound) has its column and cost negated by its sign, and the righthand-side shifted by its upper bound.
+    '''
+
+    _VARIABLES_COL_START_INDEX = 1
+    # a pivot whose leaving variable value is within this tolerance of zero is counted as degenerate,
+    # relative to the biggest basic value when it's smaller than 1 so tiny-scale linear programs aren't all degenerate
+    _DEGENERATE_STEP_TOLERANCE = 1e-9
+    is_exact = False
+
+    def __init__(self, linear_program, refactorization_interval=None):
+        self._lefthand_side = linear_program.lefthand_side
+        self._righthand_side = np.asarray(linear_program.righthand_side, dtype=np.float64)
+        self._lower_bounds = linear_program.get_lower_bounds()
+        if linear_program.lower_bounds is not None:
+            self._righthand_side = self._righthand_side - self._lefthand_side @ self._lower_bounds
+        self._objective_function = linear_program.objective_function
+        self._constraints_count = linear_program.constraints_count
+        self._real_variables_count = linear_program.variables_count
+        self._variables_count = self._constraints_count + self._real_variables_count
+        self._using_artificial_variable = False
+        self.should_initialize = min(self._righthand_side, default=0) < 0
+        self.pivots_count = 0
+        # pivots which didn't change the basic values (zero step)
+        self.degenerate_pivots_count = 0
+        # non-basic variables moved between their bounds (see flip_bound)
+        self.bound_flips_count = 0
+
+        # the upper bounds (of x - l) of all variables including the free variable, and the variables signs (-1 if complemented)
+        self._upper_bounds = np.concatenate(([np.inf], linear_program.get_upper_bounds() - self._lower_bounds, np.full(self._constraints_count, np.inf)))
+        self._signs = ones(self._variables_count + 1)
+        self.has_upper_bounds = linear_program.upper_bounds is not None
+
+        # costs of the current phase, index 0 is the free variable and always zero
+        self._costs = zeros(self._variables_count + 1)
+
+        # initially all slack variables are basic
+        slack_start_index = self._VARIABLES_COL_START_INDEX + self._real_variables_count
+        self._basic_vars = np.zeros((self._variables_count + 1,), dtype='int')
+        self._basic_vars[slack_start_index: slack_start_index + self._constraints_count] = range(1, self._constraints_count + 1)
+        self._tight_vars = np.array(range(self._real_variables_count, self._variables_count + 1), dtype='int')
+        self._tight_vars[0] = 0
+
+        self._is_sparse = scipy.sparse.issparse(self._lefthand_side)
+        if self._is_sparse:
+            self._lefthand_side = scipy.sparse.csc_matrix(self._lefthand_side)
+            initial_basis = scipy.sparse.identity(self._constraints_count, format='csc')
+        else:
+            initial_basis = np.eye(self._constraints_count)
+        self._factorization = BasisFactorization(initial_basis, refactorization_interval)
+        self._basic_values = self._righthand_side.astype(np.float64)
+        self._invalidate()
+
+    @property
+    def constraints_count(self):
+        return self._constraints_count
+
+    @property
+    def variables_count(self):
+        '''
+        Count of the variables including the slack variables (and the artificial variable while it's used)
+        '''
+        return self._variables_count
+
+    def _invalidate(self):
+        self._duals = None
+        self._objective_coefficients = None
+        self._columns = {}
+
+    def _normalize_variable(self, variable):
+        # the artificial variable may be referred to as -1 like in the dense tableau
+        return variable + self._variables_count + 1 if variable < 0 else variable
+
+    def _get_matrix_column(self, variable):
+        if variable <= self._real_variables_count:
+            if not self._is_sparse:
+                return self._signs[variable] * self._lefthand_side[:, variable - 1]
+            column = zeros(self._constraints_count)
+            start, end = self._lefthand_side.indptr[variable - 1: variable + 1]
+            column[self._lefthand_side.indices[start: end]] = self._signs[variable] * self._lefthand_side.data[start: end]
+            return column
+        if variable <= self._real_variables_count + self._constraints_count:
+            column = zeros(self._constraints_count)
+            column[variable - self._real_variables_count - 1] = 1
+            return column
+        return -ones(self._constraints_count)
+
+    def _get_basis_matrix(self):
+        basic_variables = self._tight_vars[1:]
+        if not self._is_sparse:
+            basis_matrix = zeros((self._constraints_count, self._constraints_count))
+            for position, variable in enumerate(basic_variables):
+                basis_matrix[:, position] = self._get_matrix_column(variable)
+            return basis_matrix
+
+        # build the sparse basis from the real columns, the implicit slack columns and the artificial column
+        real_positions = np.flatnonzero(basic_variables <= self._real_variables_count)
+        real_columns = self._lefthand_side[:, basic_variables[real_positions] - 1].tocoo()
+        slack_positions = np.flatnonzero(
+            (basic_variables > self._real_variables_count) & (basic_variables <= self._real_variables_count + self._constraints_count))
+        artificial_positions = np.flatnonzero(basic_variables > self._real_variables_count + self._constraints_count)
+        all_rows = np.arange(self._constraints_count)
+
+        rows = np.concatenate([
+            real_columns.row,
+            basic_variables[slack_positions] - self._real_variables_count - 1,
+            np.tile(all_rows, len(artificial_positions))])
+        cols = np.concatenate([
+            real_positions[real_columns.col],
+            slack_positions,
+            np.repeat(artificial_positions, self._constraints_count)])
+        data = np.concatenate([
+            real_columns.data * self._signs[basic_variables[real_positions]][real_columns.col],
+            ones(len(slack_positions)),
+            -ones(len(artificial_positions) * self._constraints_count)])
+        return scipy.sparse.csc_matrix((data, (rows, cols)), shape=(self._constraints_count, self._constraints_count))
+
+    def _refactorize(self):
+        self._factorization.refactorize(self._get_basis_matrix())
+        # recomputing the basic values removes the drift accumulated by the updates
+        self._basic_values = self._factorization.ftran(self._righthand_side.astype(np.float64))
+
+    def _get_duals(self):
+        if self._duals is None:
+            basic_variables = self._tight_vars[1:]
+            self._duals = self._factorization.btran(self._signs[basic_variables] * self._costs[basic_variables])
+        return self._duals
+
+    def _price(self, duals):
+        '''
+        Returns y * a_j for every variable j (index 0 is the free variable), by the original (not complemented) columns
+        '''
+        prices = zeros(self._variables_count + 1)
+        real_end_index = self._VARIABLES_COL_START_INDEX + self._real_variables_count
+        prices[self._VARIABLES_COL_START_INDEX: real_end_index] = self._lefthand_side.T @ duals
+        prices[real_end_index: real_end_index + self._constraints_count] = duals
+        if self._using_artificial_variable:
+            prices[-1] = -duals.sum()
+        return prices
+
+    def _price_variables(self, duals, variables):
+        '''
+        Returns y * a_j for the given variables only, by the original (not complemented) columns
+        '''
+        prices = zeros(len(variables))
+        real = variables <= self._real_variables_count
+        prices[real] = self._lefthand_side[:, variables[real] - 1].T @ duals
+        slack = ~real & (variables <= self._real_variables_count + self._constraints_count)
+        prices[slack] = duals[variables[slack] - self._real_variables_count - 1]
+        prices[~real & ~slack] = -duals.sum()
+        return prices
+
+    def get_objective_value(self):
+        basic_variables = self._tight_vars[1:]
+        complemented = self._signs < 0
+        # the costs of the complemented variables are negated, and the objective value is shifted by the bounds
+        return (self._signs[basic_variables] * self._costs[basic_variables]) @ self._basic_values + \
+            self._costs[complemented] @ self._upper_bounds[complemented] + \
+            self._costs[self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] @ self._lower_bounds
+
+    def get_objective_function_coefficients(self):
+        '''
+        Returns the objective function coefficients including the free variable (the objective value)
+        '''
+        if self._objective_coefficients is None:
+            coefficients = self._signs * (self._costs - self._price(self._get_duals()))
+            coefficients[self._basic_vars != 0] = 0
+            coefficients[0] = self.get_objective_value()
+            self._objective_coefficients = coefficients
+        return self._objective_coefficients
+
+    def get_reduced_costs(self, variables):
+        '''
+        Returns the objective function coefficients of the given variables only (zero for the basic variables),
+        pricing only their columns unless all the coefficients are already known or most of them are requested
+        '''
+        if self._objective_coefficients is not None or 2 * len(variables) > self._variables_count:
+            return self.get_objective_function_coefficients()[variables]
+        reduced_costs = self._signs[variables] * (self._costs[variables] - self._price_variables(self._get_duals(), variables))
+        reduced_costs[self._basic_vars[variables] != 0] = 0
+        return reduced_costs
+
+    def get_column(self, variable):
+        '''
+        Returns the constraints coefficients of the variable (the first item relates to constraint 1)
+        '''
+        variable = self._normalize_variable(variable)
+        if variable not in self._columns:
+            self._columns[variable] = self._factorization.ftran(self._get_matrix_column(variable))
+        return self._columns[variable]
+
+    def get_basic_values(self):
+        '''
+        Returns the values of the basic variables by their constraints (the first item relates to constraint 1)
+        '''
+        return self._basic_values
+
+    def get_row(self, constraint_index):
+        '''
+        Returns the constraint row including the free variable (the items are indexed by the variables)
+        '''
+        unit = zeros(self._constraints_count)
+        unit[constraint_index - 1] = 1
+        return self.get_rows_combination(unit)
+
+    def get_basic_values_change(self, shift):
+        '''
+        Returns the change of the basic values when the righthand-side is shifted (B^-1 * shift) by their constraints
+        '''
+        return self._factorization.ftran(shift)
+
+    def shift_righthand_side(self, shift):
+        '''
+        Adds shift to the righthand-side keeping the basis
+        '''
+        self._righthand_side = self._righthand_side + shift
+        self._basic_values = self._basic_values + self._factorization.ftran(shift)
+        self._invalidate()
+
+    def get_rows_combination(self, coefficients):
+        '''
+        Returns the combination of the constraint rows with the given coefficients (the first item relates to constraint 1)
+        '''
+        row = self._signs * self._price(self._factorization.btran(coefficients))
+        row[0] = -coefficients @ self._basic_values
+        return row
+
+    def get_entering_candidates(self, tolerance=0):
+        '''
+        The entering candidtes are the variables' indices with coefficients bigger than tolerance (positive) in the objective function
+        Note: the values are 1-based
+        '''
+        coefficients = self.get_objective_function_coefficients()
+        return np.flatnonzero(coefficients[self._VARIABLES_COL_START_INDEX:] > tolerance) + self._VARIABLES_COL_START_INDEX
+
+    def get_variable_representing_constraint(self, constraint_index):
+        if constraint_index is None:
+            return None
+        return self._tight_vars[constraint_index]
+
+    def change_base(self, entering_var, leaving_var):
+        entering_var = self._normalize_variable(entering_var)
+        leaving_var = self._normalize_variable(leaving_var)
+        assert self._basic_vars[entering_var] == 0, 'entering variable must be non-basic'
+        assert self._basic_vars[leaving_var] != 0, 'leaving variable must be basic'
+
+        pivot_row_index = self._basic_vars[leaving_var]
+        position = pivot_row_index - 1
+        entering_column = self.get_column(entering_var)
+
+        scale = min(1, np.max(np.abs(self._basic_values), initial=0))
+        if abs(self._basic_values[position]) <= self._DEGENERATE_STEP_TOLERANCE * scale:
+            # a zero step, the basic values are left as is (the ratio test treats near-zero values as zero)
+            self.degenerate_pivots_count += 1
+        step = self._basic_values[position] / entering_column[position]
+        self._basic_values -= step * entering_column
+        self._basic_values[position] = step
+
+        self._basic_vars[entering_var] = pivot_row_index
+        self._tight_vars[pivot_row_index] = entering_var
+        self._basic_vars[leaving_var] = 0
+
+        self._factorization.update(position, entering_column)
+        if self._factorization.should_refactorize:
+            self._refactorize()
+
+        self._invalidate()
+        self.pivots_count += 1
+
+    def flip_bound(self, variable):
+        '''
+        Complements the variable (x is replaced by u - x): a non-basic variable moves to its other bound,
+        a basic variable keeps its value and is represented by its distance from the upper bound
+        '''
+        variable = self._normalize_variable(variable)
+        upper_bound = self._upper_bounds[variable]
+        assert np.isfinite(upper_bound), 'only variables with a finite upper bound can be complemented'
+
+        column = self._get_matrix_column(variable)
+        self._righthand_side = self._righthand_side - upper_bound * column
+        if self._basic_vars[variable] == 0:
+            self._basic_values -= upper_bound * self.get_column(variable)
+            self.bound_flips_count += 1
+        else:
+            # the basis column is negated
+            position = self._basic_vars[variable] - 1
+            self._basic_values[position] = upper_bound - self._basic_values[position]
+            eta_column = zeros(self._constraints_count)
+            eta_column[position] = -1
+            self._factorization.update(position, eta_column)
+        self._signs[variable] = -self._signs[variable]
+
+        if self._factorization.should_refactorize:
+            self._refactorize()
+        self._invalidate()
+
+    def get_upper_bounds(self):
+        '''
+        Returns the upper bounds of all the variables (index 0 is the free variable), infinite for the unbounded ones
+        '''
+        return self._upper_bounds
+
+    def get_basic_upper_bounds(self):
+        '''
+        Returns the upper bounds of the basic variables by their constraints (the first item relates to constraint 1)
+        '''
+        return self._upper_bounds[self._tight_vars[1:]]
+
+    def get_current_solution(self):
+        solution = zeros(self._real_variables_count)
+        # solution variable indices start from 0
+        pivots = self._basic_vars[self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1]
+        basic = np.flatnonzero(pivots)
+        solution[basic] = self._basic_values[pivots[basic] - 1]
+
+        real_variables = slice(self._VARIABLES_COL_START_INDEX, self._real_variables_count + 1)
+        complemented = self._signs[real_variables] < 0
+        solution[complemented] = self._upper_bounds[real_variables][complemented] - solution[complemented]
+        return solution + self._lower_bounds
+
+    def get_complemented(self):
+        '''
+        Returns which variables are complemented (index 0 is the free variable), basic ones included
+        '''
+        return self._signs < 0
+
+    def get_basis(self):
+        upper_bounded = np.flatnonzero((self._signs < 0) & (self._basic_vars == 0))
+        return Basis(self._tight_vars[1:].copy(), self._constraints_count, self._real_variables_count, upper_bounded)
+
+    def get_constraint_representing_variable(self, variable):
+        constraint_index = self._basic_vars[variable]
+        return None if constraint_index == 0 else constraint_index
+
+    @contextmanager
+    def use_artificial_argument(self):
+        # the artificial variable is the last one, its phase 1 objective is to minimize it
+        self._costs = np.hstack((zeros(self._costs.shape), -ones(1)))
+        self._basic_vars = np.hstack((self._basic_vars, np.zeros(1, dtype='int')))
+        self._upper_bounds = np.append(self._upper_bounds, np.inf)
+        self._signs = np.append(self._signs, 1)
+        self._variables_count += 1
+        self._using_artificial_variable = True
+        self._invalidate()
+
+        yield
+
+        ALONG_ROW = 0
+        self._costs = np.delete(self._costs, -1, ALONG_ROW)
+        self._basic_vars = np.delete(self._basic_vars, -1, ALONG_ROW)
+        self._upper_bounds = self._upper_bounds[:-1]
+        self._signs = self._signs[:-1]
+        self._variables_count -= 1
+        self._using_artificial_variable = False
+        self._invalidate()
+
+    def use_objective_function(self):
+        self._costs = zeros(self._variables_count + 1)
+        self._costs[self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] = self._objective_function
+        self._invalidate()
+
+    def get_most_infeasible_basic_variable_info(self):
+        # argmin returns the first minimal row, same as the dense tableau
+        constraint_index = int(np.argmin(self._basic_values)) + 1
+        basic_var_index = self.get_variable_representing_constraint(constraint_index)
+
+        return basic_var_index, -self._basic_values[constraint_index - 1]
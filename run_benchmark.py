@@ -0,0 +1,671 @@
+import functools
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import scipy.linalg
+import scipy.sparse
+import exceptions
+from instrumentation import Profiler
+from linear_program import LinearProgramSolver, StandardLinearProgram
+import model_io
+from revised_tableau import RevisedTableau
+import scaling as scaling_module
+import strategy
+import tableau
+from utils import array, zeros
+
+############ LP parameters creators ##############
+def random_dense(constraints_count, variables_count, seed=0):
+    '''
+    Random bounded LP which is feasible at the origin (positive lefthand-side and righthand-side)
+    '''
+    rng = np.random.default_rng(seed)
+    objective_func = array(rng.uniform(1, 10, variables_count))
+    constraint_lhs = array(rng.uniform(0, 1, (constraints_count, variables_count)))
+    constraint_rhs = array(rng.uniform(1, 10, constraints_count) * variables_count)
+    return StandardLinearProgram(objective_func, constraint_lhs, constraint_rhs)
+
+def random_sparse(constraints_count, variables_count, nonzeros_per_row=5, seed=0):
+    '''
+    Random bounded sparse LP which is feasible at the origin (every variable appears in at least one constraint)
+    '''
+    rng = np.random.default_rng(seed)
+    nonzeros_count = nonzeros_per_row * constraints_count
+    rows = np.concatenate([rng.integers(0, constraints_count, nonzeros_count), np.arange(variables_count) % constraints_count])
+    cols = np.concatenate([rng.integers(0, variables_count, nonzeros_count), np.arange(variables_count)])
+    data = rng.uniform(0.1, 1, len(rows))
+    objective_func = array(rng.uniform(0, 1, variables_count))
+    constraint_lhs = scipy.sparse.csc_matrix((data, (rows, cols)), shape=(constraints_count, variables_count))
+    constraint_rhs = array(rng.uniform(1, 2, constraints_count))
+    return StandardLinearProgram(objective_func, constraint_lhs, constraint_rhs)
+
+def random_degenerate(constraints_count, variables_count, zeros_fraction=0.5, seed=0):
+    '''
+    Random bounded LP whose origin is highly degenerate (a fraction of the righthand-side is zero)
+    '''
+    rng = np.random.default_rng(seed)
+    objective_func = array(rng.uniform(1, 10, variables_count))
+    constraint_lhs = array(rng.uniform(-1, 1, (constraints_count, variables_count)))
+    # a dense non-negative row keeps the linear program bounded
+    constraint_lhs[0] = rng.uniform(0.1, 1, variables_count)
+    constraint_rhs = array(rng.uniform(1, 10, constraints_count) * variables_count)
+    constraint_rhs[1:][rng.uniform(size=constraints_count - 1) < zeros_fraction] = 0
+    return StandardLinearProgram(objective_func, constraint_lhs, constraint_rhs)
+
+def random_reducible(constraints_count, variables_count, seed=0):
+    '''
+    Random bounded LP with structure presolve removes: duplicate rows, lower bound rows, redundant rows and dominated columns
+    '''
+    rng = np.random.default_rng(seed)
+    linear_program = random_dense(constraints_count, variables_count, seed)
+    quarter = constraints_count // 4
+    constraint_lhs = linear_program.lefthand_side
+    constraint_rhs = linear_program.righthand_side
+    # positive multiples of the first rows, with looser righthand-sides
+    constraint_lhs[quarter: 2 * quarter] = 2 * constraint_lhs[:quarter]
+    constraint_rhs[quarter: 2 * quarter] = 3 * constraint_rhs[:quarter]
+    # lower bounds x_j >= 1
+    constraint_lhs[2 * quarter: 3 * quarter] = 0
+    constraint_lhs[range(2 * quarter, 3 * quarter), rng.choice(variables_count, quarter, replace=False)] = -1
+    constraint_rhs[2 * quarter: 3 * quarter] = -1
+    # redundant rows
+    constraint_lhs[3 * quarter:] = -constraint_lhs[3 * quarter:]
+    # dominated columns
+    objective_func = linear_program.objective_function
+    objective_func[rng.uniform(size=variables_count) < 0.25] *= -1
+    return StandardLinearProgram(objective_func, constraint_lhs, constraint_rhs)
+
+def random_badly_scaled(constraints_count, variables_count, seed=0):
+    '''
+    Random LP whose rows and columns magnitudes span many orders (coefficients from about 1e-4 to 1e6)
+    '''
+    rng = np.random.default_rng(seed)
+    row_magnitudes = 10 ** rng.uniform(-2, 3, (constraints_count, 1))
+    column_magnitudes = 10 ** rng.uniform(-2, 3, variables_count)
+    objective_func = array(rng.uniform(1, 10, variables_count) * column_magnitudes)
+    constraint_lhs = array(rng.uniform(-0.2, 1, (constraints_count, variables_count)) * row_magnitudes * column_magnitudes)
+    constraint_rhs = array(rng.uniform(1, 10, constraints_count) * row_magnitudes.ravel() * variables_count)
+    # a few covering rows (a x >= small) so phase 1 is needed
+    covering = rng.uniform(size=constraints_count) < 0.1
+    constraint_lhs[covering] = -np.abs(constraint_lhs[covering])
+    constraint_rhs[covering] *= -0.01
+    return StandardLinearProgram(objective_func, constraint_lhs, constraint_rhs)
+
+
+def random_bounded(constraints_count, variables_count, seed=0):
+    '''
+    Random LP whose variables all have lower and upper bounds (l in [-1, 0], u - l in [0.5, 5])
+    '''
+    rng = np.random.default_rng(seed)
+    objective_func = array(rng.uniform(-1, 10, variables_count))
+    constraint_lhs = array(rng.uniform(-1, 10, (constraints_count, variables_count)))
+    constraint_rhs = array(rng.uniform(10, 100, constraints_count))
+    lower_bounds = rng.uniform(-1, 0, variables_count)
+    upper_bounds = lower_bounds + rng.uniform(0.5, 5, variables_count)
+    return StandardLinearProgram(objective_func, constraint_lhs, constraint_rhs, lower_bounds, upper_bounds)
+
+
+def bounds_as_rows(linear_program):
+    '''
+    The same linear program with the bounds as constraint rows (x = l + x', x' <= u - l)
+    '''
+    lower_bounds, upper_bounds = linear_program.get_lower_bounds(), linear_program.get_upper_bounds()
+    bounded = np.flatnonzero(np.isfinite(upper_bounds))
+    bound_rows = zeros((len(bounded), linear_program.variables_count))
+    bound_rows[np.arange(len(bounded)), bounded] = 1
+    lefthand_side = np.vstack((linear_program.lefthand_side, bound_rows))
+    righthand_side = np.concatenate((linear_program.righthand_side - linear_program.lefthand_side @ lower_bounds, (upper_bounds - lower_bounds)[bounded]))
+    return StandardLinearProgram(linear_program.objective_function, lefthand_side, righthand_side)
+
+
+def klee_minty(dimension):
+    '''
+    Klee-Minty cube: the maximum coefficient rule visits all its 2^dimension vertices
+    '''
+    objective_func = array([10 ** (dimension - j - 1) for j in range(dimension)])
+    constraint_lhs = zeros((dimension, dimension))
+    for i in range(dimension):
+        constraint_lhs[i, :i] = [2 * 10 ** (i - j) for j in range(i)]
+        constraint_lhs[i, i] = 1
+    constraint_rhs = array([100 ** i for i in range(dimension)])
+    return StandardLinearProgram(objective_func, constraint_lhs, constraint_rhs)
+
+
+def cycling(copies):
+    '''
+    Copies of Beale's example (as independent blocks), on which the maximum coefficient rule with the smallest index ties cycles
+    '''
+    block_objective = array([10, -57, -9, -24])
+    block_lhs = array([[1 / 2, -11 / 2, -5 / 2, 9], [1 / 2, -3 / 2, -1 / 2, 1], [1, 0, 0, 0]])
+    block_rhs = array([0, 0, 1])
+    return StandardLinearProgram(np.tile(block_objective, copies), scipy.linalg.block_diag(*[block_lhs] * copies), np.tile(block_rhs, copies))
+
+
+def transportation(sources_count, destinations_count, seed=0):
+    '''
+    Random transportation problem: ship the demands from the sources' supplies at minimal cost (maximize the negated cost).
+    x_ij is the amount shipped from source i to destination j (row major), the supply rows are sum_j x_ij <= s_i
+    and the demand rows are -sum_i x_ij <= -d_j. The total supply exceeds the total demand.
+    '''
+    rng = np.random.default_rng(seed)
+    costs = rng.uniform(1, 10, (sources_count, destinations_count))
+    demands = rng.uniform(1, 10, destinations_count)
+    supplies = rng.dirichlet(np.ones(sources_count)) * demands.sum() * 1.2
+    supply_rows = np.kron(np.eye(sources_count), np.ones(destinations_count))
+    demand_rows = -np.kron(np.ones(sources_count), np.eye(destinations_count))
+    return StandardLinearProgram(array(-costs.ravel()), np.vstack((supply_rows, demand_rows)), np.concatenate((supplies, -demands)))
+
+
+def assignment(size, seed=0):
+    '''
+    Random assignment problem: the transportation problem with unit supplies and demands, its optimal vertices are integral
+    '''
+    rng = np.random.default_rng(seed)
+    costs = rng.uniform(1, 10, (size, size))
+    supply_rows = np.kron(np.eye(size), np.ones(size))
+    demand_rows = -np.kron(np.ones(size), np.eye(size))
+    return StandardLinearProgram(array(-costs.ravel()), np.vstack((supply_rows, demand_rows)), np.concatenate((np.ones(size), -np.ones(size))))
+
+def random_integer(constraints_count, variables_count, nonzeros_per_row=5, seed=0):
+    '''
+    Random bounded LP with small integer coefficients, which is feasible at the origin (every variable appears in at least one constraint)
+    '''
+    rng = np.random.default_rng(seed)
+    constraint_lhs = rng.integers(1, 10, (constraints_count, variables_count)) * (rng.uniform(size=(constraints_count, variables_count)) <
+                                                                                    nonzeros_per_row / variables_count)
+    constraint_lhs[np.arange(variables_count) % constraints_count, np.arange(variables_count)] += 1
+    objective_func = array(rng.integers(1, 10, variables_count))
+    constraint_rhs = array(rng.integers(1, 100, constraints_count))
+    return StandardLinearProgram(objective_func, array(constraint_lhs), constraint_rhs)
+##################################################
+
+class LoopTableau(tableau.tableau):
+    '''
+    The tableau as it was before vectorization, kept as the reference for the pivot throughput benchmark
+    '''
+    def _perform_pivot(self, pivot_row_index, pivot_col_index):
+        self._tableau[pivot_row_index] /= self._tableau[pivot_row_index, pivot_col_index]
+
+        num_rows = self._tableau.shape[0]
+        for row_index in range(num_rows):
+            if row_index == pivot_row_index:
+                continue
+            self._tableau[row_index] -= self._tableau[row_index, pivot_col_index] * self._tableau[pivot_row_index]
+
+        self.pivots_count += 1
+
+    def get_current_solution(self):
+        solution = zeros(self._real_variables_count)
+        for i in range(1, self._real_variables_count + 1):
+            if self._basic_vars[i] == 0:
+                continue
+            solution[i - 1] = -self._tableau[self._basic_vars[i], 0] / self._tableau[self._basic_vars[i], i]
+
+        return solution
+
+    def get_entering_candidates(self, tolerance=0):
+        return [i for i in range(self._VARIABLES_COL_START_INDEX, self._variables_count + 1) if self._basic_vars[i] == 0 and self._tableau[0, i] > tolerance]
+
+
+class LoopMaxCoefficientStrategy(strategy.MaxCoefficientStrategy):
+    '''
+    The maximum coefficient strategy as it was before vectorization (including the ratio test without tolerances)
+    '''
+    def find_entering(self, tableau):
+        candidates = tableau.get_entering_candidates()
+        if len(candidates) == 0:
+            return None
+        coefficients = tableau.get_objective_function_coefficients()
+        return max(candidates, key=lambda i: coefficients[i])
+
+    def _find_leaving_constraint(self, tableau, entering_variable):
+        entering_column = tableau.get_column(entering_variable)
+        basic_values = tableau.get_basic_values()
+
+        min_ratio_index = None
+        min_ratio_value = float("inf")
+        for i in range(1, tableau.constraints_count + 1):
+            if entering_column[i - 1] <= 0:
+                continue
+
+            ratio = basic_values[i - 1] / entering_column[i - 1]
+            if ratio < min_ratio_value:
+                min_ratio_index = i
+                min_ratio_value = ratio
+
+        return min_ratio_index
+
+
+def _loop_is_optimal(tableau_obj):
+    return all(x <= 0 for i, x in enumerate(tableau_obj.get_objective_function_coefficients()) if i > 0)
+
+
+def _vectorized_is_optimal(tableau_obj):
+    return bool(np.all(tableau_obj.get_objective_function_coefficients()[1:] <= 0))
+
+
+def measure_pivots_per_second(tableau_class, pivot_strategy, is_optimal, linear_program, max_pivots):
+    '''
+    Runs the phase 2 hot loop (optimality check, pricing, ratio test, pivot and solution extraction) and returns (pivots, seconds)
+    '''
+    tableau_obj = tableau_class(linear_program)
+    tableau_obj.use_objective_function()
+    start = time.perf_counter()
+    while not is_optimal(tableau_obj) and tableau_obj.pivots_count < max_pivots:
+        entering_var = pivot_strategy.find_entering(tableau_obj)
+        leaving_var = pivot_strategy.find_leaving(tableau_obj, entering_var)
+        tableau_obj.change_base(entering_var, leaving_var)
+        tableau_obj.get_current_solution()
+    return tableau_obj.pivots_count, time.perf_counter() - start
+
+
+def pivot_throughput(sizes=((100, 200), (500, 1000), (2000, 2000)), max_pivots=50):
+    print(f'{"m x n":>12} | {"loop pivots/s":>14} | {"vectorized pivots/s":>20} | {"speedup":>8}')
+    for constraints_count, variables_count in sizes:
+        linear_program = random_dense(constraints_count, variables_count)
+        loop_pivots, loop_time = measure_pivots_per_second(
+            LoopTableau, LoopMaxCoefficientStrategy(), _loop_is_optimal, linear_program, max_pivots)
+        vectorized_pivots, vectorized_time = measure_pivots_per_second(
+            tableau.tableau, strategy.MaxCoefficientStrategy(), _vectorized_is_optimal, linear_program, max_pivots)
+        loop_rate = loop_pivots / loop_time
+        vectorized_rate = vectorized_pivots / vectorized_time
+        print(f'{constraints_count:>5} x {variables_count:<5} | {loop_rate:>14.1f} | {vectorized_rate:>20.1f} | {vectorized_rate / loop_rate:>7.1f}x')
+
+
+def measure_solve(linear_program, engine, pivot_strategy=None, max_iterations=100000):
+    '''
+    Solves the linear program and returns (solution, seconds, peak traced memory in bytes)
+    '''
+    tracemalloc.start()
+    start = time.perf_counter()
+    solution = LinearProgramSolver.solve_simplex(linear_program, pivot_strategy=pivot_strategy, max_iterations=max_iterations, engine=engine)
+    seconds = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return solution, seconds, peak_memory
+
+
+def engine_comparison(sizes=((50, 5000), (100, 20000), (200, 50000))):
+    print(f'{"m x n":>14} | {"engine":>14} | {"pivots":>6} | {"ms/pivot":>9} | {"peak MB":>8} | {"objective":>14}')
+    for constraints_count, variables_count in sizes:
+        linear_program = random_dense(constraints_count, variables_count)
+        for engine in (tableau.tableau, RevisedTableau):
+            solution, seconds, peak_memory = measure_solve(linear_program, engine)
+            print(f'{constraints_count:>6} x {variables_count:<6} | {engine.__name__:>14} | {solution.iterations_count:>6} | '
+                  f'{1000 * seconds / max(solution.iterations_count, 1):>9.3f} | {peak_memory / 2 ** 20:>8.1f} | {solution.objective_value:>14.6f}')
+
+
+def sparse_comparison(sizes=((300, 300), (600, 600))):
+    print(f'{"m x n":>14} | {"lefthand-side":>14} | {"pivots":>6} | {"ms/pivot":>9} | {"peak MB":>8} | {"objective":>14}')
+    for constraints_count, variables_count in sizes:
+        sparse_program = random_sparse(constraints_count, variables_count)
+        dense_program = StandardLinearProgram(
+            sparse_program.objective_function, sparse_program.lefthand_side.toarray(), sparse_program.righthand_side)
+        for name, linear_program in (('dense', dense_program), ('sparse', sparse_program)):
+            # the default engine is chosen by the lefthand-side type
+            solution, seconds, peak_memory = measure_solve(linear_program, None)
+            print(f'{constraints_count:>6} x {variables_count:<6} | {name:>14} | {solution.iterations_count:>6} | '
+                  f'{1000 * seconds / max(solution.iterations_count, 1):>9.3f} | {peak_memory / 2 ** 20:>8.1f} | {solution.objective_value:>14.6f}')
+
+
+def batch_comparison(problems_count=2000, constraints_count=6, variables_count=8):
+    linear_programs = [random_dense(constraints_count, variables_count, seed) for seed in range(problems_count)]
+
+    start = time.perf_counter()
+    for linear_program in linear_programs:
+        LinearProgramSolver.solve_simplex(linear_program)
+    single_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    LinearProgramSolver.solve_batch(linear_programs)
+    batch_time = time.perf_counter() - start
+
+    print(f'{problems_count} problems of {constraints_count} x {variables_count}: '
+          f'one by one {problems_count / single_time:.0f} problems/s, batch {problems_count / batch_time:.0f} problems/s '
+          f'({single_time / batch_time:.1f}x)')
+
+
+def pricing_comparison(klee_minty_dimensions=(4, 6, 8, 10), random_sizes=((50, 100), (100, 200), (200, 400))):
+    strategies = (strategy.MaxCoefficientStrategy, strategy.MinCoefficientStrategy, strategy.DevexStrategy, strategy.SteepestEdgeStrategy)
+    problems = [(f'klee-minty {dimension}', klee_minty(dimension)) for dimension in klee_minty_dimensions]
+    problems += [(f'random {m} x {n}', random_dense(m, n)) for m, n in random_sizes]
+
+    print(f'{"problem":>18} | {"strategy":>22} | {"pivots":>6} | {"ms":>9} | {"objective":>14}')
+    for name, linear_program in problems:
+        for strategy_class in strategies:
+            start = time.perf_counter()
+            solution = LinearProgramSolver.solve_simplex(linear_program, pivot_strategy=strategy_class(), max_iterations=100000)
+            seconds = time.perf_counter() - start
+            print(f'{name:>18} | {strategy_class.__name__:>22} | {solution.iterations_count:>6} | {1000 * seconds:>9.2f} | {solution.objective_value:>14.6g}')
+
+
+def measure_pricing(linear_program, pivot_strategy, max_iterations=100000):
+    '''
+    Solves the linear program and returns (solution, seconds, seconds spent choosing the entering variables)
+    '''
+    pricing_seconds = 0
+    find_entering = pivot_strategy.find_entering
+
+    def timed_find_entering(tableau_obj):
+        nonlocal pricing_seconds
+        start = time.perf_counter()
+        entering_var = find_entering(tableau_obj)
+        pricing_seconds += time.perf_counter() - start
+        return entering_var
+
+    pivot_strategy.find_entering = timed_find_entering
+    start = time.perf_counter()
+    solution = LinearProgramSolver.solve_simplex(linear_program, pivot_strategy=pivot_strategy, max_iterations=max_iterations)
+    return solution, time.perf_counter() - start, pricing_seconds
+
+
+def partial_pricing_comparison(sizes=((200, 50000), (200, 200000)), window_sizes=(1000, 10000), candidates_counts=(4, 16)):
+    print(f'{"m x n":>14} | {"strategy":>30} | {"pivots":>6} | {"pricing ms/pivot":>16} | {"total ms/pivot":>14} | {"objective":>14}')
+    for constraints_count, variables_count in sizes:
+        # sparse linear programs are solved by the revised engine, which prices only the requested columns
+        linear_program = random_sparse(constraints_count, variables_count)
+        strategies = [('max coefficient', strategy.MaxCoefficientStrategy())]
+        strategies += [(f'partial window={window_size}', strategy.PartialPricingStrategy(window_size)) for window_size in window_sizes]
+        strategies += [(f'multiple candidates={candidates_count}', strategy.MultiplePricingStrategy(candidates_count))
+                       for candidates_count in candidates_counts]
+        for name, pivot_strategy in strategies:
+            solution, seconds, pricing_seconds = measure_pricing(linear_program, pivot_strategy)
+            pivots = max(solution.iterations_count, 1)
+            print(f'{constraints_count:>6} x {variables_count:<6} | {name:>30} | {solution.iterations_count:>6} | '
+                  f'{1000 * pricing_seconds / pivots:>16.3f} | {1000 * seconds / pivots:>14.3f} | {solution.objective_value:>14.6f}')
+
+
+def measure_ratio_test(linear_program, pivot_strategy, max_iterations=100000):
+    '''
+    Solves the linear program and returns (solution, seconds, seconds spent choosing the leaving variables)
+    '''
+    ratio_test_seconds = 0
+    find_leaving = pivot_strategy.find_leaving
+
+    def timed_find_leaving(tableau_obj, entering_var):
+        nonlocal ratio_test_seconds
+        start = time.perf_counter()
+        leaving_var = find_leaving(tableau_obj, entering_var)
+        ratio_test_seconds += time.perf_counter() - start
+        return leaving_var
+
+    pivot_strategy.find_leaving = timed_find_leaving
+    start = time.perf_counter()
+    solution = LinearProgramSolver.solve_simplex(linear_program, pivot_strategy=pivot_strategy, max_iterations=max_iterations, engine=RevisedTableau)
+    return solution, time.perf_counter() - start, ratio_test_seconds
+
+
+def ratio_test_comparison(sizes=((200, 200), (300, 300)), max_iterations=20000):
+    print(f'{"m x n":>12} | {"ratio test":>10} | {"pivots":>6} | {"degenerate":>10} | {"ratio test ms/pivot":>19} | {"total s":>8} | {"objective":>14}')
+    for constraints_count, variables_count in sizes:
+        linear_program = random_degenerate(constraints_count, variables_count)
+        strategies = (('loop', LoopMaxCoefficientStrategy()), ('numpy', strategy.MaxCoefficientStrategy()),
+                      ('harris', strategy.MaxCoefficientStrategy(harris=True)))
+        for name, pivot_strategy in strategies:
+            try:
+                solution, seconds, ratio_test_seconds = measure_ratio_test(linear_program, pivot_strategy, max_iterations)
+            except exceptions.SimplexError as error:
+                # without tolerances tiny pivots may make the simplex cycle
+                print(f'{constraints_count:>5} x {variables_count:<5} | {name:>10} | {error.status}')
+                continue
+            print(f'{constraints_count:>5} x {variables_count:<5} | {name:>10} | {solution.iterations_count:>6} | {solution.degenerate_iterations_count:>10} | '
+                  f'{1000 * ratio_test_seconds / max(solution.iterations_count, 1):>19.3f} | {seconds:>8.2f} | {solution.objective_value:>14.6f}')
+
+
+def presolve_comparison(sizes=((200, 400), (400, 800))):
+    print(f'{"m x n":>12} | {"presolve":>8} | {"rows":>5} | {"columns":>7} | {"pivots":>6} | {"seconds":>8} | {"objective":>14}')
+    for constraints_count, variables_count in sizes:
+        linear_program = random_reducible(constraints_count, variables_count)
+        for presolve in (False, True):
+            start = time.perf_counter()
+            solution = LinearProgramSolver.solve_simplex(linear_program, max_iterations=100000, presolve=presolve)
+            seconds = time.perf_counter() - start
+            rows, columns = (solution.presolve.removed_rows_count, solution.presolve.removed_columns_count) if presolve else (0, 0)
+            print(f'{constraints_count:>5} x {variables_count:<5} | {str(presolve):>8} | {rows:>5} | {columns:>7} | {solution.iterations_count:>6} | '
+                  f'{seconds:>8.3f} | {solution.objective_value:>14.6f}')
+
+
+def scaling_comparison(sizes=((50, 100), (100, 200), (200, 400)), klee_minty_dimensions=(8, 10)):
+    print(f'{"linear program":>24} | {"scaling":>23} | {"spread":>10} | {"pivots":>6} | {"seconds":>8} | {"objective / status":>20}')
+    linear_programs = [(f'random {m} x {n}', random_badly_scaled(m, n)) for m, n in sizes]
+    linear_programs += [(f'klee-minty {dimension}', klee_minty(dimension)) for dimension in klee_minty_dimensions]
+    for name, linear_program in linear_programs:
+        original_spread = scaling_module.scale(linear_program, 'equilibration')[1].original_spread
+        for scaling in (None, ) + scaling_module.Scaler.METHODS:
+            start = time.perf_counter()
+            try:
+                solution = LinearProgramSolver.solve_simplex(linear_program, max_iterations=100000, scaling=scaling)
+            except exceptions.SimplexError as error:
+                # drift may wrongly decide the status of an unscaled linear program
+                print(f'{name:>24} | {str(scaling):>23} | {"":>10} | {"":>6} | {time.perf_counter() - start:>8.3f} | {error.status:>20}')
+                continue
+            seconds = time.perf_counter() - start
+            spread = solution.scaling.scaled_spread if scaling is not None else original_spread
+            print(f'{name:>24} | {str(scaling):>23} | {spread:>10.3g} | {solution.iterations_count:>6} | {seconds:>8.3f} | {solution.objective_value:>20.6f}')
+
+
+def bounds_comparison(sizes=((50, 100), (100, 400), (200, 1000))):
+    print(f'{"size":>10} | {"bounds":>7} | {"engine":>15} | {"rows":>5} | {"pivots":>6} | {"flips":>6} | {"seconds":>8} | {"objective":>12}')
+    for m, n in sizes:
+        linear_program = random_bounded(m, n)
+        # bound rows' objective value is shifted by c^T l
+        objective_shift = linear_program.objective_function @ linear_program.lower_bounds
+        for name, program, shift in (('rows', bounds_as_rows(linear_program), objective_shift), ('native', linear_program, 0)):
+            for engine in (tableau.tableau, RevisedTableau):
+                start = time.perf_counter()
+                # presolve would turn the bound rows back into bounds
+                solution = LinearProgramSolver.solve_simplex(linear_program=program, engine=engine, max_iterations=100000, presolve=False)
+                seconds = time.perf_counter() - start
+                print(f'{f"{m} x {n}":>10} | {name:>7} | {engine.__name__:>15} | {program.constraints_count:>5} | {solution.iterations_count:>6} | '
+                      f'{solution.bound_flips_count:>6} | {seconds:>8.3f} | {solution.objective_value + shift:>12.4f}')
+
+
+def measure_seconds(solve):
+    start = time.perf_counter()
+    solve()
+    return time.perf_counter() - start
+
+
+def profile_breakdown(sizes=((100, 2000), (200, 400)), repeats=3):
+    '''
+    The share of every solve stage per engine, and the overhead of profiling over an uninstrumented solve
+    '''
+    for m, n in sizes:
+        linear_program = random_badly_scaled(m, n)
+        for engine in (tableau.tableau, RevisedTableau):
+            solve = functools.partial(LinearProgramSolver.solve_simplex, linear_program, engine=engine, max_iterations=100000, scaling='geometric')
+            seconds = min(measure_seconds(solve) for _ in range(repeats))
+            profiled_seconds = min(measure_seconds(lambda: solve(instrumentation=Profiler(record_pivots=False))) for _ in range(repeats))
+            solution = solve(instrumentation=Profiler(record_pivots=False))
+            print(f'{m} x {n} {engine.__name__}: {solution.iterations_count} pivots, {seconds:.3f}s, profiled {profiled_seconds:.3f}s')
+            print(solution.profile)
+
+
+def measure_peak_memory(solve):
+    '''
+    Runs solve and returns (seconds, peak traced memory in bytes)
+    '''
+    tracemalloc.start()
+    start = time.perf_counter()
+    solve()
+    seconds = time.perf_counter() - start
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak_memory
+
+
+def storage_comparison(sizes=((200, 400), (400, 800), (800, 1600))):
+    '''
+    Phase 1 and phase 2 of the dense tableau with every storage dtype and order, the peak memory is relative to the tableau storage
+    '''
+    print(f'{"size":>10} | {"dtype":>7} | {"order":>5} | {"pivots":>6} | {"seconds":>8} | {"storage MB":>10} | {"peak / storage":>14} | {"objective":>14}')
+    for m, n in sizes:
+        # the covering rows need phase 1, scaled in advance so only the solve is measured
+        linear_program, _ = scaling_module.scale(random_badly_scaled(m, n), 'geometric-equilibration')
+        for dtype in (np.float64, np.float32):
+            # float32 keeps about 7 significant digits
+            tolerances = {} if dtype == np.float64 else dict(optimality_tolerance=1e-5, feasibility_tolerance=1e-5, pivot_tolerance=1e-6)
+            for order in ('C', 'F'):
+                engine = functools.partial(tableau.tableau, dtype=dtype, order=order)
+                solutions = []
+                seconds, peak_memory = measure_peak_memory(lambda: solutions.append(LinearProgramSolver.solve_simplex(
+                    linear_program, pivot_strategy=strategy.MaxCoefficientStrategy(**tolerances), engine=engine,
+                    max_iterations=100000, presolve=False)))
+                storage = (m + 1) * (n + m + 2) * np.dtype(dtype).itemsize
+                print(f'{f"{m} x {n}":>10} | {np.dtype(dtype).name:>7} | {order:>5} | {solutions[0].iterations_count:>6} | {seconds:>8.3f} | '
+                      f'{storage / 2 ** 20:>10.1f} | {peak_memory / storage:>14.2f} | {solutions[0].objective_value:>14.4f}')
+
+
+def streaming_comparison(klee_minty_dimensions=(8, 10, 12), max_iterations=100000):
+    print(f'{"dimension":>9} | {"pivots":>6} | {"mode":>20} | {"seconds":>8} | {"peak KB":>9}')
+    for dimension in klee_minty_dimensions:
+        linear_program = klee_minty(dimension)
+        pivots = LinearProgramSolver.solve_simplex(linear_program, max_iterations=max_iterations).iterations_count
+        modes = (
+            # every step kept as a Solution, as solve used to do
+            ('materialized steps', lambda: [step.materialize() for step in LinearProgramSolver.solve_simplex_steps(linear_program, max_iterations=max_iterations)]),
+            ('streamed steps', lambda: max(step.objective_value for step in LinearProgramSolver.solve_simplex_steps(linear_program, max_iterations=max_iterations))),
+            ('every 100th step', lambda: list(LinearProgramSolver.solve_simplex_steps(linear_program, max_iterations=max_iterations, every=100))),
+            ('final solution', lambda: LinearProgramSolver.solve_simplex(linear_program, max_iterations=max_iterations)))
+        for name, solve in modes:
+            seconds, peak_memory = measure_peak_memory(solve)
+            print(f'{dimension:>9} | {pivots:>6} | {name:>20} | {seconds:>8.3f} | {peak_memory / 2 ** 10:>9.1f}')
+
+
+def model_file_comparison(sizes=((2000, 2000), (20000, 20000), (50000, 50000))):
+    '''
+    Reading a sparse linear program from an MPS file, and loading it from its (memory-mapped) binary cache
+    '''
+    print(f'{"m x n":>16} | {"MPS MB":>7} | {"parse s":>8} | {"parse peak MB":>13} | {"cache load ms":>13} | {"cache load peak MB":>18}')
+    for constraints_count, variables_count in sizes:
+        linear_program = random_sparse(constraints_count, variables_count)
+        with tempfile.TemporaryDirectory() as directory:
+            path, cache_path = os.path.join(directory, 'model.mps'), os.path.join(directory, 'model.cache')
+            model_io.write_mps(linear_program, path)
+            parse_seconds, parse_peak_memory = measure_peak_memory(lambda: model_io.read_model(path, cache_path))
+            load_seconds, load_peak_memory = measure_peak_memory(lambda: model_io.read_model(path, cache_path))
+            print(f'{constraints_count:>7} x {variables_count:<6} | {os.path.getsize(path) / 2 ** 20:>7.1f} | {parse_seconds:>8.2f} | '
+                  f'{parse_peak_memory / 2 ** 20:>13.1f} | {1000 * load_seconds:>13.2f} | {load_peak_memory / 2 ** 20:>18.2f}')
+
+
+def exact_comparison(sizes=((50, 50), (100, 100), (200, 200))):
+    '''
+    The exact rational engine against the floating point tableau, solving cold and from the floating point basis (the default).
+    Small integer coefficients keep its integers in int64 for many more pivots than arbitrary floats
+    (whose 53 bits mantissas grow into python integers after the first pivots).
+    '''
+    print(f'{"linear program":>24} | {"engine":>11} | {"pivots":>6} | {"seconds":>8} | {"objective":>14} | {"float error":>11}')
+    for constraints_count, variables_count in sizes:
+        for name, linear_program in (('integer', random_integer(constraints_count, variables_count)),
+                                     ('dense', random_dense(constraints_count, variables_count))):
+            float_solution, float_seconds, _ = measure_solve(linear_program, None)
+            results = [('float', float_solution, float_seconds)]
+            for engine, float_start in (('exact cold', False), ('exact', True)):
+                start = time.perf_counter()
+                exact_solution = LinearProgramSolver.solve_exact(linear_program, max_iterations=100000, float_start=float_start)
+                results.append((engine, exact_solution, time.perf_counter() - start))
+            # the float solution's error relative to the exact objective value
+            error = abs(float(float_solution.objective_value - exact_solution.objective_value))
+            for engine, solution, seconds in results:
+                print(f'{f"{name} {constraints_count} x {variables_count}":>24} | {engine:>11} | {solution.iterations_count:>6} | '
+                      f'{seconds:>8.3f} | {float(solution.objective_value):>14.6f} | {error if engine == "float" else 0:>11.2e}')
+
+
+def interior_point_comparison(sizes=((200, 1000), (500, 2000), (1000, 1000)), klee_minty_dimensions=(10, 14)):
+    '''
+    The simplex against the interior point method, with crossover (the simplex warm started from the identified basis) and without it
+    '''
+    print(f'{"linear program":>24} | {"method":>29} | {"iterations":>10} | {"pivots":>6} | {"seconds":>8} | {"objective":>18}')
+    linear_programs = [(f'klee-minty {dimension}', klee_minty(dimension)) for dimension in klee_minty_dimensions]
+    linear_programs += [(f'dense {constraints_count} x {variables_count}', random_dense(constraints_count, variables_count))
+                        for constraints_count, variables_count in sizes]
+    linear_programs.append(('degenerate 200 x 200', random_degenerate(200, 200)))
+    for name, linear_program in linear_programs:
+        methods = (('simplex', lambda: LinearProgramSolver.solve_simplex(linear_program, max_iterations=100000)),
+                   ('interior point', lambda: LinearProgramSolver.solve_interior_point(linear_program, max_iterations=100000)),
+                   ('interior point (no crossover)', lambda: LinearProgramSolver.solve_interior_point(linear_program, crossover=False)))
+        for method, solve in methods:
+            start = time.perf_counter()
+            solution = solve()
+            seconds = time.perf_counter() - start
+            iterations = '' if solution.interior_point is None else solution.interior_point.iterations_count
+            print(f'{name:>24} | {method:>29} | {iterations:>10} | {solution.iterations_count:>6} | {seconds:>8.3f} | {solution.objective_value:>18.10g}')
+
+
+def degeneracy_comparison(sizes=((100, 100), (200, 200)), cycling_copies=8):
+    '''
+    The anti-degeneracy options on degenerate linear programs: the default (Bland's rule on cycling or after 30 degenerate pivots per constraint),
+    the lexicographic ratio test, Bland's rule after a few degenerate pivots and the righthand side perturbation with cleanup
+    '''
+    print(f'{"linear program":>24} | {"anti-degeneracy":>20} | {"pivots":>6} | {"degenerate":>10} | {"seconds":>8} | {"objective":>14}')
+    linear_programs = [(f'cycling {cycling_copies}', cycling(cycling_copies))]
+    linear_programs += [(f'degenerate {constraints_count} x {variables_count}', random_degenerate(constraints_count, variables_count))
+                        for constraints_count, variables_count in sizes]
+    options = (('default', strategy.MaxCoefficientStrategy, {}, None), ('lexicographic', strategy.MaxCoefficientStrategy, dict(lexicographic=True), None),
+               ('bland after 20', strategy.MaxCoefficientStrategy, dict(stalling_pivots=20), None),
+               ('perturbation', strategy.MaxCoefficientStrategy, {}, True))
+    for name, linear_program in linear_programs:
+        for option, strategy_class, strategy_options, perturbation in options:
+            start = time.perf_counter()
+            # presolve would remove the cycling rows
+            solution = LinearProgramSolver.solve_simplex(linear_program, pivot_strategy=strategy_class(**strategy_options), max_iterations=100000,
+                                                         presolve=False, perturbation=perturbation)
+            seconds = time.perf_counter() - start
+            print(f'{name:>24} | {option:>20} | {solution.iterations_count:>6} | {solution.degenerate_iterations_count:>10} | {seconds:>8.3f} | '
+                  f'{solution.objective_value:>14.6f}')
+
+
+def sensitivity_comparison(sizes=((100, 200), (200, 400)), max_parameter=10):
+    '''
+    The sensitivity analysis from the final tableau against solving without it, and the parametric righthand-side sweep
+    against cold re-solves at every one of its breakpoints
+    '''
+    print(f'{"linear program":>24} | {"solve":>8} | {"sensitivity":>11} | {"breakpoints":>11} | {"sweep":>8} | {"re-solves":>9} | {"max error":>9}')
+    for constraints_count, variables_count in sizes:
+        linear_program = random_bounded(constraints_count, variables_count)
+        start = time.perf_counter()
+        LinearProgramSolver.solve_simplex(linear_program, presolve=False)
+        solve_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        LinearProgramSolver.solve_simplex(linear_program, sensitivity=True)
+        sensitivity_seconds = time.perf_counter() - start
+
+        direction = -np.random.default_rng(0).uniform(0, 1, constraints_count)
+        start = time.perf_counter()
+        sweep = LinearProgramSolver.parametric_righthand_side(linear_program, direction, max_parameter)
+        sweep_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        objective_values = [LinearProgramSolver.solve_simplex(StandardLinearProgram(
+            linear_program.objective_function, linear_program.lefthand_side, linear_program.righthand_side + parameter * direction,
+            linear_program.lower_bounds, linear_program.upper_bounds)).objective_value for parameter in sweep.parameters]
+        resolve_seconds = time.perf_counter() - start
+        max_error = np.max(np.abs(sweep.objective_values - objective_values))
+        print(f'{f"bounded {constraints_count} x {variables_count}":>24} | {solve_seconds:>8.3f} | {sensitivity_seconds:>11.3f} | '
+              f'{len(sweep.parameters):>11} | {sweep_seconds:>8.3f} | {resolve_seconds:>9.3f} | {max_error:>9.2e}')
+
+
+def main():
+    pivot_throughput()
+    pricing_comparison()
+    partial_pricing_comparison()
+    ratio_test_comparison()
+    streaming_comparison()
+    storage_comparison()
+    profile_breakdown()
+    presolve_comparison()
+    scaling_comparison()
+    bounds_comparison()
+    engine_comparison()
+    sparse_comparison()
+    batch_comparison()
+    model_file_comparison()
+    exact_comparison()
+    interior_point_comparison()
+    degeneracy_comparison()
+    sensitivity_comparison()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+import numpy as np
+import scipy.sparse
+
+
+def _flat(values):
+    if scipy.sparse.issparse(values):
+        values = values.toarray()
+    return np.asarray(values).ravel()
+
+
+def _abs(lefthand_side):
+    return abs(lefthand_side) if scipy.sparse.issparse(lefthand_side) else np.abs(lefthand_side)
+
+
+def _nonzero_extremes(magnitudes, axis):
+    '''
+    Returns the smallest and biggest non-zero magnitudes along axis (ones for empty rows or columns)
+    '''
+    shape = magnitudes.shape[1 - axis]
+    if magnitudes.shape[axis] == 0:
+        return np.ones(shape), np.ones(shape)
+
+    biggest = _flat(magnitudes.max(axis=axis))
+    if scipy.sparse.issparse(magnitudes):
+        reciprocals = magnitudes.copy()
+        reciprocals.data = 1 / reciprocals.data
+    else:
+        with np.errstate(divide='ignore'):
+            reciprocals = np.where(magnitudes > 0, 1 / magnitudes, 0)
+    # the smallest non-zero magnitude is the reciprocal of the biggest reciprocal
+    smallest_reciprocal = _flat(reciprocals.max(axis=axis))
+    empty = biggest == 0
+    smallest = np.divide(1, smallest_reciprocal, out=np.ones(shape), where=~empty)
+    biggest[empty] = 1
+    return smallest, biggest
+
+
+def _spread(magnitudes):
+    '''
+    The ratio between the biggest and the smallest non-zero magnitudes, a cheap estimate of the conditioning
+    '''
+    values = magnitudes.data if scipy.sparse.issparse(magnitudes) else magnitudes
+    values = values[values > 0]
+    return float(values.max() / values.min()) if len(values) else 1.0
+
+
+def _power_of_two(factors):
+    # multiplying by powers of two is exact, so scaling adds no rounding errors
+    return np.exp2(np.round(np.log2(factors)))
+
+
+class Scaling(object):
+    '''
+    The scaled linear program is max (o C c)^T x' s.t. (R A C) x' <= R b, C^-1 l <= x' <= C^-1 u where R and C are the diagonal row and column factors
+    and o is the objective factor, so x = C x' and the objective value is divided by o.
+    Also keeps the spread (biggest / smallest non-zero coefficient magnitude) of the lefthand-side before and after scaling.
+    '''
+    def __init__(self, method, row_factors, column_factors, objective_factor, original_spread, scaled_spread):
+        self.method = method
+        self.row_factors = row_factors
+        self.column_factors = column_factors
+        self.objective_factor = objective_factor
+        self.original_spread = original_spread
+        self.scaled_spread = scaled_spread
+
+    def unscale(self, solution):
+        '''
+        Maps the solution (and its sensitivity analysis) of the scaled linear program (in place) to the original linear program.
+        The basis is the same, scaling changes no variable.
+        '''
+        solution.solution = solution.solution * self.column_factors
+        solution.objective_value /= self.objective_factor
+        if solution.sensitivity is not None:
+            solution.sensitivity.unscale(self.row_factors, self.column_factors, self.objective_factor)
+        solution.scaling = self
+        return solution
+
+    def __str__(self):
+        return f'{self.method.capitalize()} scaling reduced the coefficients spread from {self.original_spread:.3g} to {self.scaled_spread:.3g}'
+
+
+class Scaler(object):
+    '''
+    Scales the rows and the columns of the lefthand-side (by powers of two) so its coefficients are close to 1:
+    - geometric: repeatedly divides every row and then every column by the geometric mean of its biggest and smallest non-zero magnitudes,
+      until the spread stops improving by GEOMETRIC_MIN_IMPROVEMENT (at most GEOMETRIC_PASSES passes)
+    - equilibration: divides every row and then every column by its biggest magnitude
+    - geometric-equilibration: geometric scaling followed by equilibration
+    The objective function is divided by its biggest magnitude.
+    '''
+    METHODS = ('geometric', 'equilibration', 'geometric-equilibration')
+    GEOMETRIC_PASSES = 8
+    GEOMETRIC_MIN_IMPROVEMENT = 0.9
+
+    def __init__(self, linear_program, method):
+        assert method in self.METHODS, f'scaling method must be one of {self.METHODS}'
+
+        self._linear_program = linear_program
+        self._method = method
+        self._magnitudes = _abs(linear_program.lefthand_side)
+        self._row_factors = np.ones(linear_program.constraints_count)
+        self._column_factors = np.ones(linear_program.variables_count)
+
+    def _scaled_magnitudes(self):
+        if scipy.sparse.issparse(self._magnitudes):
+            return scipy.sparse.csc_matrix(scipy.sparse.diags(self._row_factors) @ self._magnitudes @ scipy.sparse.diags(self._column_factors))
+        return self._row_factors[:, np.newaxis] * self._magnitudes * self._column_factors
+
+    def _geometric_pass(self):
+        smallest, biggest = _nonzero_extremes(self._scaled_magnitudes(), 1)
+        self._row_factors /= np.sqrt(smallest * biggest)
+        smallest, biggest = _nonzero_extremes(self._scaled_magnitudes(), 0)
+        self._column_factors /= np.sqrt(smallest * biggest)
+
+    def _geometric(self):
+        spread = _spread(self._scaled_magnitudes())
+        for _ in range(self.GEOMETRIC_PASSES):
+            row_factors, column_factors = self._row_factors.copy(), self._column_factors.copy()
+            self._geometric_pass()
+            scaled_spread = _spread(self._scaled_magnitudes())
+            if scaled_spread > spread:
+                # the last pass made it worse
+                self._row_factors, self._column_factors = row_factors, column_factors
+                return
+            if scaled_spread > self.GEOMETRIC_MIN_IMPROVEMENT * spread:
+                return
+            spread = scaled_spread
+
+    def _equilibration(self):
+        _, biggest = _nonzero_extremes(self._scaled_magnitudes(), 1)
+        self._row_factors /= biggest
+        _, biggest = _nonzero_extremes(self._scaled_magnitudes(), 0)
+        self._column_factors /= biggest
+
+    def scale(self):
+        '''
+        Returns the scaled linear program and the Scaling which maps its solution back
+        '''
+        linear_program = self._linear_program
+        original_spread = _spread(self._magnitudes)
+        if self._method in ('geometric', 'geometric-equilibration'):
+            self._geometric()
+        if self._method in ('equilibration', 'geometric-equilibration'):
+            self._equilibration()
+        self._row_factors = _power_of_two(self._row_factors)
+        self._column_factors = _power_of_two(self._column_factors)
+
+        objective_function = np.asarray(linear_program.objective_function, dtype=np.float64) * self._column_factors
+        objective_magnitude = np.abs(objective_function).max(initial=0)
+        objective_factor = float(_power_of_two(1 / objective_magnitude)) if objective_magnitude > 0 else 1.0
+
+        lefthand_side = linear_program.lefthand_side
+        if linear_program.is_sparse:
+            lefthand_side = scipy.sparse.diags(self._row_factors) @ lefthand_side @ scipy.sparse.diags(self._column_factors)
+        else:
+            lefthand_side = self._row_factors[:, np.newaxis] * lefthand_side * self._column_factors
+
+        # imported here since linear_program solves with the scaler
+        from linear_program import StandardLinearProgram
+        lower_bounds, upper_bounds = linear_program.lower_bounds, linear_program.upper_bounds
+        if lower_bounds is not None:
+            lower_bounds = lower_bounds / self._column_factors
+        if upper_bounds is not None:
+            upper_bounds = upper_bounds / self._column_factors
+        scaled_program = StandardLinearProgram(
+            objective_function * objective_factor, lefthand_side, np.asarray(linear_program.righthand_side, dtype=np.float64) * self._row_factors,
+            lower_bounds, upper_bounds)
+        scaling = Scaling(self._method, self._row_factors, self._column_factors, objective_factor,
+                          original_spread, _spread(self._scaled_magnitudes()))
+        return scaled_program, scaling
+
+
+def scale(linear_program, method):
+    return Scaler(linear_program, method).scale()
@@ -0,0 +1,124 @@
+import numpy as np
+
+
+def _ratios(numerators, denominators, relevant, default):
+    '''
+    numerators / denominators where relevant and default elsewhere, the irrelevant denominators (maybe zeros) are never divided by.
+    Works with the exact engine's Fractions as well.
+    '''
+    return np.where(relevant, numerators / np.where(relevant, denominators, 1), default)
+
+
+class Sensitivity(object):
+    '''
+    Sensitivity analysis of an optimal basis, computed from the final tableau rather than by re-solves:
+    dual_values - y_i, the objective value change per unit increase of the righthand-side b_i (shadow prices, non-negative)
+    reduced_costs - d_j = c_j - y^T A_j, zero for the basic variables, non-positive at the lower bound and non-negative at the upper bound
+    righthand_side_ranges - the [low, high] values of every b_i (the others unchanged) for which the basis remains optimal,
+                            within them the dual values remain the same
+    objective_function_ranges - the [low, high] values of every c_j (the others unchanged) for which the basis remains optimal,
+                                within them the solution remains the same
+    With the exact engine the values are exact (python integers and Fractions), the infinite range ends are floats.
+    '''
+    # coefficients of the tableau up to this magnitude are considered zero (the exact engine's are compared exactly)
+    TOLERANCE = 1e-9
+
+    def __init__(self, dual_values, reduced_costs, righthand_side_ranges, objective_function_ranges):
+        self.dual_values = dual_values
+        self.reduced_costs = reduced_costs
+        self.righthand_side_ranges = righthand_side_ranges
+        self.objective_function_ranges = objective_function_ranges
+
+    def unscale(self, row_factors, column_factors, objective_factor):
+        '''
+        Maps the sensitivity of the scaled linear program (in place) to the original linear program (see scaling.Scaling)
+        '''
+        self.dual_values = self.dual_values * row_factors / objective_factor
+        self.reduced_costs = self.reduced_costs / (objective_factor * column_factors)
+        self.righthand_side_ranges = self.righthand_side_ranges / row_factors[:, np.newaxis]
+        self.objective_function_ranges = self.objective_function_ranges / (objective_factor * column_factors)[:, np.newaxis]
+
+    def __str__(self):
+        return f'The dual values are: {", ".join(f"y_{index} = {value}" for index, value in enumerate(self.dual_values, 1))}'
+
+
+def _righthand_side_ranges(tableau, inverse, righthand_side, tolerance):
+    '''
+    Column i of B^-1 is the basic values change per unit increase of b_i, which may increase until a decreasing basic value reaches zero
+    or an increasing one reaches its upper bound (and decrease the other way around)
+    '''
+    values = np.maximum(tableau.get_basic_values(), 0)[:, np.newaxis]
+    upper_bounds = tableau.get_basic_upper_bounds()[:, np.newaxis]
+    increasing, decreasing = inverse > tolerance, inverse < -tolerance
+    bounded = upper_bounds < np.inf
+    increase = np.minimum(_ratios(values, -inverse, decreasing, np.inf),
+                          _ratios(upper_bounds - values, inverse, increasing & bounded, np.inf)).min(axis=0, initial=np.inf)
+    decrease = np.minimum(_ratios(values, inverse, increasing, np.inf),
+                          _ratios(upper_bounds - values, -inverse, decreasing & bounded, np.inf)).min(axis=0, initial=np.inf)
+    return np.column_stack((righthand_side - decrease, righthand_side + increase))
+
+
+def sensitivity(tableau, linear_program):
+    '''
+    The Sensitivity of the tableau's optimal basis, by the tableau's rows (B^-1 A for all the variables, the slack columns are B^-1).
+    A complemented variable (see flip_bound) has its column and objective function coefficient negated.
+    '''
+    tolerance = 0 if tableau.is_exact else Sensitivity.TOLERANCE
+    basis = tableau.get_basis()
+    variables_count, constraints_count = basis.variables_count, basis.constraints_count
+    real_variables = np.arange(1, variables_count + 1)
+    slack_variables = np.arange(variables_count + 1, variables_count + constraints_count + 1)
+    coefficients = tableau.get_objective_function_coefficients()
+    signs = np.where(tableau.get_complemented()[:variables_count + constraints_count + 1], -1, 1)
+    rows = np.array([tableau.get_row(constraint_index) for constraint_index in range(1, constraints_count + 1)]).reshape(constraints_count, len(coefficients))
+
+    dual_values = -coefficients[slack_variables]
+    reduced_costs = signs[real_variables] * coefficients[real_variables]
+    righthand_side = np.asarray(linear_program.righthand_side)
+    righthand_side_ranges = _righthand_side_ranges(tableau, rows[:, slack_variables], righthand_side, tolerance)
+
+    # a non-basic variable's coefficient may increase (decrease when complemented) until its reduced cost reaches zero
+    objective_function = np.asarray(linear_program.objective_function)
+    limits = objective_function - reduced_costs
+    objective_function_ranges = np.column_stack((np.where(signs[real_variables] < 0, limits, -np.inf), np.where(signs[real_variables] > 0, limits, np.inf)))
+
+    # a basic variable's coefficient changes the reduced costs of the non-basic variables by its row, the range keeps them all non-positive.
+    # the variables fixed by their bounds never enter, so they don't limit it
+    is_basic = np.zeros(variables_count + constraints_count + 1, dtype=bool)
+    is_basic[basis.basic_variables] = True
+    non_basic = np.flatnonzero(~is_basic & (tableau.get_upper_bounds()[:variables_count + constraints_count + 1] > 0))
+    non_basic = non_basic[non_basic > 0]
+    basic_rows = np.flatnonzero(basis.basic_variables <= variables_count)
+    basic_variables = basis.basic_variables[basic_rows]
+    changes = signs[basic_variables][:, np.newaxis] * rows[basic_rows][:, non_basic]
+    reduced_costs_limits = coefficients[non_basic][np.newaxis]
+    decrease = _ratios(reduced_costs_limits, changes, changes > tolerance, -np.inf).max(axis=1, initial=-np.inf)
+    increase = _ratios(reduced_costs_limits, changes, changes < -tolerance, np.inf).min(axis=1, initial=np.inf)
+    objective_function_ranges[basic_variables - 1, 0] = objective_function[basic_variables - 1] + decrease
+    objective_function_ranges[basic_variables - 1, 1] = objective_function[basic_variables - 1] + increase
+    return Sensitivity(dual_values, reduced_costs, righthand_side_ranges, objective_function_ranges)
+
+
+class ParametricSweep(object):
+    '''
+    The optimal solutions of max c^T x s.t. A x <= b + t * direction along the parameter t (see Simplex.parametric_righthand_side):
+    at t = 0, at every breakpoint where the optimal basis changes, and at the end of the sweep.
+    The objective value is piecewise linear in t, objective_slopes[k] (y^T direction of the basis) is its slope from parameters[k] to the next breakpoint.
+    status is 'optimal' when the sweep reached its end, or 'infeasible' when the linear program is infeasible beyond the last breakpoint.
+    '''
+    def __init__(self, parameters, solutions, objective_slopes, status):
+        self.parameters = parameters
+        self.solutions = solutions
+        self.objective_slopes = objective_slopes
+        self.status = status
+
+    @property
+    def objective_values(self):
+        return np.array([solution.objective_value for solution in self.solutions])
+
+    def __str__(self):
+        lines = [f't = {parameter:.6g}: objective value {solution.objective_value:.10g}, slope {slope:.6g}, {solution.iterations_count} pivots'
+                 for parameter, solution, slope in zip(self.parameters, self.solutions, self.objective_slopes)]
+        if self.status == 'infeasible':
+            lines.append(f'infeasible beyond t = {self.parameters[-1]:.6g}')
+        return '\n'.join(lines)
@@ -1,42 +1,93 @@
+import contextlib
 import exceptions
 import itertools
+import numpy as np
 import tableau
-from solution import Solution
+from instrumentation import timed
+from sensitivity import ParametricSweep, sensitivity as sensitivity_analysis
+from solution import Solution, SolutionStep
 
 class Simplex(object):
-    def __init__(self, strategy, max_iterations):
+    _INFEASIBILITY_TOLERANCE = 1e-9
+    # tolerances for deciding if a starting basis is primal / dual feasible
+    _FEASIBILITY_TOLERANCE = 1e-9
+    _OPTIMALITY_TOLERANCE = 1e-9
+    # smallest pivot element accepted while installing a warm start basis
+    _PIVOT_TOLERANCE = 1e-9
+    # basic values changing slower than this along a parametric direction never reach a bound
+    _PARAMETRIC_RATE_TOLERANCE = 1e-9
+
+    def __init__(self, strategy, max_iterations, engine=None, instrumentation=None):
+        '''
+        engine is the tableau class used to solve the linear program: the dense tableau (default) or the revised tableau.
+        instrumentation receives the solve hooks and stage timings (see instrumentation.py), None costs nothing.
+        '''
+        if engine is None:
+            engine = tableau.tableau
+
         self._strategy = strategy
         self._max_iterations = max_iterations
+        self._engine = engine
+        self._instrumentation = instrumentation
+
+    @staticmethod
+    def _tolerance(tableau, tolerance):
+        # exact engines compare exactly
+        return 0 if tableau.is_exact else tolerance
 
-    def _is_optimal_solution(self, tableau):
+    def _pivot(self, tableau, entering_var, leaving_var, iteration=True):
         '''
-        Solution is optimal if all variable coefficients are non-positive in objective function
+        Changes base, the strategy may keep state about the basis (like pricing weights).
+        Only a simplex iteration is reported by on_pivot (installing a warm start basis changes base without iterations), both are timed.
         '''
-        # Note: first item is free variables coefficient
-        return all(x <= 0 for i, x in enumerate(tableau.get_objective_function_coefficients()) if i > 0)
+        timed(self._instrumentation, 'weights_update', self._strategy.on_change_base, tableau, entering_var, leaving_var)
+        timed(self._instrumentation, 'pivot', tableau.change_base, entering_var, leaving_var)
+        if iteration and self._instrumentation is not None:
+            self._instrumentation.on_pivot(tableau, entering_var, leaving_var)
 
-    def _optimize_solution(self, tableau):
-        entering_var = self._strategy.find_entering(tableau)
-        leaving_var = self._strategy.find_leaving(tableau, entering_var)
+    def _flip_bound(self, tableau, variable):
+        timed(self._instrumentation, 'bound_flip', tableau.flip_bound, variable)
+
+    def _notify_phase(self, tableau, phase):
+        if self._instrumentation is not None:
+            self._instrumentation.on_phase_change(tableau, phase)
+
+    def _optimize_solution(self, tableau, entering_var):
+        leaving_var = timed(self._instrumentation, 'ratio_test', self._strategy.find_leaving, tableau, entering_var)
         if leaving_var is None:
             raise exceptions.SimplexProblemUnboundedError()
 
-        tableau.change_base(entering_var, leaving_var)
+        if leaving_var == entering_var:
+            # the entering variable reaches its upper bound before any basic variable reaches a bound
+            self._flip_bound(tableau, entering_var)
+            if self._instrumentation is not None:
+                self._instrumentation.on_pivot(tableau, entering_var, entering_var)
+            return
+
+        if tableau.get_column(entering_var)[tableau.get_constraint_representing_variable(leaving_var) - 1] < 0:
+            # the leaving variable reaches its upper bound, once complemented it leaves at zero like the others
+            self._flip_bound(tableau, leaving_var)
+        self._pivot(tableau, entering_var, leaving_var)
 
     def _solve_phase_steps(self, tableau):
-        while not self._is_optimal_solution(tableau) and tableau.pivots_count < self._max_iterations:
-            self._optimize_solution(tableau)
-            yield Solution(tableau, self._strategy)
+        while True:
+            # the strategy finds no entering variable when all objective function coefficients are non-positive (the solution is optimal)
+            entering_var = timed(self._instrumentation, 'pricing', self._strategy.find_entering, tableau)
+            if entering_var is None:
+                return
 
-        if not self._is_optimal_solution(tableau) and tableau.pivots_count >= self._max_iterations:
-            raise exceptions.SimplexIterationsLimitExceedError()
+            if tableau.pivots_count >= self._max_iterations:
+                raise exceptions.SimplexIterationsLimitExceedError()
+
+            self._optimize_solution(tableau, entering_var)
+            yield tableau
 
     def _phase1_steps(self, tableau):
         if tableau.pivots_count >= self._max_iterations:
             raise exceptions.SimplexIterationsLimitExceedError()
 
         if not tableau.should_initialize:
-            yield Solution(tableau, self._strategy)
+            yield tableau
             return
 
         leaving_var, free_var_value = tableau.get_most_infeasible_basic_variable_info()
@@ -44,36 +95,305 @@ class Simplex(object):
             # nothing to do
             return
 
-        with tableau.use_artificial_argument():
+        self._notify_phase(tableau, 'phase1')
+        with contextlib.ExitStack() as artificial_variable:
+            timed(self._instrumentation, 'phase1_setup', artificial_variable.enter_context, tableau.use_artificial_argument())
             # perfrom first mandatory pivot
-            tableau.change_base(-1, leaving_var)
+            self._pivot(tableau, -1, leaving_var)
 
             if tableau.pivots_count >= self._max_iterations:
                 raise exceptions.SimplexIterationsLimitExceedError()
 
-            yield Solution(tableau, self._strategy)
+            yield tableau
 
             # solve single phase normally
-            for solution in self._solve_phase_steps(tableau):
-                yield solution
+            yield from self._solve_phase_steps(tableau)
 
-            if tableau.get_objective_function_coefficients()[0] > 0:
+            # the auxiliary objective is -x_0, so a feasible problem must reach zero
+            if tableau.get_objective_value() < -self._tolerance(tableau, self._INFEASIBILITY_TOLERANCE):
                 raise exceptions.SimplexProblemInfeasibleError()
 
+            self._drive_out_artificial_variable(tableau)
+
+    def _drive_out_artificial_variable(self, tableau):
+        '''
+        The artificial variable may remain basic (at zero level) after phase 1, so it is replaced by a degenerate pivot before it is removed
+        '''
+        constraint_index = tableau.get_constraint_representing_variable(-1)
+        if constraint_index is None:
+            return
+
+        row = np.abs(tableau.get_row(constraint_index))
+        # skip the free variable and the artificial variable itself
+        row[0] = row[-1] = 0
+        self._pivot(tableau, int(np.argmax(row)), -1)
+
     def _phase2_steps(self, tableau):
-        tableau.use_objective_function()
-        got_solution = False
-        for solution in self._solve_phase_steps(tableau):
-            yield solution
-            if not got_solution:
-                got_solution = True
-
-        if not got_solution:
-            yield Solution(tableau, self._strategy)
-
-    def solution_steps(self, linear_program):
-        tableau_obj = tableau.tableau(linear_program)
+        self._notify_phase(tableau, 'phase2')
+        timed(self._instrumentation, 'objective_setup', tableau.use_objective_function)
+        got_step = False
+        for step in self._solve_phase_steps(tableau):
+            yield step
+            got_step = True
+
+        if not got_step:
+            yield tableau
+
+    def _installing_constraint(self, tableau, variable, basic_variables):
+        '''
+        The constraint whose basic variable the basis variable replaces while installing the basis,
+        None if it's basic already or it can't enter (its column is dependent on the already installed ones)
+        '''
+        if tableau.get_constraint_representing_variable(variable) is not None:
+            return None
+
+        # only constraints whose basic variables are not part of the installed basis may be given away
+        replaceable = ~np.isin(tableau.get_basis().basic_variables, basic_variables)
+        column = np.where(replaceable, np.abs(tableau.get_column(variable)), 0)
+        constraint_index = int(np.argmax(column)) + 1
+        if column[constraint_index - 1] <= self._tolerance(tableau, self._PIVOT_TOLERANCE):
+            return None
+        return constraint_index
+
+    def _install_basis(self, tableau, basis):
+        '''
+        Pivots the basis variables into the initial (slack) basis.
+        The installation pivots aren't simplex iterations so they aren't counted (nor reported by on_pivot), but they are timed like them.
+        '''
+        basic_variables = basis.basic_variables[basis.basic_variables <= basis.variables_count + basis.constraints_count]
+        for variable in basic_variables:
+            constraint_index = timed(self._instrumentation, 'basis_install', self._installing_constraint, tableau, variable, basic_variables)
+            if constraint_index is not None:
+                self._pivot(tableau, variable, tableau.get_variable_representing_constraint(constraint_index), iteration=False)
+
+        # the bounds may have changed since, so only variables which still have an upper bound start at it
+        upper_bounds = tableau.get_upper_bounds()
+        for variable in basis.upper_bounded_variables:
+            if tableau.get_constraint_representing_variable(variable) is None and upper_bounds[variable] < np.inf:
+                self._flip_bound(tableau, variable)
+
+        tableau.pivots_count = 0
+        tableau.degenerate_pivots_count = 0
+        tableau.bound_flips_count = 0
+
+    def _dual_phase_steps(self, tableau):
+        '''
+        Dual simplex iterations: keeps the objective coefficients non-positive (dual feasible) while driving the negative basic variables out
+        '''
+        while True:
+            leaving_var = timed(self._instrumentation, 'pricing', self._strategy.find_dual_leaving, tableau)
+            if leaving_var is None:
+                return
+
+            if tableau.pivots_count >= self._max_iterations:
+                raise exceptions.SimplexIterationsLimitExceedError()
+
+            if tableau.get_basic_values()[tableau.get_constraint_representing_variable(leaving_var) - 1] > 0:
+                # the leaving variable is above its upper bound, once complemented it is negative like the others
+                self._flip_bound(tableau, leaving_var)
+            entering_var = timed(self._instrumentation, 'ratio_test', self._strategy.find_dual_entering, tableau, leaving_var)
+            if entering_var is None:
+                raise exceptions.SimplexProblemInfeasibleError()
+
+            self._pivot(tableau, entering_var, leaving_var)
+            yield tableau
+
+    def _warm_start_steps(self, linear_program, tableau, basis):
+        assert (basis.constraints_count, basis.variables_count) == (linear_program.constraints_count, linear_program.variables_count), \
+            'warm start basis must be of a linear program with the same shape'
+
+        self._install_basis(tableau, basis)
+        self._notify_phase(tableau, 'warm_start')
+        timed(self._instrumentation, 'objective_setup', tableau.use_objective_function)
+
+        basic_values = tableau.get_basic_values()
+        feasibility_tolerance = self._tolerance(tableau, self._FEASIBILITY_TOLERANCE)
+        primal_feasible = np.all(basic_values >= -feasibility_tolerance) and \
+            np.all(basic_values <= tableau.get_basic_upper_bounds() + feasibility_tolerance)
+        dual_feasible = np.all(tableau.get_objective_function_coefficients()[1:] <= self._tolerance(tableau, self._OPTIMALITY_TOLERANCE))
+        if not primal_feasible and not dual_feasible:
+            # the basis is of no use, solve from the start
+            yield from self._tableau_steps(linear_program)
+            return
+
+        yield tableau
+        if not primal_feasible:
+            # typically the righthand-side has changed, the objective coefficients are still optimal
+            self._notify_phase(tableau, 'dual')
+            yield from self._dual_phase_steps(tableau)
+
+        # typically the objective function has changed, the basis is still feasible
+        self._notify_phase(tableau, 'phase2')
+        yield from self._solve_phase_steps(tableau)
+
+    def _tableau_steps(self, linear_program, warm_start=None):
+        '''
+        Yields the tableau after every simplex step (it is the same tableau object, changed in place)
+        '''
+        tableau_obj = self._engine(linear_program)
+        if warm_start is not None:
+            return self._warm_start_steps(linear_program, tableau_obj, warm_start)
         return itertools.chain(self._phase1_steps(tableau_obj), self._phase2_steps(tableau_obj))
 
-    def solve(self, linear_program):
-        return list(self.solution_steps(linear_program))[-1]
+    def solution_steps(self, linear_program, warm_start=None, every=1):
+        '''
+        Yields a SolutionStep (a lazy view of the tableau) after the simplex steps, only every k-th step is yielded (the last one always is).
+        warm_start is a Basis of a previous solution (of a linear program with the same shape) to start from.
+        After objective function changes it remains feasible and primal simplex continues from it,
+        after righthand-side changes it remains optimal (dual feasible) and dual simplex continues from it.
+        '''
+        assert every > 0, 'steps interval must be positive'
+        return self._lazy_steps(self._instrumented_steps(linear_program, warm_start), every)
+
+    def _instrumented_steps(self, linear_program, warm_start):
+        if self._instrumentation is None:
+            yield from self._tableau_steps(linear_program, warm_start)
+            return
+
+        self._instrumentation.on_solve_start(linear_program)
+        tableau_obj = None
+        try:
+            for tableau_obj in self._tableau_steps(linear_program, warm_start):
+                yield tableau_obj
+        finally:
+            # also when the solve raises (infeasible, unbounded, ...), so the open phase is summarized
+            self._instrumentation.on_solve_end(tableau_obj)
+
+    def _lazy_steps(self, tableau_steps, every):
+        yielded = True
+        for index, tableau_obj in enumerate(tableau_steps):
+            yielded = index % every == 0
+            if yielded:
+                yield SolutionStep(tableau_obj, self._strategy)
+
+        if not yielded:
+            yield SolutionStep(tableau_obj, self._strategy)
+
+    def solve(self, linear_program, warm_start=None, sensitivity=False):
+        '''
+        sensitivity attaches the sensitivity analysis of the optimal basis as Solution.sensitivity (see sensitivity.py)
+        '''
+        # only the final tableau is needed, so no step is materialized
+        for tableau_obj in self._instrumented_steps(linear_program, warm_start):
+            pass
+        solution = Solution(tableau_obj, self._strategy)
+        if sensitivity:
+            solution.sensitivity = timed(self._instrumentation, 'sensitivity', sensitivity_analysis, tableau_obj, linear_program)
+        if self._instrumentation is not None:
+            solution.profile = self._instrumentation.report()
+        return solution
+
+    def _parametric_step(self, tableau, rates):
+        '''
+        Returns the parameter step until the first basic variable reaches a bound while the basic values change by rates per unit,
+        and its constraint index (None if no basic variable ever does)
+        '''
+        basic_values = np.maximum(tableau.get_basic_values(), 0)
+        upper_bounds = tableau.get_basic_upper_bounds()
+        to_lower = rates < -self._PARAMETRIC_RATE_TOLERANCE
+        to_upper = (rates > self._PARAMETRIC_RATE_TOLERANCE) & (upper_bounds < np.inf)
+        steps = np.full(len(rates), np.inf)
+        steps[to_lower] = basic_values[to_lower] / -rates[to_lower]
+        steps[to_upper] = np.maximum(upper_bounds[to_upper] - basic_values[to_upper], 0) / rates[to_upper]
+        if not np.any(to_lower | to_upper):
+            return np.inf, None
+        constraint_index = int(np.argmin(steps)) + 1
+        return steps[constraint_index - 1], constraint_index
+
+    @staticmethod
+    def _objective_slope(tableau, direction):
+        # the duals are minus the slack variables' objective function coefficients
+        basis = tableau.get_basis()
+        return float(-tableau.get_objective_function_coefficients()[basis.variables_count + 1:] @ direction)
+
+    def parametric_righthand_side(self, linear_program, direction, max_parameter=np.inf, warm_start=None):
+        '''
+        Solves the linear program with the righthand-side b + t * direction for t from 0 to max_parameter, returns a sensitivity.ParametricSweep.
+        The optimal basis at t = 0 remains optimal until a basic variable reaches a bound, there the righthand-side is shifted in place
+        and the basic variable leaves by a dual simplex pivot (the entering variable is chosen by the strategy's dual ratio test), which keeps the basis optimal.
+        Only the floating point engines shift the righthand-side in place.
+        '''
+        direction = np.asarray(direction, dtype=np.float64)
+        assert direction.shape == (linear_program.constraints_count,), 'the direction must have an item per constraint'
+
+        for tableau_obj in self._instrumented_steps(linear_program, warm_start):
+            pass
+        # the engine may be any factory (like a functools.partial), so the tableau itself is asked
+        assert not tableau_obj.is_exact, 'the parametric righthand-side requires a floating point engine'
+        parameter = 0
+        parameters, solutions, slopes = [parameter], [Solution(tableau_obj, self._strategy)], [self._objective_slope(tableau_obj, direction)]
+        while True:
+            rates = tableau_obj.get_basic_values_change(direction)
+            step, constraint_index = self._parametric_step(tableau_obj, rates)
+            if parameter + step >= max_parameter:
+                if max_parameter < np.inf:
+                    tableau_obj.shift_righthand_side((max_parameter - parameter) * direction)
+                    parameters.append(max_parameter)
+                    solutions.append(Solution(tableau_obj, self._strategy))
+                    slopes.append(slopes[-1])
+                return ParametricSweep(np.array(parameters), solutions, np.array(slopes), 'optimal')
+
+            tableau_obj.shift_righthand_side(step * direction)
+            parameter += step
+            leaving_var = tableau_obj.get_variable_representing_constraint(constraint_index)
+            if rates[constraint_index - 1] > 0:
+                # the leaving variable reaches its upper bound, once complemented it leaves at zero like the others
+                self._flip_bound(tableau_obj, leaving_var)
+            entering_var = timed(self._instrumentation, 'ratio_test', self._strategy.find_dual_entering, tableau_obj, leaving_var)
+            if entering_var is None:
+                # the basic variable can't get back within its bounds
+                parameters.append(parameter)
+                solutions.append(Solution(tableau_obj, self._strategy))
+                slopes.append(slopes[-1])
+                return ParametricSweep(np.array(parameters), solutions, np.array(slopes), 'infeasible')
+
+            if tableau_obj.pivots_count >= self._max_iterations:
+                raise exceptions.SimplexIterationsLimitExceedError()
+            self._pivot(tableau_obj, entering_var, leaving_var)
+            if parameters[-1] == parameter:
+                # a degenerate breakpoint, the basis changed again at the same parameter
+                del parameters[-1], solutions[-1], slopes[-1]
+            parameters.append(parameter)
+            solutions.append(Solution(tableau_obj, self._strategy))
+            slopes.append(self._objective_slope(tableau_obj, direction))
+
+
+class DualSimplex(Simplex):
+    '''
+    Dual simplex starts from the slack basis when it is dual feasible (every objective function coefficient is non-positive,
+    or its variable has a finite upper bound and starts complemented at it), and pivots the negative basic variables out
+    while keeping it dual feasible, so phase 1 is never needed.
+    The pivots are chosen by the strategy's find_dual_leaving and find_dual_entering.
+    If the slack basis isn't dual feasible the linear program is solved with the primal simplex.
+    '''
+    @staticmethod
+    def is_dual_feasible(linear_program):
+        return bool(np.all((linear_program.objective_function <= 0) | np.isfinite(linear_program.get_upper_bounds())))
+
+    @staticmethod
+    def is_preferred(linear_program):
+        '''
+        Dual simplex is preferred when the slack basis is dual feasible but not primal feasible (phase 1 would be needed),
+        the slack variables' values are the righthand-side shifted by the lower bounds (b - A l)
+        '''
+        righthand_side = linear_program.righthand_side - linear_program.lefthand_side @ linear_program.get_lower_bounds()
+        return DualSimplex.is_dual_feasible(linear_program) and min(righthand_side, default=0) < 0
+
+    def _dual_steps(self, tableau):
+        self._notify_phase(tableau, 'dual')
+        timed(self._instrumentation, 'objective_setup', tableau.use_objective_function)
+        # the variables with a positive cost (and a finite upper bound, see is_dual_feasible) start at their upper bound,
+        # complemented their cost is negated, like installing a basis these flips aren't counted
+        for variable in np.flatnonzero(tableau.get_objective_function_coefficients()[1:] > 0) + 1:
+            self._flip_bound(tableau, int(variable))
+        tableau.bound_flips_count = 0
+        yield tableau
+        yield from self._dual_phase_steps(tableau)
+        # a dual feasible basis which is primal feasible is optimal, unless numerical drift says otherwise
+        self._notify_phase(tableau, 'phase2')
+        yield from self._solve_phase_steps(tableau)
+
+    def _tableau_steps(self, linear_program, warm_start=None):
+        if warm_start is not None or not self.is_dual_feasible(linear_program):
+            return super()._tableau_steps(linear_program, warm_start)
+        return self._dual_steps(self._engine(linear_program))
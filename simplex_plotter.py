@@ -42,7 +42,9 @@ class Simplex3DPlotter(object):
     def demo(self, pivot_strategy=None):
         gotOptimal = False
         ax = plt.gca()
-        for sol, is_last in utils.items_final_indicator(LinearProgramSolver.solve_simplex_steps(self._linear_program, pivot_strategy=pivot_strategy)):
+        # the steps are materialized since the next step is looked ahead before the current one is drawn
+        steps = (step.materialize() for step in LinearProgramSolver.solve_simplex_steps(self._linear_program, pivot_strategy=pivot_strategy))
+        for sol, is_last in utils.items_final_indicator(steps):
             print(sol)
             if self._previous_point is not None:
                 line_x, line_y, line_z = ([p1, p2] for (p1, p2) in zip(self._previous_point, sol.solution))
@@ -1,14 +1,106 @@
+import numpy as np
+
+
 class Solution(object):
+    status = 'optimal'
+
     def __init__(self, tableau, pivot_strategy):
         self.solution = tableau.get_current_solution()
-        self.objective_value = tableau[0, 0]
+        self.objective_value = tableau.get_objective_value()
         self.pivot_strategy = pivot_strategy
         self.iterations_count = tableau.pivots_count
+        # iterations which didn't improve the objective value (zero step)
+        self.degenerate_iterations_count = tableau.degenerate_pivots_count
+        # iterations which moved a variable between its bounds without changing the basis
+        self.bound_flips_count = tableau.bound_flips_count
+        # the basis of this solution, can be used to warm start a re-solve of a similar linear program
+        self.basis = tableau.get_basis()
+        # the Postsolve stack when the linear program was presolved (see presolve.py)
+        self.presolve = None
+        # the Scaling when the linear program was scaled (see scaling.py)
+        self.scaling = None
+        # the ProfileReport when the solve was instrumented (see instrumentation.py)
+        self.profile = None
+        # the InteriorPointResult when the solve started with the interior point method (see interior_point.py)
+        self.interior_point = None
+        # the Perturbation when the righthand side was perturbed against degeneracy (see perturbation.py)
+        self.perturbation = None
+        # the Sensitivity of the optimal basis when it was requested (see sensitivity.py)
+        self.sensitivity = None
 
     def __str__(self):
         data = f'''Possible optimal solution is: {', '.join(('x_{} = {}'.format(index, value) for index, value in enumerate(self.solution, 1)))}
 The objective value for this solution is: {self.objective_value}
-Total pivots count: {self.iterations_count}
+Total pivots count: {self.iterations_count} ({self.degenerate_iterations_count} degenerate)
 The pivot rule used: {self.pivot_strategy.__class__.__name__}
 '''
+        if self.presolve is not None:
+            data += f'{self.presolve}\n'
+        if self.scaling is not None:
+            data += f'{self.scaling}\n'
+        if self.interior_point is not None:
+            data += f'{self.interior_point}\n'
+        if self.perturbation is not None:
+            data += f'{self.perturbation}\n'
+        if self.sensitivity is not None:
+            data += f'{self.sensitivity}\n'
+        if self.profile is not None:
+            data += f'{self.profile}'
         return data
+
+
+class SolutionStep(object):
+    '''
+    A lazy view of the tableau after a simplex step (see Simplex.solution_steps).
+    The scalars are recorded when the step is taken, while the solution and the basis are computed only when read.
+    The tableau is changed in place by the following steps, so they can be read only until the solve continues (use materialize to keep a step).
+    '''
+    def __init__(self, tableau, pivot_strategy):
+        self._tableau = tableau
+        self.objective_value = tableau.get_objective_value()
+        self.pivot_strategy = pivot_strategy
+        self.iterations_count = tableau.pivots_count
+        self.degenerate_iterations_count = tableau.degenerate_pivots_count
+        self.bound_flips_count = tableau.bound_flips_count
+
+    def _get_tableau(self):
+        assert (self._tableau.pivots_count, self._tableau.bound_flips_count) == (self.iterations_count, self.bound_flips_count), \
+            'the solve has continued since this step, materialize it to keep it'
+        return self._tableau
+
+    @property
+    def solution(self):
+        return self._get_tableau().get_current_solution()
+
+    @property
+    def basis(self):
+        return self._get_tableau().get_basis()
+
+    def materialize(self):
+        '''
+        Returns a Solution of this step, which remains valid while the solve continues
+        '''
+        return Solution(self._get_tableau(), self.pivot_strategy)
+
+    def __str__(self):
+        return str(self.materialize())
+
+
+class Basis(object):
+    '''
+    The basic variables (1-based: real variables, then slack variables) by their constraints,
+    and the non-basic variables which are at their upper bound (the others are at their lower bound)
+    '''
+    def __init__(self, basic_variables, constraints_count, variables_count, upper_bounded_variables=None):
+        if upper_bounded_variables is None:
+            upper_bounded_variables = np.zeros(0, dtype='int')
+
+        self.basic_variables = basic_variables
+        self.constraints_count = constraints_count
+        self.variables_count = variables_count
+        self.upper_bounded_variables = upper_bounded_variables
+
+    def __repr__(self):
+        if len(self.upper_bounded_variables) == 0:
+            return f'Basis({list(self.basic_variables)})'
+        return f'Basis({list(self.basic_variables)}, upper bounded: {list(self.upper_bounded_variables)})'
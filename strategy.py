@@ -1,54 +1,465 @@
+import numpy as np
+from utils import ones
+
+
 class Strategy(object):
+    # returns None if there is no relevant candidate, that is the solution is optimal
     def find_entering(self, tableau):
         raise NotImplementedError()
     def find_leaving(self, tableau, entering_variable):
         raise NotImplementedError()
+    def find_dual_leaving(self, tableau):
+        raise NotImplementedError()
+    def find_dual_entering(self, tableau, leaving_variable):
+        raise NotImplementedError()
+    def on_change_base(self, tableau, entering_variable, leaving_variable):
+        # called before every change of base, for strategies which keep state about the basis
+        pass
 
 
 class RatioTestStrategy(Strategy):
+    """
+    Base of the strategies which choose the leaving variable by the ratio test.
+    optimality_tolerance - the smallest objective function coefficient which makes a variable an entering candidate
+    feasibility_tolerance - basic values down to -feasibility_tolerance are considered feasible,
+                            the ratio test scales it down by the biggest basic value when that's smaller than 1 (see _ratio_test_tolerance)
+    pivot_tolerance - the smallest absolute coefficient accepted as a pivot element
+    harris - use the two pass Harris ratio test, which prefers large pivot elements among near ties
+    lexicographic - break the minimum ratio ties by the lexicographically smallest row of B^-1 divided by its pivot element,
+                    which keeps the rows lexicographically positive so no basis repeats (starting from the slack basis)
+    stalling_pivots - once the consecutive degenerate pivots (which didn't improve the objective) repeat a basis, or there are this many of them
+                      (by default DEFAULT_STALLING_PIVOTS_PER_CONSTRAINT times the constraints count), the entering and leaving variables
+                      are chosen by Bland's rule (the smallest index candidate and the smallest index among the minimum ratio ties)
+                      until a pivot improves the objective again, so the simplex terminates (there are finitely many bases, and Bland's rule doesn't cycle)
+    Subclasses implement their pricing in _find_entering.
+    """
+    DEFAULT_OPTIMALITY_TOLERANCE = 1e-9
+    DEFAULT_FEASIBILITY_TOLERANCE = 1e-9
+    DEFAULT_PIVOT_TOLERANCE = 1e-9
+    # long degenerate streaks are common on highly degenerate linear programs, where Bland's rule is much slower than the strategies' pricing,
+    # so by default it takes over only after many of them (streaks of up to about 10 pivots per constraint still end by themselves)
+    DEFAULT_STALLING_PIVOTS_PER_CONSTRAINT = 30
+
+    def __init__(self, optimality_tolerance=None, feasibility_tolerance=None, pivot_tolerance=None, harris=False, lexicographic=False,
+                 stalling_pivots=None):
+        if optimality_tolerance is None:
+            optimality_tolerance = self.DEFAULT_OPTIMALITY_TOLERANCE
+        if feasibility_tolerance is None:
+            feasibility_tolerance = self.DEFAULT_FEASIBILITY_TOLERANCE
+        if pivot_tolerance is None:
+            pivot_tolerance = self.DEFAULT_PIVOT_TOLERANCE
+        assert min(optimality_tolerance, feasibility_tolerance, pivot_tolerance) >= 0, 'tolerances must be non-negative'
+        assert stalling_pivots is None or stalling_pivots > 0, 'stalling pivots must be positive'
+
+        self._optimality_tolerance = optimality_tolerance
+        self._feasibility_tolerance = feasibility_tolerance
+        self._pivot_tolerance = pivot_tolerance
+        self._harris = harris
+        self._lexicographic = lexicographic
+        self._stalling_pivots = stalling_pivots
+        # the tableau and its (pivots, degenerate pivots, bound flips) counts when last priced,
+        # and the consecutive degenerate pivots since with the hashes of the bases they went through (at most stalling_pivots of them)
+        self._stalling_tableau = None
+        self._stalling_counts = None
+        self._degenerate_streak = 0
+        self._streak_bases = set()
+        self._stalling = False
+
+    def __getstate__(self):
+        # the stalling state is of a specific tableau, there is no point copying it
+        return dict(self.__dict__, _stalling_tableau=None, _stalling_counts=None, _degenerate_streak=0, _streak_bases=set(), _stalling=False)
+
+    def _is_stalling(self, tableau):
+        '''
+        Counts the consecutive degenerate pivots, any pivot or bound flip which improved the objective (or another tableau) resets the count.
+        Stalling lasts from a repeated basis (or stalling_pivots degenerate pivots) until the count is reset.
+        '''
+        stalling_pivots = self._stalling_pivots
+        if stalling_pivots is None:
+            stalling_pivots = max(self.DEFAULT_STALLING_PIVOTS_PER_CONSTRAINT * tableau.constraints_count, 1)
+        counts = (tableau.pivots_count, tableau.degenerate_pivots_count, tableau.bound_flips_count)
+        # the counts are reset when the tableau is initialized again (like by a warm start)
+        same_tableau = self._stalling_tableau is tableau and counts[0] >= self._stalling_counts[0]
+        pivots, degenerate_pivots, bound_flips = np.subtract(counts, self._stalling_counts) if same_tableau else (0, 0, 0)
+        self._stalling_tableau = tableau
+        self._stalling_counts = counts
+        if not same_tableau or degenerate_pivots < pivots or bound_flips > 0:
+            self._degenerate_streak = 0
+            self._streak_bases = set()
+            return False
+        if pivots == 0:
+            return self._stalling
+
+        self._degenerate_streak += pivots
+        if self._stalling:
+            # Bland's rule doesn't cycle, there is no need to record its bases
+            return True
+        # the basic variables as a set, their order by the constraints doesn't matter,
+        # a hash collision only falls back to Bland's rule early
+        basis = hash(np.sort(tableau.get_basis().basic_variables).tobytes())
+        cycling = basis in self._streak_bases
+        self._streak_bases.add(basis)
+        return cycling or self._degenerate_streak >= stalling_pivots
+
+    def _find_entering(self, tableau):
+        raise NotImplementedError()
+
+    def find_entering(self, tableau):
+        """
+        Return the entering variable chosen by the subclass' pricing, or by Bland's rule (the smallest index candidate) while stalling.
+        """
+        self._stalling = self._is_stalling(tableau)
+        if self._stalling:
+            candidates = tableau.get_entering_candidates(self._optimality_tolerance)
+            return min(candidates, default=None)
+        return self._find_entering(tableau)
+
+    def _lexicographic_constraint(self, tableau, entering_column, rows):
+        '''
+        The row among rows whose B^-1 row divided by its pivot element is lexicographically smallest, the B^-1 rows are the slack variables' columns
+        '''
+        basis = tableau.get_basis()
+        slack_variables = np.arange(basis.variables_count + 1, basis.variables_count + basis.constraints_count + 1)
+        return min(rows, key=lambda row: tuple(tableau.get_row(row + 1)[slack_variables] / entering_column[row]))
+
+    def _ratio_test_tolerance(self, basic_values):
+        '''
+        The feasibility tolerance relative to the righthand-side magnitude (the biggest basic value) when it's smaller than 1,
+        so the steps of tiny-scale linear programs aren't taken as zero
+        '''
+        return self._feasibility_tolerance * min(1, np.max(np.abs(basic_values), initial=0))
+
     def _find_leaving_constraint(self, tableau, entering_variable):
         """
         Return the smallest constraint index (related to basic variable) according to the standard ratio test on the entering variable.
-        That is the leaving variable has the smallest b_i / a_ik ratio.
-        Also we apply Bland's rule to ensure the algorithm terminates. 
+        That is the leaving variable has the smallest b_i / a_ik ratio among the coefficients a_ik bigger than the pivot tolerance
+        (basic values within the ratio test tolerance of their bound count as at it, a zero step).
+        Basic variables with an upper bound u_i also limit the step when a_ik is smaller than minus the pivot tolerance, by (u_i - b_i) / -a_ik.
+        Ties are broken by the first constraint, which alone doesn't prevent cycling:
+        while stalling (see stalling_pivots) by Bland's rule, the smallest basic variable index, otherwise by the lexicographic rule or the Harris ratio test if used.
         Return None if unbounded.
         """
+        entering_column = tableau.get_column(entering_variable)
+        basic_values = tableau.get_basic_values()
+        to_lower = entering_column > self._pivot_tolerance
+        if tableau.has_upper_bounds:
+            basic_upper_bounds = tableau.get_basic_upper_bounds()
+            # compared to infinity rather than np.isfinite, which also works for the exact engine's Fractions
+            to_upper = (entering_column < -self._pivot_tolerance) & (basic_upper_bounds < np.inf)
+            rows = np.flatnonzero(to_lower | to_upper)
+            distances = np.where(to_lower[rows], basic_values[rows], basic_upper_bounds[rows] - basic_values[rows])
+        else:
+            rows = np.flatnonzero(to_lower)
+            distances = basic_values[rows]
+        if len(rows) == 0:
+            return None
+
+        pivot_elements = np.abs(entering_column[rows])
+        tolerance = self._ratio_test_tolerance(basic_values)
+        ratios = np.where(distances > tolerance, distances, 0) / pivot_elements
+        if self._stalling or self._lexicographic:
+            # the ties are exactly the minimum ratios, widening them (like the Harris step) would break the rules' termination,
+            # the pivot tolerance keeps the pivot elements stable
+            ties = np.flatnonzero(ratios == np.min(ratios))
+            if self._stalling:
+                basic_variables = tableau.get_basis().basic_variables
+                return rows[ties[np.argmin(basic_variables[rows[ties]])]] + 1
+            return self._lexicographic_constraint(tableau, entering_column, rows[ties]) + 1
 
-        min_ratio_index = None
-        min_ratio_value = float("inf")
-        for i in range(1, tableau.constraints_count + 1):
-            if tableau[i, entering_variable] <= 0:
-                continue
+        if not self._harris:
+            # argmin returns the first minimal ratio
+            return rows[np.argmin(ratios)] + 1
 
-            # looking at b_i / a_ik
-            ratio = -1 * tableau[i, 0] / tableau[i, entering_variable]
-            # < (strict LESS) because of Bland's rule guaranty that the algorithm will terminate eventually
-            if ratio < min_ratio_value:
-                min_ratio_index = i
-                min_ratio_value = ratio
+        # first pass: the biggest step which keeps all the basic values within their bounds up to feasibility_tolerance
+        max_step = np.min(ratios + tolerance / pivot_elements)
+        # second pass: the biggest (most stable) pivot element among the ratios within that step
+        eligible = np.flatnonzero(ratios <= max_step)
+        return rows[eligible[np.argmax(pivot_elements[eligible])]] + 1
 
-        return min_ratio_index
+    def _step_length(self, tableau, entering_variable, constraint_index):
+        '''
+        The step of the entering variable until the basic variable of constraint_index reaches its bound
+        '''
+        pivot_element = tableau.get_column(entering_variable)[constraint_index - 1]
+        basic_value = tableau.get_basic_values()[constraint_index - 1]
+        if pivot_element < 0:
+            basic_value = tableau.get_basic_upper_bounds()[constraint_index - 1] - basic_value
+        return max(basic_value, 0) / abs(pivot_element)
 
     def find_leaving(self, tableau, entering_variable):
+        """
+        Return the leaving variable, or the entering variable itself when it reaches its upper bound first (a bound flip).
+        Return None if unbounded.
+        """
         constraint_index = self._find_leaving_constraint(tableau, entering_variable)
+        if tableau.has_upper_bounds:
+            upper_bound = tableau.get_upper_bounds()[entering_variable]
+            if upper_bound < np.inf and (constraint_index is None or
+                                         upper_bound <= self._step_length(tableau, entering_variable, constraint_index)):
+                return entering_variable
         return tableau.get_variable_representing_constraint(constraint_index)
 
+    def find_dual_leaving(self, tableau):
+        """
+        Return the basic variable with the biggest bound violation, below zero or above its upper bound (the first one on ties).
+        Return None if all of them are within their bounds (up to tolerance), that is the basis is primal feasible.
+        """
+        infeasibilities = -tableau.get_basic_values()
+        if tableau.has_upper_bounds:
+            infeasibilities = np.maximum(infeasibilities, -infeasibilities - tableau.get_basic_upper_bounds())
+        if len(infeasibilities) == 0:
+            return None
+        constraint_index = int(np.argmax(infeasibilities)) + 1
+        if infeasibilities[constraint_index - 1] <= self._feasibility_tolerance:
+            return None
+        return tableau.get_variable_representing_constraint(constraint_index)
+
+    def find_dual_entering(self, tableau, leaving_variable):
+        """
+        Return the entering variable according to the dual ratio test on the leaving variable's constraint:
+        among the negative row coefficients a_rj, the smallest c_j / a_rj ratio keeps all objective coefficients non-positive.
+        Return None if there is no such coefficient (the linear program is infeasible).
+        """
+        row = tableau.get_row(tableau.get_constraint_representing_variable(leaving_variable))
+        coefficients = tableau.get_objective_function_coefficients()
+        candidates = np.flatnonzero(row[1:] < -self._pivot_tolerance) + 1
+        if len(candidates) == 0:
+            return None
+        return candidates[np.argmin(coefficients[candidates] / row[candidates])]
+
 
 class MaxCoefficientStrategy(RatioTestStrategy):
     """
     Maximum coefficient Strategy chooses the entering variable which has the biggest coefficient in objective function from relevant candidates (positive)
     """
-    def find_entering(self, tableau):
-        candidates = tableau.get_entering_candidates()
+    def _find_entering(self, tableau):
+        candidates = tableau.get_entering_candidates(self._optimality_tolerance)
+        if len(candidates) == 0:
+            return None
         coefficients = tableau.get_objective_function_coefficients()
-        return max(candidates, key=lambda i: coefficients[i])
+        # argmax returns the first maximal candidate, same as max() over the candidates
+        return candidates[np.argmax(coefficients[candidates])]
 
 
 class MinCoefficientStrategy(RatioTestStrategy):
     """
     Minimum coefficient Strategy chooses the entering variable which has the smallest coefficient in objective function from relevant candidates (positive)
     """
-    def find_entering(self, tableau):
-        candidates = tableau.get_entering_candidates()
+    def _find_entering(self, tableau):
+        candidates = tableau.get_entering_candidates(self._optimality_tolerance)
+        if len(candidates) == 0:
+            return None
         coefficients = tableau.get_objective_function_coefficients()
-        return min(candidates, key=lambda i: coefficients[i])
+        return candidates[np.argmin(coefficients[candidates])]
+
+
+class ReferenceWeightsStrategy(RatioTestStrategy):
+    """
+    Base of the strategies which normalize the objective function coefficients by a weight per variable,
+    and choose the entering variable with the biggest d_j^2 / w_j from relevant candidates (positive).
+    The weights are updated incrementally on every change of base (see on_change_base), and are initialized again
+    when the tableau changes base without the strategy knowing about it (a new linear program, a warm start basis, ...).
+    """
+    def __init__(self, **ratio_test_options):
+        super().__init__(**ratio_test_options)
+        self._tableau = None
+        self._pivots_count = None
+        self._weights = None
+
+    def __getstate__(self):
+        # the weights are of a specific tableau, there is no point copying them
+        return dict(super().__getstate__(), _tableau=None, _pivots_count=None, _weights=None)
+
+    def _initial_weights(self, tableau):
+        raise NotImplementedError()
+
+    def _artificial_variable_weight(self, tableau):
+        raise NotImplementedError()
+
+    def _update_weights(self, tableau, weights, entering_variable, leaving_variable, pivot_row, entering_column):
+        raise NotImplementedError()
+
+    def _get_weights(self, tableau):
+        variables_count = len(tableau.get_objective_function_coefficients())
+        if self._tableau is not tableau or self._pivots_count != tableau.pivots_count:
+            self._weights = self._initial_weights(tableau)
+        elif len(self._weights) == variables_count - 1:
+            # the artificial variable was added (phase 1 started)
+            self._weights = np.append(self._weights, self._artificial_variable_weight(tableau))
+        elif len(self._weights) == variables_count + 1:
+            # the artificial variable was removed (phase 1 ended)
+            self._weights = self._weights[:-1]
+
+        self._tableau = tableau
+        self._pivots_count = tableau.pivots_count
+        return self._weights
+
+    def _find_entering(self, tableau):
+        weights = self._get_weights(tableau)
+        candidates = tableau.get_entering_candidates(self._optimality_tolerance)
+        if len(candidates) == 0:
+            return None
+        coefficients = tableau.get_objective_function_coefficients()
+        return candidates[np.argmax(coefficients[candidates] ** 2 / weights[candidates])]
+
+    def on_change_base(self, tableau, entering_variable, leaving_variable):
+        weights = self._get_weights(tableau)
+        # the artificial variable may be referred to as -1
+        entering_variable %= len(weights)
+        leaving_variable %= len(weights)
+
+        # the weights are heuristic, so they are kept in floating point also with the exact engine
+        pivot_row = np.asarray(tableau.get_row(tableau.get_constraint_representing_variable(leaving_variable)), dtype=np.float64)
+        entering_column = np.asarray(tableau.get_column(entering_variable), dtype=np.float64)
+        self._update_weights(tableau, weights, entering_variable, leaving_variable, pivot_row, entering_column)
+        self._pivots_count = tableau.pivots_count + 1
+
+
+class SteepestEdgeStrategy(ReferenceWeightsStrategy):
+    """
+    Steepest edge Strategy chooses the entering variable whose edge has the steepest objective function ascent,
+    that is the biggest d_j^2 / gamma_j where gamma_j = 1 + ||B^-1 a_j||^2 is the squared edge length.
+    The exact weights are updated on every change of base with the Goldfarb-Reid recurrence, which costs a row combination per pivot.
+    """
+    def _initial_weights(self, tableau):
+        weights = ones(len(tableau.get_objective_function_coefficients()))
+        for constraint_index in range(1, tableau.constraints_count + 1):
+            weights += np.asarray(tableau.get_row(constraint_index), dtype=np.float64) ** 2
+        return weights
+
+    def _artificial_variable_weight(self, tableau):
+        return 1 + np.sum(np.asarray(tableau.get_column(-1), dtype=np.float64) ** 2)
+
+    def _update_weights(self, tableau, weights, entering_variable, leaving_variable, pivot_row, entering_column):
+        pivot_element = pivot_row[entering_variable]
+        ratios = pivot_row / pivot_element
+        ratios[0] = 0
+        entering_weight = weights[entering_variable]
+        # a_j^T B^-T B^-1 a_q for every variable j
+        products = tableau.get_rows_combination(entering_column)
+        np.maximum(weights - 2 * ratios * products + ratios ** 2 * entering_weight, 1 + ratios ** 2, out=weights)
+        weights[leaving_variable] = max(entering_weight / pivot_element ** 2, 1)
+
+
+class DevexStrategy(ReferenceWeightsStrategy):
+    """
+    Devex Strategy approximates the steepest edge weights relative to a reference framework (the non-basic variables when it was set),
+    starting with unit weights and updated from the pivot row only.
+    The reference framework is set again when the entering variable's weight is overestimated by more than RESET_FACTOR.
+    """
+    RESET_FACTOR = 3
+
+    def __init__(self, **ratio_test_options):
+        super().__init__(**ratio_test_options)
+        self._reference_variables = None
+
+    def _initial_weights(self, tableau):
+        variables_count = len(tableau.get_objective_function_coefficients())
+        self._reference_variables = np.ones(variables_count, dtype=bool)
+        self._reference_variables[0] = False
+        self._reference_variables[tableau.get_basis().basic_variables] = False
+        return ones(variables_count)
+
+    def _artificial_variable_weight(self, tableau):
+        self._reference_variables = np.append(self._reference_variables, False)
+        return 1
+
+    def _get_weights(self, tableau):
+        weights = super()._get_weights(tableau)
+        if len(self._reference_variables) == len(weights) + 1:
+            self._reference_variables = self._reference_variables[:-1]
+        return weights
+
+    def _update_weights(self, tableau, weights, entering_variable, leaving_variable, pivot_row, entering_column):
+        # the exact weight of the entering variable in the reference framework
+        reference_rows = self._reference_variables[tableau.get_basis().basic_variables]
+        exact_weight = self._reference_variables[entering_variable] + np.sum(entering_column[reference_rows] ** 2)
+        if weights[entering_variable] > self.RESET_FACTOR ** 2 * exact_weight:
+            weights[:] = self._initial_weights(tableau)
+
+        pivot_element = pivot_row[entering_variable]
+        ratios = pivot_row / pivot_element
+        ratios[0] = 0
+        entering_weight = weights[entering_variable]
+        np.maximum(weights, ratios ** 2 * entering_weight, out=weights)
+        weights[leaving_variable] = max(entering_weight / pivot_element ** 2, 1)
+
+
+class PartialPricingStrategy(RatioTestStrategy):
+    """
+    Partial pricing Strategy prices the variables in windows of window_size, starting where the previous scan stopped,
+    and chooses the entering variable with the biggest coefficient in the first window which has relevant candidates (positive).
+    Only when no window has candidates all the variables were priced, and the solution is optimal.
+    """
+    DEFAULT_WINDOW_SIZE = 1000
+
+    def __init__(self, window_size=None, **ratio_test_options):
+        super().__init__(**ratio_test_options)
+        if window_size is None:
+            window_size = self.DEFAULT_WINDOW_SIZE
+        assert window_size is None or window_size > 0, 'window size must be positive'
+
+        self._window_size = window_size
+        # the position of the next window start (0-based, the variables are 1-based)
+        self._position = 0
+
+    def _find_window_candidates(self, tableau):
+        '''
+        Returns the first window's relevant candidates and their coefficients, scanning all the windows at most once
+        '''
+        variables_count = tableau.variables_count
+        window_size = variables_count if self._window_size is None else min(self._window_size, variables_count)
+        for _ in range(-(-variables_count // window_size)):
+            variables = (self._position + np.arange(window_size)) % variables_count + 1
+            self._position = (self._position + window_size) % variables_count
+            coefficients = tableau.get_reduced_costs(variables)
+            positive = coefficients > self._optimality_tolerance
+            if positive.any():
+                return variables[positive], coefficients[positive]
+        return variables[:0], coefficients[:0]
+
+    def _find_entering(self, tableau):
+        candidates, coefficients = self._find_window_candidates(tableau)
+        if len(candidates) == 0:
+            return None
+        return candidates[np.argmax(coefficients)]
+
+
+class MultiplePricingStrategy(PartialPricingStrategy):
+    """
+    Multiple pricing Strategy keeps a list of up to candidates_count relevant candidates with the biggest coefficients.
+    The following pivots price only the listed variables and choose the one with the biggest coefficient,
+    the list is filled again by partial pricing when none of them is relevant anymore.
+    """
+    DEFAULT_CANDIDATES_COUNT = 8
+    # the list is filled by pricing all the variables
+    DEFAULT_WINDOW_SIZE = None
+
+    def __init__(self, candidates_count=None, window_size=None, **ratio_test_options):
+        if candidates_count is None:
+            candidates_count = self.DEFAULT_CANDIDATES_COUNT
+        assert candidates_count > 0, 'candidates count must be positive'
+
+        super().__init__(window_size, **ratio_test_options)
+        self._candidates_count = candidates_count
+        self._candidates = np.zeros(0, dtype='int')
+
+    def _find_entering(self, tableau):
+        # the artificial variable may have been removed since the list was filled
+        candidates = self._candidates[self._candidates <= tableau.variables_count]
+        coefficients = tableau.get_reduced_costs(candidates)
+        relevant = coefficients > self._optimality_tolerance
+        candidates, coefficients = candidates[relevant], coefficients[relevant]
+        if len(candidates) == 0:
+            candidates, coefficients = self._find_window_candidates(tableau)
+            if len(candidates) == 0:
+                return None
+            if len(candidates) > self._candidates_count:
+                best = np.argpartition(-coefficients, self._candidates_count - 1)[:self._candidates_count]
+                candidates, coefficients = candidates[best], coefficients[best]
+
+        best = np.argmax(coefficients)
+        entering_variable = candidates[best]
+        # the entering variable becomes basic
+        self._candidates = np.delete(candidates, best)
+        return entering_variable
@@ -1,7 +1,8 @@
 from contextlib import contextmanager
 import numpy as np
 import exceptions
-from utils import zeros, eye, ones
+from solution import Basis
+from utils import zeros
 
 class tableau(object):
     '''
@@ -17,6 +18,14 @@ class tableau(object):
 
     The tight variables list is a map between the constraints and the basic variables represented by them. This is the reciprocal of the basic variables list.
     Note that the first index (0) is reserved for the objective function, and isn't used and should always be zero.
+
+    Bounds are handled implicitly: the tableau is of x - l (so the lower bounds are zero), and a variable with a finite upper bound u
+    may be complemented (replaced by u - x, see flip_bound), so a non-basic variable at its upper bound is at zero like the others.
+
+    The storage is allocated once with a spare column for the artificial variable, the tableau and the per-variable arrays are views
+    of the active columns, so phase 1 and phase 2 never reallocate.
+    dtype (float64 or float32) and order (C - row major, F - column major) choose the tableau storage,
+    pass them with functools.partial(tableau, dtype=..., order=...) as the engine.
     '''
 
     _OBJECTIVE_ROW_INDEX = 0
@@ -24,7 +33,26 @@ class tableau(object):
     _VARIABLES_FREE_VARIABLE_COL_INDEX = 0
     _VARIABLES_COL_START_INDEX = 1
 
-    def __init__(self, linear_program):
+    # pivot columns with fewer non-zero rows than 1 / ratio are eliminated by gathering only those rows
+    _SPARSE_PIVOT_COLUMN_RATIO = 4
+    # number of elements in each block of the rank-1 update
+    _PIVOT_BLOCK_ELEMENTS = 1 << 16
+    # a pivot whose leaving variable value is within this tolerance of zero is counted as degenerate,
+    # relative to the biggest basic value when it's smaller than 1 so tiny-scale linear programs aren't all degenerate
+    _DEGENERATE_STEP_TOLERANCE = 1e-9
+    DEFAULT_DTYPE = np.float64
+    DEFAULT_ORDER = 'C'
+    # values are floating point, compared up to the tolerances (see exact_tableau.ExactTableau)
+    is_exact = False
+
+    def __init__(self, linear_program, dtype=None, order=None):
+        if dtype is None:
+            dtype = self.DEFAULT_DTYPE
+        if order is None:
+            order = self.DEFAULT_ORDER
+        assert np.dtype(dtype) in (np.float64, np.float32), 'tableau dtype must be float64 or float32'
+        assert order in ('C', 'F'), 'tableau order must be C or F'
+
         self._objective_function = linear_program.objective_function
         self._constraints_count = linear_program.constraints_count
         self._real_variables_count = linear_program.variables_count
@@ -32,31 +60,60 @@ class tableau(object):
         self._using_artificial_variable = False
         self._variables_count = self._constraints_count + self._real_variables_count
         self.pivots_count = 0
-
-        if min(linear_program.righthand_side) < 0:
+        # pivots which didn't change the basic values (zero step)
+        self.degenerate_pivots_count = 0
+        # non-basic variables moved between their bounds (see flip_bound)
+        self.bound_flips_count = 0
+
+        # the upper bounds (of x - l) of all variables including the free variable (and the artificial variable), and which variables are complemented
+        self._lower_bounds = linear_program.get_lower_bounds()
+        self._upper_bounds_storage = np.full(self._variables_count + 2, np.inf)
+        self._upper_bounds_storage[self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] = linear_program.get_upper_bounds() - self._lower_bounds
+        self._complemented_storage = np.zeros(self._variables_count + 2, dtype=bool)
+        self.has_upper_bounds = linear_program.upper_bounds is not None
+        righthand_side = linear_program.righthand_side
+        if linear_program.lower_bounds is not None:
+            righthand_side = righthand_side - linear_program.lefthand_side @ self._lower_bounds
+
+        if min(righthand_side, default=0) < 0:
             self.should_initialize = True
 
-        # 1 col for free variable, 1 row for objective_function
-        self._tableau = zeros((self._constraints_count + 1, self._variables_count + 1))
+        # 1 col for free variable, 1 col for the artificial variable, 1 row for objective_function
+        self._storage = np.zeros((self._constraints_count + 1, self._variables_count + 2), dtype=dtype, order=order)
+        self._basic_vars_storage = np.zeros((self._variables_count + 2,), dtype='int')  # including free variable, unused and should always be 0
+        self._use_columns(self._variables_count + 1)
 
         # lefthand-side:
         # real variales
-        self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] = linear_program.lefthand_side
+        lefthand_side = linear_program.lefthand_side
+        if linear_program.is_sparse:
+            # the dense tableau has no use for sparsity
+            lefthand_side = lefthand_side.toarray()
+        self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] = lefthand_side
         # slack variables - we assume every line is <= (LE) so we just need to add a slack variable per constraint
         slack_start_index = self._VARIABLES_COL_START_INDEX + self._real_variables_count
-        self._tableau[self._CONSTRAINT_ROW_START_INDEX:, slack_start_index: slack_start_index + self._constraints_count] = eye(self._constraints_count)
+        slack_rows = np.arange(self._CONSTRAINT_ROW_START_INDEX, self._constraints_count + 1)
+        self._tableau[slack_rows, slack_rows - self._CONSTRAINT_ROW_START_INDEX + slack_start_index] = 1
 
         # righthand-side:
-        self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] = linear_program.righthand_side * -1
+        self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] = righthand_side * -1
 
         # initially all slack variables are basic
-        self._basic_vars = np.zeros((self._variables_count + 1,), dtype='int')  # including free variable, unused and should always be 0
         self._basic_vars[slack_start_index: slack_start_index + self._constraints_count] = range(1, self._constraints_count + 1)
         self._tight_vars = np.array(range(self._real_variables_count, self._variables_count + 1), dtype='int')
         self._tight_vars[0] = 0
 
         assert len(self._basic_vars) == self._tableau.shape[1], 'basic variables array must be the same size as tablue row size'
 
+    def _use_columns(self, columns_count):
+        '''
+        Sets the tableau and the per-variable arrays to views of the first columns_count columns of their storage
+        '''
+        self._tableau = self._storage[:, :columns_count]
+        self._basic_vars = self._basic_vars_storage[:columns_count]
+        self._upper_bounds = self._upper_bounds_storage[:columns_count]
+        self._complemented = self._complemented_storage[:columns_count]
+
     def __getitem__(self, key):
         return self._tableau[key]
 
@@ -64,6 +121,13 @@ class tableau(object):
     def constraints_count(self):
         return self._constraints_count
 
+    @property
+    def variables_count(self):
+        '''
+        Count of the variables including the slack variables (and the artificial variable while it's used)
+        '''
+        return self._variables_count
+
     @property
     def pivots_count(self):
         return self.__pivots_count
@@ -84,12 +148,23 @@ class tableau(object):
         # canonize according to pivot_col_index
         self._tableau[pivot_row_index] /= self._tableau[pivot_row_index, pivot_col_index]
 
-        # perform Gauss elimination
-        num_rows = self._tableau.shape[0]
-        for row_index in range(num_rows):
-            if row_index == pivot_row_index:
-                continue
-            self._tableau[row_index] -= self._tableau[row_index, pivot_col_index] * self._tableau[pivot_row_index]
+        # perform Gauss elimination as an in-place rank-1 update, skipping rows which are already eliminated
+        pivot_row = self._tableau[pivot_row_index]
+        pivot_col = self._tableau[:, pivot_col_index].copy()
+        rows = pivot_col != 0
+        rows[pivot_row_index] = False
+        eliminated_rows = np.flatnonzero(rows)
+        if len(eliminated_rows) * self._SPARSE_PIVOT_COLUMN_RATIO < len(rows):
+            self._tableau[eliminated_rows] -= np.multiply.outer(pivot_col[eliminated_rows], pivot_row)
+        else:
+            # update blocks of rows so the outer product temporary stays small
+            block_size = max(1, self._PIVOT_BLOCK_ELEMENTS // len(pivot_row))
+            for start in range(0, len(rows), block_size):
+                block_rows = rows[start: start + block_size]
+                if not block_rows.any():
+                    continue
+                block = self._tableau[start: start + block_size]
+                np.subtract(block, np.multiply.outer(pivot_col[start: start + block_size], pivot_row), out=block, where=block_rows[:, np.newaxis])
 
         self.pivots_count += 1
 
@@ -97,22 +172,56 @@ class tableau(object):
         assert self._basic_vars[entering_var] == 0, 'entering variable must be non-basic'
         assert self._basic_vars[leaving_var] != 0, 'leaving variable must be basic'
 
+        values = self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX]
+        scale = min(1, np.max(np.abs(values), initial=0))
+        if abs(self._tableau[self._basic_vars[leaving_var], self._VARIABLES_FREE_VARIABLE_COL_INDEX]) <= self._DEGENERATE_STEP_TOLERANCE * scale:
+            # a zero step, the tableau is left as is (the ratio test treats near-zero values as zero)
+            self.degenerate_pivots_count += 1
         self._perform_pivot(self._basic_vars[leaving_var], entering_var)
 
         self._basic_vars[entering_var] = self._basic_vars[leaving_var]
         self._tight_vars[self._basic_vars[leaving_var]] = entering_var
         self._basic_vars[leaving_var] = 0
 
+    def flip_bound(self, variable):
+        '''
+        Complements the variable (x is replaced by u - x): a non-basic variable moves to its other bound,
+        a basic variable keeps its value and is represented by its distance from the upper bound
+        '''
+        assert np.isfinite(self._upper_bounds[variable]), 'only variables with a finite upper bound can be complemented'
+
+        self._tableau[:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] += self._tableau[:, variable] * self._upper_bounds[variable]
+        self._tableau[:, variable] *= -1
+        if self._basic_vars[variable] != 0:
+            self._tableau[self._basic_vars[variable]] *= -1
+        else:
+            self.bound_flips_count += 1
+        self._complemented[variable] = not self._complemented[variable]
+
+    def get_upper_bounds(self):
+        '''
+        Returns the upper bounds of all the variables (index 0 is the free variable), infinite for the unbounded ones
+        '''
+        return self._upper_bounds
+
+    def get_basic_upper_bounds(self):
+        '''
+        Returns the upper bounds of the basic variables by their constraints (the first item relates to constraint 1)
+        '''
+        return self._upper_bounds[self._tight_vars[self._CONSTRAINT_ROW_START_INDEX:]]
+
     def get_current_solution(self):
         solution = zeros(self._real_variables_count)
-        for i in range(1, self._real_variables_count + 1):
-            if self._basic_vars[i] == 0:
-                continue
-
-            # solution variable indices start from 0
-            solution[i - 1] = -self._tableau[self._basic_vars[i], 0] / self._tableau[self._basic_vars[i], i]
+        # solution variable indices start from 0
+        pivots = self._basic_vars[self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1]
+        basic = np.flatnonzero(pivots)
+        rows = pivots[basic]
+        solution[basic] = -self._tableau[rows, self._VARIABLES_FREE_VARIABLE_COL_INDEX] / self._tableau[rows, basic + 1]
 
-        return solution
+        real_variables = slice(self._VARIABLES_COL_START_INDEX, self._real_variables_count + 1)
+        complemented = self._complemented[real_variables]
+        solution[complemented] = self._upper_bounds[real_variables][complemented] - solution[complemented]
+        return solution + self._lower_bounds
 
     def get_objective_function_coefficients(self):
         '''
@@ -120,38 +229,111 @@ class tableau(object):
         '''
         return self._tableau[self._OBJECTIVE_ROW_INDEX]
 
-    def get_entering_candidates(self):
+    def get_objective_value(self):
+        return self._tableau[self._OBJECTIVE_ROW_INDEX, self._VARIABLES_FREE_VARIABLE_COL_INDEX]
+
+    def get_column(self, variable):
+        '''
+        Returns the constraints coefficients of the variable (the first item relates to constraint 1)
         '''
-        The entering candidtes are the variables' indices with positive coefficients in the objective function
+        return self._tableau[self._CONSTRAINT_ROW_START_INDEX:, variable]
+
+    def get_basic_values(self):
+        '''
+        Returns the values of the basic variables by their constraints (the first item relates to constraint 1)
+        '''
+        return -self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX]
+
+    def get_row(self, constraint_index):
+        '''
+        Returns the constraint row including the free variable (the items are indexed by the variables)
+        '''
+        return self._tableau[constraint_index]
+
+    def _slack_columns(self):
+        # the slack columns are B^-1 (and minus the duals in the objective row), they started as unit columns
+        slack_start_index = self._VARIABLES_COL_START_INDEX + self._real_variables_count
+        return self._tableau[:, slack_start_index: slack_start_index + self._constraints_count]
+
+    def get_basic_values_change(self, shift):
+        '''
+        Returns the change of the basic values when the righthand-side is shifted (B^-1 * shift) by their constraints
+        '''
+        return self._slack_columns()[self._CONSTRAINT_ROW_START_INDEX:] @ shift
+
+    def shift_righthand_side(self, shift):
+        '''
+        Adds shift to the righthand-side keeping the basis, the basic values and the objective value change like the slack variables were decreased by it
+        '''
+        self._tableau[:, self._VARIABLES_FREE_VARIABLE_COL_INDEX] -= self._slack_columns() @ shift
+
+    def get_reduced_costs(self, variables):
+        '''
+        Returns the objective function coefficients of the given variables only (zero for the basic variables)
+        '''
+        return np.where(self._basic_vars[variables] == 0, self._tableau[self._OBJECTIVE_ROW_INDEX, variables], 0)
+
+    def get_rows_combination(self, coefficients):
+        '''
+        Returns the combination of the constraint rows with the given coefficients (the first item relates to constraint 1)
+        '''
+        return coefficients @ self._tableau[self._CONSTRAINT_ROW_START_INDEX:]
+
+    def get_entering_candidates(self, tolerance=0):
+        '''
+        The entering candidtes are the variables' indices with coefficients bigger than tolerance (positive) in the objective function
         Note: the values are 1-based
         '''
-        return [i for i in range(self._VARIABLES_COL_START_INDEX, self._variables_count + 1) if self._basic_vars[i] == 0 and self._tableau[0, i] > 0]
+        non_basic = self._basic_vars[self._VARIABLES_COL_START_INDEX:] == 0
+        positive = self._tableau[self._OBJECTIVE_ROW_INDEX, self._VARIABLES_COL_START_INDEX:] > tolerance
+        return np.flatnonzero(non_basic & positive) + self._VARIABLES_COL_START_INDEX
 
     def get_variable_representing_constraint(self, constraint_index):
         if constraint_index is None:
             return None
         return self._tight_vars[constraint_index]
 
+    def get_complemented(self):
+        '''
+        Returns which variables are complemented (index 0 is the free variable), basic ones included
+        '''
+        return self._complemented
+
+    def get_basis(self):
+        upper_bounded = np.flatnonzero(self._complemented & (self._basic_vars == 0))
+        return Basis(self._tight_vars[1:].copy(), self._constraints_count, self._real_variables_count, upper_bounded)
+
+    def get_constraint_representing_variable(self, variable):
+        constraint_index = self._basic_vars[variable]
+        return None if constraint_index == 0 else constraint_index
+
     @contextmanager
     def use_artificial_argument(self):
-        # add artificial column in the end
-        self._tableau = np.hstack((self._tableau, -1 * ones((self._constraints_count + 1, 1))))
-        self._basic_vars = np.hstack((self._basic_vars, np.zeros(1, dtype='int')))
+        # the artificial column is the spare column in the end of the storage
+        artificial_column = self._variables_count + 1
+        self._storage[:, artificial_column] = -1
+        self._basic_vars_storage[artificial_column] = 0
+        self._complemented_storage[artificial_column] = False
         self._variables_count += 1
+        self._use_columns(self._variables_count + 1)
         self._using_artificial_variable = True
 
         yield
 
-        # remove artificial column in the end
-        ALONG_ROW = 0
-        ALONG_COL = 1
-        self._tableau = np.delete(self._tableau, -1, ALONG_COL)
-        self._basic_vars = np.delete(self._basic_vars, -1, ALONG_ROW)
+        # the artificial column is left out of the views, its storage is reset when used again
         self._variables_count -= 1
+        self._use_columns(self._variables_count + 1)
         self._using_artificial_variable = False
 
     def use_objective_function(self):
-        self._tableau[self._OBJECTIVE_ROW_INDEX, self._VARIABLES_COL_START_INDEX: self._real_variables_count + 1] = self._objective_function
+        real_variables = slice(self._VARIABLES_COL_START_INDEX, self._real_variables_count + 1)
+        complemented = self._complemented[real_variables]
+        upper_bounds = self._upper_bounds[real_variables]
+        # the objective function of the complemented variables is negated, and its value is shifted by the bounds
+        self._tableau[self._OBJECTIVE_ROW_INDEX] = 0
+        self._tableau[self._OBJECTIVE_ROW_INDEX, self._VARIABLES_FREE_VARIABLE_COL_INDEX] = \
+            self._objective_function @ self._lower_bounds + self._objective_function[complemented] @ upper_bounds[complemented]
+        self._tableau[self._OBJECTIVE_ROW_INDEX, real_variables] = np.where(complemented, -self._objective_function, self._objective_function)
 
         for variable in range(1, self._variables_count + 1):
             pivot = self._basic_vars[variable]
@@ -161,10 +343,10 @@ class tableau(object):
                 (self._tableau[self._OBJECTIVE_ROW_INDEX, variable] / self._tableau[pivot, variable]) * self._tableau[pivot])
 
     def get_most_infeasible_basic_variable_info(self):
-        constraint_index, free_var_value = max(
-            [(i + self._CONSTRAINT_ROW_START_INDEX, v) for (i, v) in 
-                enumerate(self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX])],
-            key=lambda x: x[1])
+        free_column = self._tableau[self._CONSTRAINT_ROW_START_INDEX:, self._VARIABLES_FREE_VARIABLE_COL_INDEX]
+        # argmax returns the first maximal row, same as max() over the rows
+        constraint_index = int(np.argmax(free_column)) + self._CONSTRAINT_ROW_START_INDEX
+        free_var_value = free_column[constraint_index - self._CONSTRAINT_ROW_START_INDEX]
 
         basic_var_index = self.get_variable_representing_constraint(constraint_index)
 
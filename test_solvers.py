@@ -0,0 +1,243 @@
+'''
+Regression tests which solve seeded random linear programs with every engine, algorithm, strategy and solve option,
+and compare their statuses and objective values to the dense tableau without presolve (and its solutions to the constraints).
+Run with:
+$ py -m pytest test_solvers.py
+'''
+import functools
+import numpy as np
+import pytest
+import scipy.sparse
+import exceptions
+from instrumentation import Profiler
+from interior_point import InteriorPoint
+from linear_program import LinearProgramSolver, StandardLinearProgram
+from revised_tableau import RevisedTableau
+from simplex import DualSimplex
+import strategy
+import tableau
+import run_benchmark
+
+PROGRAMS_COUNT = 60
+SEED = 0
+# objective values and constraint violations are compared up to this tolerance
+TOLERANCE = 1e-6
+
+
+def random_program(rng, bounded):
+    '''
+    A small random linear program, a negative righthand-side or bounds may make it infeasible and non-positive columns unbounded
+    '''
+    constraints_count, variables_count = rng.integers(1, 8), rng.integers(1, 8)
+    lefthand_side = rng.uniform(-1, 1, (constraints_count, variables_count))
+    lefthand_side[rng.random((constraints_count, variables_count)) < 0.3] = 0
+    righthand_side = rng.uniform(-1, 3, constraints_count)
+    # degenerate vertices
+    righthand_side[rng.random(constraints_count) < 0.3] = 0
+    objective_function = rng.uniform(-1, 1, variables_count)
+    if not bounded:
+        return StandardLinearProgram(objective_function, lefthand_side, righthand_side)
+    lower_bounds = np.where(rng.random(variables_count) < 0.5, rng.uniform(-1, 1, variables_count), 0)
+    upper_bounds = np.where(rng.random(variables_count) < 0.6, lower_bounds + rng.uniform(0, 2, variables_count), np.inf)
+    return StandardLinearProgram(objective_function, lefthand_side, righthand_side, lower_bounds, upper_bounds)
+
+
+def random_programs():
+    rng = np.random.default_rng(SEED)
+    return [random_program(rng, bounded=index % 2 == 1) for index in range(PROGRAMS_COUNT)]
+
+
+def sparse(linear_program):
+    return StandardLinearProgram(linear_program.objective_function, scipy.sparse.csc_matrix(linear_program.lefthand_side), linear_program.righthand_side,
+                                 linear_program.lower_bounds, linear_program.upper_bounds)
+
+
+def solve_reference(linear_program):
+    return LinearProgramSolver.solve_simplex(linear_program, presolve=False)
+
+
+SOLVERS = {
+    'dense presolve': LinearProgramSolver.solve_simplex,
+    'dense column major': lambda linear_program: LinearProgramSolver.solve_simplex(
+        linear_program, engine=functools.partial(tableau.tableau, order='F'), presolve=False),
+    'revised': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, engine=RevisedTableau, presolve=False),
+    'revised presolve': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, engine=RevisedTableau),
+    'revised sparse': lambda linear_program: LinearProgramSolver.solve_simplex(sparse(linear_program), presolve=False),
+    'sparse presolve': lambda linear_program: LinearProgramSolver.solve_simplex(sparse(linear_program)),
+    'dual simplex': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, algorithm=DualSimplex, presolve=False),
+    'dual simplex revised': lambda linear_program: LinearProgramSolver.solve_simplex(
+        linear_program, engine=RevisedTableau, algorithm=DualSimplex, presolve=False),
+    'min coefficient': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, strategy.MinCoefficientStrategy(), presolve=False),
+    'devex harris': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, strategy.DevexStrategy(harris=True), presolve=False),
+    'steepest edge revised': lambda linear_program: LinearProgramSolver.solve_simplex(
+        linear_program, strategy.SteepestEdgeStrategy(), engine=RevisedTableau, presolve=False),
+    'partial pricing': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, strategy.PartialPricingStrategy(2), presolve=False),
+    'multiple pricing revised': lambda linear_program: LinearProgramSolver.solve_simplex(
+        linear_program, strategy.MultiplePricingStrategy(2), engine=RevisedTableau, presolve=False),
+    'lexicographic': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, strategy.MaxCoefficientStrategy(lexicographic=True)),
+    'bland': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, strategy.MaxCoefficientStrategy(stalling_pivots=1)),
+    'geometric scaling': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, scaling='geometric'),
+    'equilibration scaling revised': lambda linear_program: LinearProgramSolver.solve_simplex(
+        linear_program, engine=RevisedTableau, scaling='equilibration', presolve=False),
+    'perturbation': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, perturbation=True),
+    'interior point': LinearProgramSolver.solve_interior_point,
+    'interior point algorithm': lambda linear_program: LinearProgramSolver.solve_simplex(linear_program, algorithm=InteriorPoint, presolve=False),
+    'exact': LinearProgramSolver.solve_exact,
+    'exact cold': lambda linear_program: LinearProgramSolver.solve_exact(linear_program, float_start=False),
+}
+
+
+def result(solve, linear_program):
+    try:
+        return solve(linear_program)
+    except exceptions.SimplexError as error:
+        return error
+
+
+def check_solution(linear_program, solution):
+    values = np.asarray(solution.solution, dtype=np.float64)
+    assert np.all(linear_program.lefthand_side @ values <= np.asarray(linear_program.righthand_side) + TOLERANCE)
+    assert np.all(values >= linear_program.get_lower_bounds() - TOLERANCE)
+    assert np.all(values <= linear_program.get_upper_bounds() + TOLERANCE)
+    assert float(solution.objective_value) == pytest.approx(float(np.asarray(linear_program.objective_function) @ values), abs=TOLERANCE)
+
+
+def check_same_result(linear_program, expected, actual):
+    assert actual.status == expected.status
+    if expected.status == 'optimal':
+        assert float(actual.objective_value) == pytest.approx(float(expected.objective_value), abs=TOLERANCE)
+        check_solution(linear_program, actual)
+
+
+@pytest.fixture(scope='module')
+def programs():
+    linear_programs = random_programs()
+    return [(linear_program, result(solve_reference, linear_program)) for linear_program in linear_programs]
+
+
+def test_reference_statuses(programs):
+    # the seeded programs cover every status
+    statuses = {expected.status for _, expected in programs}
+    assert statuses == {'optimal', 'infeasible', 'unbounded'}
+    for linear_program, expected in programs:
+        if expected.status == 'optimal':
+            check_solution(linear_program, expected)
+
+
+@pytest.mark.parametrize('name', sorted(SOLVERS))
+def test_solvers_agree(programs, name):
+    for linear_program, expected in programs:
+        check_same_result(linear_program, expected, result(SOLVERS[name], linear_program))
+
+
+def test_batch_agrees():
+    # batched linear programs have the same shape and no bounds
+    rng = np.random.default_rng(SEED)
+    for constraints_count, variables_count in ((3, 4), (5, 2)):
+        linear_programs = []
+        for _ in range(PROGRAMS_COUNT):
+            righthand_side = rng.uniform(-1, 3, constraints_count)
+            righthand_side[rng.random(constraints_count) < 0.3] = 0
+            linear_programs.append(StandardLinearProgram(rng.uniform(-1, 1, variables_count), rng.uniform(-1, 1, (constraints_count, variables_count)),
+                                                         righthand_side))
+        for linear_program, actual in zip(linear_programs, LinearProgramSolver.solve_batch(linear_programs)):
+            check_same_result(linear_program, result(solve_reference, linear_program), actual)
+
+
+@pytest.mark.parametrize('engine', [tableau.tableau, RevisedTableau])
+def test_warm_start(programs, engine):
+    # a changed objective function keeps the basis feasible, a changed righthand-side keeps it optimal
+    rng = np.random.default_rng(SEED)
+    for linear_program, expected in programs:
+        if expected.status != 'optimal':
+            continue
+        changes = (StandardLinearProgram(linear_program.objective_function + rng.uniform(-0.5, 0.5, linear_program.variables_count),
+                                         linear_program.lefthand_side, linear_program.righthand_side, linear_program.lower_bounds, linear_program.upper_bounds),
+                   StandardLinearProgram(linear_program.objective_function, linear_program.lefthand_side,
+                                         linear_program.righthand_side + rng.uniform(-0.5, 0.5, linear_program.constraints_count),
+                                         linear_program.lower_bounds, linear_program.upper_bounds))
+        for changed in changes:
+            warm = result(lambda program: LinearProgramSolver.solve_simplex(program, engine=engine, warm_start=expected.basis), changed)
+            check_same_result(changed, result(solve_reference, changed), warm)
+
+
+def test_sensitivity_dual_values(programs):
+    # strong duality: the dual values and reduced costs price the objective value (b - A l and the upper bounds at their reduced costs)
+    for linear_program, expected in programs:
+        if expected.status != 'optimal':
+            continue
+        for engine in (tableau.tableau, RevisedTableau):
+            solution = LinearProgramSolver.solve_simplex(linear_program, engine=engine, sensitivity=True)
+            sensitivity = solution.sensitivity
+            lower_bounds, upper_bounds = linear_program.get_lower_bounds(), linear_program.get_upper_bounds()
+            assert np.all(sensitivity.dual_values >= -TOLERANCE)
+            at_upper = sensitivity.reduced_costs > TOLERANCE
+            objective_value = (sensitivity.dual_values @ (linear_program.righthand_side - linear_program.lefthand_side @ lower_bounds)
+                               + linear_program.objective_function @ lower_bounds
+                               + sensitivity.reduced_costs[at_upper] @ (upper_bounds - lower_bounds)[at_upper])
+            assert objective_value == pytest.approx(solution.objective_value, abs=TOLERANCE)
+
+
+def test_klee_minty():
+    # the maximum coefficient rule visits all the vertices, steepest edge takes a single pivot
+    dimension = 6
+    linear_program = run_benchmark.klee_minty(dimension)
+    for engine in (tableau.tableau, RevisedTableau):
+        solution = LinearProgramSolver.solve_simplex(linear_program, engine=engine, presolve=False)
+        assert solution.iterations_count == 2 ** dimension - 1
+        steepest_edge = LinearProgramSolver.solve_simplex(linear_program, strategy.SteepestEdgeStrategy(), engine=engine, presolve=False)
+        assert steepest_edge.iterations_count == 1
+        assert steepest_edge.objective_value == pytest.approx(solution.objective_value)
+
+
+@pytest.mark.parametrize('engine', [tableau.tableau, RevisedTableau])
+def test_cycling_terminates(engine):
+    # Beale's example cycles with the maximum coefficient rule unless the strategy falls back to Bland's rule
+    linear_program = run_benchmark.cycling(2)
+    for options in ({}, {'lexicographic': True}):
+        solution = LinearProgramSolver.solve_simplex(linear_program, strategy.MaxCoefficientStrategy(**options), max_iterations=1000,
+                                                     engine=engine, presolve=False)
+        assert solution.objective_value == pytest.approx(2)
+
+
+@pytest.mark.parametrize('status', ['infeasible', 'unbounded'])
+def test_profile_of_failed_solve(programs, status):
+    # the open phase is summarized also when the solve raises
+    for linear_program, expected in programs:
+        if expected.status != status:
+            continue
+        for engine in (tableau.tableau, RevisedTableau):
+            profiler = Profiler()
+            with pytest.raises(exceptions.SimplexError):
+                LinearProgramSolver.solve_simplex(linear_program, engine=engine, presolve=False, instrumentation=profiler)
+            report = profiler.report()
+            assert report.phases
+            # bound flips are recorded like pivots
+            assert sum(phase['pivots'] + phase['bound_flips'] for phase in report.phases) == len(report.pivots)
+
+
+def test_profile_of_perturbation(programs):
+    # the perturbed solve and the cleanup are numbered
+    for linear_program, expected in programs:
+        if expected.status != 'optimal':
+            continue
+        solution = LinearProgramSolver.solve_simplex(linear_program, presolve=False, instrumentation=Profiler(), perturbation=True)
+        solves = [phase['solve'] for phase in solution.profile.phases]
+        assert solves == sorted(solves) and set(solves) == {1, 2}
+        assert sum(phase['pivots'] for phase in solution.profile.phases) == solution.iterations_count
+
+
+@pytest.mark.parametrize('engine', [tableau.tableau, RevisedTableau])
+def test_dual_simplex_bounded_start(programs, engine):
+    # positive costs of upper bounded variables start complemented, so the dual simplex skips phase 1
+    dual_starts = 0
+    for linear_program, expected in programs:
+        if linear_program.upper_bounds is None or not DualSimplex.is_dual_feasible(linear_program):
+            continue
+        profiler = Profiler()
+        actual = result(lambda program: LinearProgramSolver.solve_simplex(program, engine=engine, algorithm=DualSimplex, presolve=False,
+                                                                          instrumentation=profiler), linear_program)
+        check_same_result(linear_program, expected, actual)
+        assert profiler.report().phases[0]['phase'] == 'dual'
+        dual_starts += bool(np.any(linear_program.objective_function > 0))
+    assert dual_starts > 0